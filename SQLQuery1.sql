@@ -53,7 +53,10 @@ CREATE TABLE Patient (
     Email NVARCHAR(100) UNIQUE NOT NULL CHECK (Email LIKE '%_@_%._%'),
     Is_Active BIT DEFAULT 1,
     Created_Date DATETIME2 DEFAULT GETDATE(),
-    Modified_Date DATETIME2 DEFAULT GETDATE()
+    Modified_Date DATETIME2 DEFAULT GETDATE(),
+    -- normalised names for indexed prefix search
+    First_Key AS LOWER(LTRIM(RTRIM(First_Name))) PERSISTED,
+    Last_Key AS LOWER(LTRIM(RTRIM(Last_Name))) PERSISTED
 );
 GO
 
@@ -68,6 +71,8 @@ CREATE TABLE Medication (
     Is_Active BIT DEFAULT 1,
     Created_Date DATETIME2 DEFAULT GETDATE(),
     Modified_Date DATETIME2 DEFAULT GETDATE(),
+    -- changes on every write; the catalog refresh reads rows past its watermark
+    Row_Version ROWVERSION,
     CONSTRAINT UQ_Med_GenericBrand UNIQUE(Generic_Name, Brand_Name)
 );
 GO
@@ -104,8 +109,71 @@ CREATE TABLE Medication_Inventory (
     Quantity INT NOT NULL CHECK(Quantity >= 0),
     Unit_Price DECIMAL(10,2) NOT NULL CHECK(Unit_Price >= 0),
     Modified_Date DATETIME2 DEFAULT SYSDATETIME(),
+    -- low-stock hysteresis: alert below Low_Stock_Level, clear at Restock_Level
+    Low_Stock_Level INT NOT NULL DEFAULT 10 CHECK(Low_Stock_Level >= 0),
+    Restock_Level INT NOT NULL DEFAULT 20,
+    -- ledger mode: Stock_Ledger entries up to here are folded into Quantity
+    Ledger_Through BIGINT NOT NULL DEFAULT 0,
+    -- changes on every write: the catalog refresh watermark (DB.catalog_rows)
+    Row_Version ROWVERSION,
     PRIMARY KEY (Medication_ID),
-    FOREIGN KEY (Medication_ID) REFERENCES Medication(Medication_ID)
+    FOREIGN KEY (Medication_ID) REFERENCES Medication(Medication_ID),
+    CONSTRAINT CK_Inv_Hysteresis CHECK (Restock_Level >= Low_Stock_Level)
+);
+GO
+
+-- ===========================
+-- MEDICATION INVENTORY LOG
+-- ===========================
+
+-- one row per quantity change, written by trg_log_inventory_changes
+CREATE TABLE Medication_Inventory_Log (
+    Log_ID INT IDENTITY(1,1) PRIMARY KEY,
+    Medication_ID NVARCHAR(10) NOT NULL,
+    Old_Quantity INT NULL,              -- NULL when the inventory row was created
+    New_Quantity INT NOT NULL,
+    Quantity_Change INT NOT NULL,
+    Change_Date DATETIME2 DEFAULT SYSDATETIME(),
+    Changed_By NVARCHAR(100) DEFAULT SYSTEM_USER
+);
+GO
+
+-- ===========================
+-- STOCK LEDGER
+-- ===========================
+
+-- ledger mode (HMS_STOCK_MODE=ledger): stock movements are appended here
+-- instead of updating the Medication_Inventory row, so concurrent sales of
+-- one drug never wait on each other.  On hand = Quantity + the entries
+-- after Ledger_Through; SP_CompactStockLedger folds them in periodically.
+CREATE TABLE Stock_Ledger (
+    Entry_ID BIGINT IDENTITY(1,1) PRIMARY KEY,
+    Medication_ID NVARCHAR(10) NOT NULL,
+    Qty_Change INT NOT NULL,
+    Reason NVARCHAR(20) NOT NULL CHECK (Reason IN ('Sale', 'Receipt', 'Adjustment', 'Refill')),
+    Ref_ID NVARCHAR(20) NULL,           -- SaleID / Prescription_ID behind the movement
+    Entry_Date DATETIME2 DEFAULT SYSDATETIME(),
+    -- a new entry changes its drug's stock on hand: the catalog refresh reads it too
+    Row_Version ROWVERSION
+);
+GO
+
+-- ===========================
+-- MEDICATION IMPORT (staging)
+-- ===========================
+
+-- bulk CSV imports land here one chunk at a time, keyed by batch, and are
+-- merged into Medication / Medication_Inventory in the same transaction
+CREATE TABLE Medication_Import (
+    Batch_ID NVARCHAR(36) NOT NULL,
+    Line_No INT NOT NULL,
+    Medication_ID NVARCHAR(10) NULL,    -- NULL: match by name or allocate
+    Generic_Name NVARCHAR(100) NOT NULL,
+    Brand_Name NVARCHAR(100) NOT NULL,
+    Quantity INT NULL,                  -- NULL: keep the current stock
+    Unit_Price DECIMAL(10,2) NOT NULL,
+    Error NVARCHAR(200) NULL,
+    PRIMARY KEY (Batch_ID, Line_No)
 );
 GO
 
@@ -209,6 +277,74 @@ CREATE TABLE Sale_Item (
 );
 GO
 
+-- ===========================
+-- SALES ROLLUPS
+-- ===========================
+
+-- running totals for the Manager dashboard, folded forward from the sales
+-- after Rollup_Watermark.Last_SaleID by SP_RefreshSalesRollups, so reading
+-- them never scans Sale_Header / Sale_Item however long the history gets
+CREATE TABLE Sales_Daily (
+    Sale_Date DATE PRIMARY KEY,
+    Sales INT NOT NULL,
+    Units INT NOT NULL,
+    Revenue DECIMAL(14,2) NOT NULL
+);
+GO
+
+CREATE TABLE Sales_By_Medication (
+    Medication_ID NVARCHAR(10) PRIMARY KEY,
+    Sales INT NOT NULL,                 -- sales with at least one line of it
+    Units INT NOT NULL,
+    Revenue DECIMAL(14,2) NOT NULL,
+    Last_Sale DATE NOT NULL
+);
+GO
+
+CREATE TABLE Sales_By_Cashier (
+    Cashier NVARCHAR(100) PRIMARY KEY,
+    Sales INT NOT NULL,
+    Revenue DECIMAL(14,2) NOT NULL
+);
+GO
+
+-- 'Walk-in' (no patient on file) or 'Hospital'
+CREATE TABLE Sales_By_Patient_Type (
+    Patient_Type NVARCHAR(10) PRIMARY KEY,
+    Sales INT NOT NULL,
+    Revenue DECIMAL(14,2) NOT NULL
+);
+GO
+
+CREATE TABLE Rollup_Watermark (
+    Name NVARCHAR(50) PRIMARY KEY,
+    Last_SaleID INT NOT NULL,
+    Refreshed_Date DATETIME2 DEFAULT SYSDATETIME()
+);
+GO
+
+INSERT INTO Rollup_Watermark (Name, Last_SaleID) VALUES ('sales', 0);
+GO
+
+-- ===========================
+-- REORDER SUGGESTIONS
+-- ===========================
+
+-- written whole by forecast.py from a year of Sale_Item history: daily
+-- demand, its spread, and when / how much to reorder each medication
+CREATE TABLE Reorder_Suggestion (
+    Medication_ID NVARCHAR(10) PRIMARY KEY,
+    Avg_Daily DECIMAL(12,3) NOT NULL,
+    Std_Daily DECIMAL(12,3) NOT NULL,
+    On_Hand INT NOT NULL,
+    Days_Of_Supply DECIMAL(10,1) NULL,  -- NULL: no recent demand
+    Reorder_Point INT NOT NULL,         -- demand over the lead time + safety stock
+    Order_Up_To INT NOT NULL,           -- ... plus one review period
+    Suggested_Qty INT NOT NULL,         -- Order_Up_To - On_Hand once at / below Reorder_Point
+    Computed_Date DATETIME2 DEFAULT SYSDATETIME()
+);
+GO
+
 -- ===========================
 -- DOCTOR TABLE
 -- ===========================
@@ -270,8 +406,18 @@ CREATE TABLE Stock_Alerts (
     Alert_ID INT IDENTITY(1,1) PRIMARY KEY,
     Medication_ID VARCHAR(50),
     Alert_Type VARCHAR(50),
-    Alert_Date DATETIME
+    Alert_Date DATETIME,
+    Quantity INT NULL,                  -- stock when the alert was raised
+    Resolved_Date DATETIME NULL         -- set once stock is back at Restock_Level
 );
+GO
+
+-- databases created before alerts were resolved lack these columns
+IF COL_LENGTH('Stock_Alerts', 'Quantity') IS NULL
+    ALTER TABLE Stock_Alerts ADD Quantity INT NULL;
+IF COL_LENGTH('Stock_Alerts', 'Resolved_Date') IS NULL
+    ALTER TABLE Stock_Alerts ADD Resolved_Date DATETIME NULL;
+GO
 
 --test cases
  select * from Stock_Alerts
@@ -286,15 +432,30 @@ select * from Medication
 
 
 
--- AUDIT TABLES
 -- ===========================
+-- AUDIT ARCHIVE
+-- ===========================
+-- The audit triggers only ever append.  DB.archive_audit moves rows past
+-- the hot window into the *_Archive tables below, a bounded batch per
+-- transaction, so the hot tables stay small and trigger inserts cheap.
+-- Archives are partitioned by year: old years can be switched out or
+-- truncated per partition; SP_ExtendAuditYears adds next year's boundary.
+IF NOT EXISTS (SELECT 1 FROM sys.partition_functions WHERE name = 'PF_AuditYear')
+    CREATE PARTITION FUNCTION PF_AuditYear (DATETIME2)
+    AS RANGE RIGHT FOR VALUES ('2024-01-01', '2025-01-01', '2026-01-01', '2027-01-01');
+GO
 
-CREATE TABLE Patient_History (
-    History_ID INT IDENTITY(1,1) PRIMARY KEY,
+IF NOT EXISTS (SELECT 1 FROM sys.partition_schemes WHERE name = 'PS_AuditYear')
+    CREATE PARTITION SCHEME PS_AuditYear AS PARTITION PF_AuditYear ALL TO ([PRIMARY]);
+GO
+
+-- same columns, in the same order, as the hot tables (DELETE ... OUTPUT deleted.*)
+CREATE TABLE Patient_History_Archive (
+    History_ID INT NOT NULL,
     Patient_ID NVARCHAR(10) NOT NULL,
-    Operation_Type NVARCHAR(10) NOT NULL, -- INSERT, UPDATE, DELETE
-    Operation_Date DATETIME2 DEFAULT GETDATE(),
-    Operation_User NVARCHAR(100) DEFAULT SYSTEM_USER,
+    Operation_Type NVARCHAR(10) NOT NULL,
+    Operation_Date DATETIME2 NOT NULL,
+    Operation_User NVARCHAR(100),
     Old_First_Name NVARCHAR(50),
     Old_Last_Name NVARCHAR(50),
     Old_Date_of_Birth DATE,
@@ -304,29 +465,31 @@ CREATE TABLE Patient_History (
     New_Last_Name NVARCHAR(50),
     New_Date_of_Birth DATE,
     New_Gender CHAR(1),
-    New_Email NVARCHAR(100)
-);
+    New_Email NVARCHAR(100),
+    CONSTRAINT PK_PatientHistoryArchive PRIMARY KEY CLUSTERED (Operation_Date, History_ID)
+) ON PS_AuditYear(Operation_Date);
 GO
 
-CREATE TABLE Medication_History (
-    History_ID INT IDENTITY(1,1) PRIMARY KEY,
+CREATE TABLE Medication_History_Archive (
+    History_ID INT NOT NULL,
     Medication_ID NVARCHAR(10) NOT NULL,
     Operation_Type NVARCHAR(10) NOT NULL,
-    Operation_Date DATETIME2 DEFAULT GETDATE(),
-    Operation_User NVARCHAR(100) DEFAULT SYSTEM_USER,
+    Operation_Date DATETIME2 NOT NULL,
+    Operation_User NVARCHAR(100),
     Old_Generic_Name NVARCHAR(100),
     Old_Brand_Name NVARCHAR(100),
     New_Generic_Name NVARCHAR(100),
-    New_Brand_Name NVARCHAR(100)
-);
+    New_Brand_Name NVARCHAR(100),
+    CONSTRAINT PK_MedicationHistoryArchive PRIMARY KEY CLUSTERED (Operation_Date, History_ID)
+) ON PS_AuditYear(Operation_Date);
 GO
 
-CREATE TABLE Prescription_History (
-    History_ID INT IDENTITY(1,1) PRIMARY KEY,
+CREATE TABLE Prescription_History_Archive (
+    History_ID INT NOT NULL,
     Prescription_ID NVARCHAR(10) NOT NULL,
     Operation_Type NVARCHAR(10) NOT NULL,
-    Operation_Date DATETIME2 DEFAULT GETDATE(),
-    Operation_User NVARCHAR(100) DEFAULT SYSTEM_USER,
+    Operation_Date DATETIME2 NOT NULL,
+    Operation_User NVARCHAR(100),
     Old_Patient_ID NVARCHAR(10),
     Old_Medication_ID NVARCHAR(10),
     Old_Prescription_Date DATE,
@@ -346,8 +509,32 @@ CREATE TABLE Prescription_History (
     New_Refills_Authorized INT,
     New_Refills_Remaining INT,
     New_Status NVARCHAR(20),
-    New_Instructions NVARCHAR(500)
-);
+    New_Instructions NVARCHAR(500),
+    CONSTRAINT PK_PrescriptionHistoryArchive PRIMARY KEY CLUSTERED (Operation_Date, History_ID)
+) ON PS_AuditYear(Operation_Date);
+GO
+
+CREATE TABLE User_Actions_Archive (
+    Action_ID INT NOT NULL,
+    [User] VARCHAR(50),
+    Action VARCHAR(50),
+    Table_Name VARCHAR(50),
+    Record_ID VARCHAR(50),
+    Action_Date DATETIME2 NOT NULL,
+    CONSTRAINT PK_UserActionsArchive PRIMARY KEY CLUSTERED (Action_Date, Action_ID)
+) ON PS_AuditYear(Action_Date);
+GO
+
+-- only resolved alerts are archived (open ones are live, see UX_StockAlerts_Open)
+CREATE TABLE Stock_Alerts_Archive (
+    Alert_ID INT NOT NULL,
+    Medication_ID VARCHAR(50),
+    Alert_Type VARCHAR(50),
+    Alert_Date DATETIME2 NOT NULL,
+    Quantity INT NULL,
+    Resolved_Date DATETIME2 NULL,
+    CONSTRAINT PK_StockAlertsArchive PRIMARY KEY CLUSTERED (Alert_Date, Alert_ID)
+) ON PS_AuditYear(Alert_Date);
 GO
 
 
@@ -525,7 +712,8 @@ BEGIN
     SET NOCOUNT ON;
     
     UPDATE Medication_Inventory 
-    SET Quantity = Quantity + @QuantityChange
+    SET Quantity = Quantity + @QuantityChange,
+        Modified_Date = SYSDATETIME()
     WHERE Medication_ID = @MedicationID;
     
     SELECT @@ROWCOUNT AS RowsAffected;
@@ -565,7 +753,8 @@ BEGIN
       ON tgt.Medication_ID = src.mid
     WHEN MATCHED THEN
       UPDATE SET Generic_Name = src.gen,
-                 Brand_Name = src.br
+                 Brand_Name = src.br,
+                 Modified_Date = SYSDATETIME()
     WHEN NOT MATCHED THEN
       INSERT (Medication_ID, Generic_Name, Brand_Name, Is_Active)
       VALUES (src.mid, src.gen, src.br, 1);
@@ -586,7 +775,8 @@ BEGIN
       ON tgt.Medication_ID = src.mid
     WHEN MATCHED THEN
       UPDATE SET Quantity = src.qty,
-                 Unit_Price = src.prc
+                 Unit_Price = src.prc,
+                 Modified_Date = SYSDATETIME()
     WHEN NOT MATCHED THEN
       INSERT (Medication_ID, Quantity, Unit_Price)
       VALUES (src.mid, src.qty, src.prc);
@@ -594,60 +784,356 @@ END
 GO
 
 -- 12. Save Sale Stored Procedure
+-- Whole checkout in one call / one transaction; stock is taken out here
+-- exactly once (per medication, so repeated cart lines are summed).
 CREATE OR ALTER PROCEDURE SP_SaveSale
     @PatientID NVARCHAR(10),
-    @Cashier NVARCHAR(50),
+    @Cashier NVARCHAR(100),
     @Total DECIMAL(10,2),
-    @SaleItems NVARCHAR(MAX) -- JSON format: [{"mid":"M001","qty":2,"price":15.50}]
+    @SaleItems NVARCHAR(MAX), -- JSON format: [{"mid":"M001","qty":2,"price":15.50}]
+    @Ledger BIT = 0,          -- 1: append to Stock_Ledger instead of updating stock rows
+    @Reserved BIT = 0         -- 1: SP_ReserveStock already took the stock
 AS
 BEGIN
     SET NOCOUNT ON;
-    BEGIN TRANSACTION;
-    
+    SET XACT_ABORT ON;
+
     DECLARE @SaleID INT;
-    
-    -- Insert sale header
-    INSERT INTO Sale_Header(Patient_ID, Cashier, Total)
-    VALUES(@PatientID, @Cashier, @Total);
-    
-    SET @SaleID = SCOPE_IDENTITY();
-    
-    -- Parse JSON and insert sale items
-    INSERT INTO Sale_Item(SaleID, Medication_ID, Qty, UnitPrice)
-    SELECT @SaleID,
-           JSON_VALUE(value, '$.mid'),
-           CAST(JSON_VALUE(value, '$.qty') AS INT),
-           CAST(JSON_VALUE(value, '$.price') AS DECIMAL(10,2))
-    FROM OPENJSON(@SaleItems);
-    
-    -- Update inventory
-    UPDATE Medication_Inventory
-    SET Quantity = Quantity - si.Qty
-    FROM Medication_Inventory mi
-    INNER JOIN (
-        SELECT JSON_VALUE(value, '$.mid') AS MedicationID,
-               CAST(JSON_VALUE(value, '$.qty') AS INT) AS Qty
-        FROM OPENJSON(@SaleItems)
-    ) si ON mi.Medication_ID = si.MedicationID;
-    
-    COMMIT TRANSACTION;
-    
+    DECLARE @Items TABLE (MedicationID NVARCHAR(10), Qty INT, UnitPrice DECIMAL(10,2));
+
+    INSERT INTO @Items(MedicationID, Qty, UnitPrice)
+    SELECT mid, qty, price
+    FROM OPENJSON(@SaleItems)
+         WITH (mid NVARCHAR(10) '$.mid', qty INT '$.qty', price DECIMAL(10,2) '$.price');
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        -- Insert sale header
+        INSERT INTO Sale_Header(Patient_ID, Cashier, Total)
+        VALUES(@PatientID, @Cashier, @Total);
+
+        SET @SaleID = SCOPE_IDENTITY();
+
+        -- Insert sale items
+        INSERT INTO Sale_Item(SaleID, Medication_ID, Qty, UnitPrice)
+        SELECT @SaleID, MedicationID, Qty, UnitPrice
+        FROM @Items;
+
+        -- @Reserved = 1: the stock is already out, nothing to move
+        IF @Reserved = 0 AND @Ledger = 1
+        BEGIN
+            -- append the movement; the inventory rows are not locked
+            INSERT INTO Stock_Ledger(Medication_ID, Qty_Change, Reason, Ref_ID)
+            SELECT MedicationID, -SUM(Qty), 'Sale', CAST(@SaleID AS NVARCHAR(20))
+            FROM @Items
+            GROUP BY MedicationID;
+
+            IF EXISTS (SELECT 1 FROM vw_StockOnHand s
+                       WHERE s.Quantity < 0
+                         AND s.Medication_ID IN (SELECT MedicationID FROM @Items))
+                THROW 50001, 'Inventory quantity cannot be negative', 1;
+        END
+        ELSE IF @Reserved = 0
+            -- Update inventory
+            UPDATE mi
+            SET Quantity = mi.Quantity - si.Qty,
+                Modified_Date = SYSDATETIME()
+            FROM Medication_Inventory mi
+            INNER JOIN (
+                SELECT MedicationID, SUM(Qty) AS Qty
+                FROM @Items
+                GROUP BY MedicationID
+            ) si ON mi.Medication_ID = si.MedicationID;
+
+        COMMIT TRANSACTION;
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0 ROLLBACK TRANSACTION;
+        THROW;
+    END CATCH
+
     SELECT @SaleID AS SaleID;
 END
 GO
 
+-- ID sequences: numbers are never handed out twice, even to concurrent
+-- callers.  They start above the old 3-digit range so IDs generated by the
+-- previous MAX()+1 procedures can't collide, and are formatted with at
+-- least 6 digits (P001000, M001000, PR001000).
+IF OBJECT_ID('dbo.Seq_PatientID', 'SO') IS NULL
+    CREATE SEQUENCE dbo.Seq_PatientID AS INT START WITH 1000 INCREMENT BY 1 CACHE 100;
+IF OBJECT_ID('dbo.Seq_MedicationID', 'SO') IS NULL
+    CREATE SEQUENCE dbo.Seq_MedicationID AS INT START WITH 1000 INCREMENT BY 1 CACHE 100;
+IF OBJECT_ID('dbo.Seq_PrescriptionID', 'SO') IS NULL
+    CREATE SEQUENCE dbo.Seq_PrescriptionID AS INT START WITH 1000 INCREMENT BY 1 CACHE 100;
+GO
+
+-- SP_ReserveIDs: hi/lo block reservation for the client-side allocator
+-- (DB.ids); returns the first of @Count consecutive numbers.
+CREATE OR ALTER PROCEDURE SP_ReserveIDs
+    @Sequence NVARCHAR(128),
+    @Count INT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    IF @Sequence NOT IN (N'Seq_PatientID', N'Seq_MedicationID', N'Seq_PrescriptionID')
+        THROW 50010, 'Unknown ID sequence', 1;
+    DECLARE @Name NVARCHAR(200) = N'dbo.' + @Sequence, @First SQL_VARIANT;
+    EXEC sys.sp_sequence_get_range
+         @sequence_name = @Name,
+         @range_size = @Count,
+         @range_first_value = @First OUTPUT;
+    SELECT CAST(@First AS INT) AS First_Value;
+END;
+GO
+
+-- SP_ReserveStock: take stock for a cart, line by line.  Each line is one
+-- decrement guarded by Quantity >= Qty, so counters selling the same drug
+-- only queue on its row for that statement and all succeed while stock
+-- lasts.  A line sent with a price is only taken while Unit_Price still
+-- matches (the drug was not repriced since the cart was built).  Short or
+-- repriced lines are reported, not rolled back: the client (DB.checkout)
+-- gives back the lines it took when it cannot sell the whole cart.
+-- Returns one row per medication: ID, Qty, Ok, on-hand stock and price.
+CREATE OR ALTER PROCEDURE SP_ReserveStock
+    @Items NVARCHAR(MAX)      -- JSON: [{"mid":"M001","qty":2,"price":"3.50"}], price may be null
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DECLARE @Want TABLE (Medication_ID NVARCHAR(10) PRIMARY KEY, Qty INT, Price DECIMAL(10,2) NULL);
+    DECLARE @Got  TABLE (Medication_ID NVARCHAR(10) PRIMARY KEY);
+
+    INSERT INTO @Want(Medication_ID, Qty, Price)
+    SELECT mid, SUM(qty), MAX(price)
+    FROM OPENJSON(@Items) WITH (mid NVARCHAR(10) '$.mid', qty INT '$.qty', price DECIMAL(10,2) '$.price')
+    GROUP BY mid;
+
+    UPDATE i
+    SET Quantity = i.Quantity - w.Qty,
+        Modified_Date = SYSDATETIME()
+    OUTPUT inserted.Medication_ID INTO @Got
+    FROM Medication_Inventory i
+    JOIN @Want w ON w.Medication_ID = i.Medication_ID
+    WHERE i.Quantity >= w.Qty
+      AND (w.Price IS NULL OR i.Unit_Price = w.Price);
+
+    SELECT w.Medication_ID, w.Qty,
+           CAST(CASE WHEN g.Medication_ID IS NULL THEN 0 ELSE 1 END AS BIT) AS Ok,
+           ISNULL(i.Quantity, 0) AS Available, i.Unit_Price
+    FROM @Want w
+    LEFT JOIN @Got g ON g.Medication_ID = w.Medication_ID
+    LEFT JOIN Medication_Inventory i ON i.Medication_ID = w.Medication_ID;
+END;
+GO
+
+-- SP_CompactStockLedger: fold ledger entries into Medication_Inventory.
+-- Run every minute or so by the app (db.LedgerCompactor); one compactor at a
+-- time, while sales keep appending.  A medication whose fold would go below
+-- zero (two counters sold the last units at once) is left unfolded, so the
+-- shortfall stays visible in vw_StockOnHand until stock is received.
+CREATE OR ALTER PROCEDURE SP_CompactStockLedger
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    DECLARE @Through BIGINT, @Rows INT = 0;
+
+    BEGIN TRANSACTION;
+    EXEC sp_getapplock @Resource = 'Stock_Ledger.compact', @LockMode = 'Exclusive',
+                       @LockOwner = 'Transaction';
+
+    SELECT @Through = MAX(Entry_ID) FROM Stock_Ledger WITH (READCOMMITTEDLOCK);
+
+    -- READCOMMITTEDLOCK (not the row versions): wait for appends below
+    -- @Through that are still in flight instead of skipping them for good
+    UPDATE i
+    SET Quantity       = i.Quantity + d.Delta,
+        Ledger_Through = @Through,
+        Modified_Date  = SYSDATETIME()
+    FROM Medication_Inventory i
+    JOIN (SELECT l.Medication_ID, SUM(l.Qty_Change) AS Delta
+          FROM Stock_Ledger l WITH (READCOMMITTEDLOCK)
+          JOIN Medication_Inventory s ON s.Medication_ID = l.Medication_ID
+          WHERE l.Entry_ID > s.Ledger_Through AND l.Entry_ID <= @Through
+          GROUP BY l.Medication_ID) d ON d.Medication_ID = i.Medication_ID
+    WHERE i.Quantity + d.Delta >= 0;
+    SET @Rows = @@ROWCOUNT;
+
+    COMMIT TRANSACTION;
+    SELECT @Rows AS Folded;
+END;
+GO
+
+-- SP_RefreshSalesRollups: fold the sales after the watermark into the
+-- Sales_* rollups and move the watermark, in one transaction.  Cost is
+-- proportional to the new sales only.  Returns how many were folded.
+CREATE OR ALTER PROCEDURE SP_RefreshSalesRollups
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    DECLARE @From INT, @To INT;
+
+    BEGIN TRANSACTION;
+    EXEC sp_getapplock @Resource = 'Sales_Rollups', @LockMode = 'Exclusive',
+                       @LockOwner = 'Transaction';
+
+    SELECT @From = Last_SaleID FROM Rollup_Watermark WHERE Name = 'sales';
+    -- READCOMMITTEDLOCK: a checkout still in flight below @To is waited
+    -- for, not skipped (the watermark would pass it for good)
+    SELECT @To = MAX(SaleID) FROM Sale_Header WITH (READCOMMITTEDLOCK);
+
+    IF @To IS NULL OR @To <= @From
+    BEGIN
+        COMMIT TRANSACTION;
+        SELECT 0 AS Folded;
+        RETURN;
+    END
+
+    SELECT h.SaleID,
+           CAST(h.SaleDate AS DATE) AS Sale_Date,
+           ISNULL(h.Cashier, '') AS Cashier,
+           ISNULL(h.Total, 0) AS Total,
+           CASE WHEN h.Patient_ID IS NULL OR h.Patient_ID = 'Walk-in'
+                THEN 'Walk-in' ELSE 'Hospital' END AS Patient_Type
+    INTO #Sales
+    FROM Sale_Header h WITH (READCOMMITTEDLOCK)
+    WHERE h.SaleID > @From AND h.SaleID <= @To;
+
+    SELECT s.SaleID, s.Sale_Date, i.Medication_ID, i.Qty, i.Qty * i.UnitPrice AS Amount
+    INTO #Lines
+    FROM #Sales s
+    JOIN Sale_Item i WITH (READCOMMITTEDLOCK) ON i.SaleID = s.SaleID;
+
+    MERGE Sales_Daily AS t
+    USING (SELECT s.Sale_Date, COUNT(*) AS Sales, SUM(ISNULL(u.Units, 0)) AS Units,
+                  SUM(s.Total) AS Revenue
+           FROM #Sales s
+           LEFT JOIN (SELECT SaleID, SUM(Qty) AS Units FROM #Lines GROUP BY SaleID) u
+                  ON u.SaleID = s.SaleID
+           GROUP BY s.Sale_Date) AS d
+       ON t.Sale_Date = d.Sale_Date
+    WHEN MATCHED THEN
+        UPDATE SET Sales = t.Sales + d.Sales, Units = t.Units + d.Units,
+                   Revenue = t.Revenue + d.Revenue
+    WHEN NOT MATCHED THEN
+        INSERT (Sale_Date, Sales, Units, Revenue) VALUES (d.Sale_Date, d.Sales, d.Units, d.Revenue);
+
+    MERGE Sales_By_Medication AS t
+    USING (SELECT Medication_ID, COUNT(DISTINCT SaleID) AS Sales, SUM(Qty) AS Units,
+                  SUM(Amount) AS Revenue, MAX(Sale_Date) AS Last_Sale
+           FROM #Lines GROUP BY Medication_ID) AS d
+       ON t.Medication_ID = d.Medication_ID
+    WHEN MATCHED THEN
+        UPDATE SET Sales = t.Sales + d.Sales, Units = t.Units + d.Units,
+                   Revenue = t.Revenue + d.Revenue,
+                   Last_Sale = CASE WHEN d.Last_Sale > t.Last_Sale THEN d.Last_Sale ELSE t.Last_Sale END
+    WHEN NOT MATCHED THEN
+        INSERT (Medication_ID, Sales, Units, Revenue, Last_Sale)
+        VALUES (d.Medication_ID, d.Sales, d.Units, d.Revenue, d.Last_Sale);
+
+    MERGE Sales_By_Cashier AS t
+    USING (SELECT Cashier, COUNT(*) AS Sales, SUM(Total) AS Revenue
+           FROM #Sales GROUP BY Cashier) AS d
+       ON t.Cashier = d.Cashier
+    WHEN MATCHED THEN
+        UPDATE SET Sales = t.Sales + d.Sales, Revenue = t.Revenue + d.Revenue
+    WHEN NOT MATCHED THEN
+        INSERT (Cashier, Sales, Revenue) VALUES (d.Cashier, d.Sales, d.Revenue);
+
+    MERGE Sales_By_Patient_Type AS t
+    USING (SELECT Patient_Type, COUNT(*) AS Sales, SUM(Total) AS Revenue
+           FROM #Sales GROUP BY Patient_Type) AS d
+       ON t.Patient_Type = d.Patient_Type
+    WHEN MATCHED THEN
+        UPDATE SET Sales = t.Sales + d.Sales, Revenue = t.Revenue + d.Revenue
+    WHEN NOT MATCHED THEN
+        INSERT (Patient_Type, Sales, Revenue) VALUES (d.Patient_Type, d.Sales, d.Revenue);
+
+    UPDATE Rollup_Watermark SET Last_SaleID = @To, Refreshed_Date = SYSDATETIME()
+    WHERE Name = 'sales';
+
+    COMMIT TRANSACTION;
+    SELECT COUNT(*) AS Folded FROM #Sales;
+END;
+GO
+
+-- SP_DispenseRefills: use one refill on each of a patient's prescriptions.
+-- The check and the decrement are one UPDATE, so two counters can never
+-- hand out the same last refill.  A line is dispensed only if it is the
+-- patient's, Active, has a refill left and its drug has a price.  Returns
+-- one row per requested ID, in order, with price, stock on hand and Ok.
+CREATE OR ALTER PROCEDURE SP_DispenseRefills
+    @PatientID NVARCHAR(10),
+    @Rxs NVARCHAR(MAX)        -- JSON: ["PR001001","PR001002"]
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    DECLARE @Want TABLE (Prescription_ID NVARCHAR(10) PRIMARY KEY, Pos INT);
+    DECLARE @Done TABLE (Prescription_ID NVARCHAR(10) PRIMARY KEY, Refills_Left INT);
+
+    INSERT INTO @Want(Prescription_ID, Pos)
+    SELECT value, MIN(CAST([key] AS INT)) FROM OPENJSON(@Rxs) GROUP BY value;
+
+    UPDATE p
+    SET Refills_Remaining = p.Refills_Remaining - 1, Modified_Date = SYSDATETIME()
+    OUTPUT inserted.Prescription_ID, inserted.Refills_Remaining INTO @Done
+    FROM Prescription p
+    JOIN @Want w ON w.Prescription_ID = p.Prescription_ID
+    JOIN Medication_Inventory i ON i.Medication_ID = p.Medication_ID
+    WHERE p.Patient_ID = @PatientID AND p.Status = 'Active'
+      AND p.Refills_Remaining > 0 AND i.Unit_Price IS NOT NULL;
+
+    SELECT w.Prescription_ID, p.Medication_ID,
+           m.Generic_Name + ' (' + m.Brand_Name + ')' AS Name, p.Quantity,
+           s.Unit_Price, s.Quantity AS Stock,
+           ISNULL(d.Refills_Left, p.Refills_Remaining) AS Refills_Left,
+           CASE WHEN d.Prescription_ID IS NULL THEN 0 ELSE 1 END AS Ok
+    FROM @Want w
+    LEFT JOIN Prescription p ON p.Prescription_ID = w.Prescription_ID
+                            AND p.Patient_ID = @PatientID
+    LEFT JOIN Medication m ON m.Medication_ID = p.Medication_ID
+    LEFT JOIN vw_StockOnHand s ON s.Medication_ID = p.Medication_ID
+    LEFT JOIN @Done d ON d.Prescription_ID = w.Prescription_ID
+    ORDER BY w.Pos;
+END;
+GO
+
+-- SP_ExtendAuditYears: keep a PF_AuditYear boundary up to next January, so
+-- archived rows never pile into one open-ended last partition.  Splitting
+-- the empty future range is metadata only.  Run by DB.archive_audit.
+CREATE OR ALTER PROCEDURE SP_ExtendAuditYears
+AS
+BEGIN
+    SET NOCOUNT ON;
+    DECLARE @Next DATETIME2 = DATEFROMPARTS(YEAR(SYSDATETIME()) + 1, 1, 1), @Last DATETIME2;
+
+    SELECT @Last = MAX(CAST(v.value AS DATETIME2))
+    FROM sys.partition_range_values v
+    JOIN sys.partition_functions f ON f.function_id = v.function_id
+    WHERE f.name = 'PF_AuditYear';
+
+    WHILE @Last < @Next
+    BEGIN
+        SET @Last = DATEADD(YEAR, 1, @Last);
+        ALTER PARTITION SCHEME PS_AuditYear NEXT USED [PRIMARY];
+        ALTER PARTITION FUNCTION PF_AuditYear() SPLIT RANGE (@Last);
+    END
+
+    SELECT @Last AS Last_Boundary;
+END;
+GO
+
 -- 13. SP_GenerateNextPatientID
 -- . using
 CREATE OR ALTER PROCEDURE SP_GenerateNextPatientID
 AS
 BEGIN
     SET NOCOUNT ON;
-    DECLARE @LastID NVARCHAR(10);
-    SELECT TOP 1 @LastID = Patient_ID FROM Patient ORDER BY Patient_ID DESC;
-    IF @LastID IS NULL
-        SET @LastID = 'P000';
-    DECLARE @Num INT = CAST(SUBSTRING(@LastID, 2, LEN(@LastID)) AS INT) + 1;
-    SELECT 'P' + RIGHT('000' + CAST(@Num AS VARCHAR(3)), 3) AS NextPatientID;
+    DECLARE @Num INT = NEXT VALUE FOR dbo.Seq_PatientID;
+    SELECT 'P' + FORMAT(@Num, 'D6') AS NextPatientID;
 END;
 GO
 
@@ -660,12 +1146,8 @@ CREATE OR ALTER PROCEDURE SP_GenerateNextMedicationID
 AS
 BEGIN
     SET NOCOUNT ON;
-    DECLARE @LastID NVARCHAR(10);
-    SELECT TOP 1 @LastID = Medication_ID FROM Medication ORDER BY Medication_ID DESC;
-    IF @LastID IS NULL
-        SET @LastID = 'M000';
-    DECLARE @Num INT = CAST(SUBSTRING(@LastID, 2, LEN(@LastID)) AS INT) + 1;
-    SELECT 'M' + RIGHT('000' + CAST(@Num AS VARCHAR(3)), 3) AS NextMedicationID;
+    DECLARE @Num INT = NEXT VALUE FOR dbo.Seq_MedicationID;
+    SELECT 'M' + FORMAT(@Num, 'D6') AS NextMedicationID;
 END;
 GO
 
@@ -675,12 +1157,8 @@ CREATE OR ALTER PROCEDURE SP_GenerateNextPrescriptionID
 AS
 BEGIN
     SET NOCOUNT ON;
-    DECLARE @LastID NVARCHAR(10);
-    SELECT TOP 1 @LastID = Prescription_ID FROM Prescription ORDER BY Prescription_ID DESC;
-    IF @LastID IS NULL
-        SET @LastID = 'PR000';
-    DECLARE @Num INT = CAST(SUBSTRING(@LastID, 3, LEN(@LastID)) AS INT) + 1;
-    SELECT 'PR' + RIGHT('000' + CAST(@Num AS VARCHAR(3)), 3) AS NextPrescriptionID;
+    DECLARE @Num INT = NEXT VALUE FOR dbo.Seq_PrescriptionID;
+    SELECT 'PR' + FORMAT(@Num, 'D6') AS NextPrescriptionID;
 END;
 GO
 
@@ -761,91 +1239,77 @@ BEGIN
 END;
 GO
 
-CREATE OR ALTER TRIGGER trg_AfterSaleItem_Insert
-ON dbo.Sale_Item
-AFTER INSERT
-AS
-BEGIN
-    UPDATE inv
-    SET inv.Quantity = inv.Quantity - i.Qty
-    FROM dbo.Medication_Inventory inv
-    JOIN inserted i ON inv.Medication_ID = i.Medication_ID;
-END;
+-- trg_AfterSaleItem_Insert used to decrement stock for every Sale_Item row,
+-- on top of the decrement done by the checkout itself.  SP_SaveSale now
+-- owns the stock movement, so the trigger is dropped.
+DROP TRIGGER IF EXISTS dbo.trg_AfterSaleItem_Insert;
 GO
 
 
 
-CREATE TRIGGER trg_log_user_action
+-- The three triggers below are set-based: a multi-row UPDATE (bulk import,
+-- a sale touching several medications) is handled in one pass and every
+-- row is logged, instead of one arbitrary row picked through variables.
+
+CREATE OR ALTER TRIGGER trg_log_user_action
 ON Patient
 AFTER INSERT, UPDATE
 AS
 BEGIN
-    DECLARE @user VARCHAR(50), @action VARCHAR(50), @patient_id VARCHAR(50);
-
- 
-    SET @user = SUSER_NAME();  
-
-    SET @action = CASE 
-                     WHEN EXISTS (SELECT * FROM inserted) THEN 'Created' 
-                     ELSE 'Updated'
-                 END;
+    SET NOCOUNT ON;
+    IF NOT EXISTS (SELECT 1 FROM inserted) RETURN;
 
-    -- Convert Patient_ID (which is INT) to VARCHAR and store it in @patient_id
-    SELECT @patient_id = CAST(Patient_ID AS VARCHAR(50)) FROM inserted;
+    DECLARE @user VARCHAR(50) = SUSER_NAME(),
+            @action VARCHAR(50) = CASE WHEN EXISTS (SELECT 1 FROM deleted)
+                                       THEN 'Updated' ELSE 'Created' END;
 
-    -- Log the action in the User_Actions table
     INSERT INTO User_Actions ([User], Action, Table_Name, Record_ID, Action_Date)
-    VALUES (@user, @action, 'Patient', @patient_id, GETDATE());
-END
-
-
-
+    SELECT @user, @action, 'Patient', CAST(i.Patient_ID AS VARCHAR(50)), GETDATE()
+    FROM inserted i;
+END;
+GO
 
-CREATE TRIGGER trg_log_inventory_changes
+CREATE OR ALTER TRIGGER trg_log_inventory_changes
 ON Medication_Inventory
-AFTER UPDATE
+AFTER INSERT, UPDATE
 AS
 BEGIN
-    DECLARE @med_id VARCHAR(50), @old_qty INT, @new_qty INT, @change INT, @date DATETIME;
-
-    -- Get the medication ID and quantity changes
-    SELECT @med_id = i.Medication_ID, 
-           @old_qty = d.Quantity, 
-           @new_qty = i.Quantity, 
-           @change = i.Quantity - d.Quantity,
-           @date = GETDATE()
-    FROM inserted i
-    INNER JOIN deleted d ON i.Medication_ID = d.Medication_ID;
+    SET NOCOUNT ON;
 
-    -- Insert a record into the Medication_Inventory_Log table
-    INSERT INTO Medication_Inventory_Log (Medication_ID, Old_Quantity, New_Quantity, Quantity_Change, Change_Date)
-    VALUES (@med_id, @old_qty, @new_qty, @change, @date);
+    -- price-only updates leave the quantity alone and are not logged
+    INSERT INTO Medication_Inventory_Log (Medication_ID, Old_Quantity, New_Quantity, Quantity_Change)
+    SELECT i.Medication_ID, d.Quantity, i.Quantity, i.Quantity - ISNULL(d.Quantity, 0)
+    FROM inserted i
+    LEFT JOIN deleted d ON d.Medication_ID = i.Medication_ID
+    WHERE d.Medication_ID IS NULL OR d.Quantity <> i.Quantity;
 END;
+GO
 
-
-
-
-
-CREATE TRIGGER trg_low_stock_alert
+CREATE OR ALTER TRIGGER trg_low_stock_alert
 ON Medication_Inventory
-AFTER UPDATE
+AFTER INSERT, UPDATE
 AS
 BEGIN
-    DECLARE @med_id VARCHAR(50), @new_qty INT;
-
-    -- Capture the new quantity
-    SELECT @med_id = Medication_ID, @new_qty = inserted.Quantity
-    FROM inserted;
-
-    -- If quantity is below the threshold (e.g., 10)
-    IF @new_qty < 10
-    BEGIN
-        PRINT 'ALERT: Low stock for Medication ID ' + @med_id;
-        -- Here you can also insert into an Alerts table for further handling
-        INSERT INTO Stock_Alerts (Medication_ID, Alert_Type, Alert_Date)
-        VALUES (@med_id, 'Low Stock', GETDATE());
-    END
-END
+    SET NOCOUNT ON;
+    IF NOT UPDATE(Quantity) AND NOT UPDATE(Low_Stock_Level) AND NOT UPDATE(Restock_Level) RETURN;
+
+    -- back at or above the restock level: close the open alert
+    UPDATE a
+    SET Resolved_Date = GETDATE()
+    FROM Stock_Alerts a
+    JOIN inserted i ON i.Medication_ID = a.Medication_ID
+    WHERE a.Resolved_Date IS NULL AND i.Quantity >= i.Restock_Level;
+
+    -- below the low level: open an alert unless one is already open, so
+    -- stock hovering around the threshold raises it once
+    INSERT INTO Stock_Alerts (Medication_ID, Alert_Type, Alert_Date, Quantity)
+    SELECT i.Medication_ID, 'Low Stock', GETDATE(), i.Quantity
+    FROM inserted i
+    WHERE i.Quantity < i.Low_Stock_Level
+      AND NOT EXISTS (SELECT 1 FROM Stock_Alerts a
+                      WHERE a.Medication_ID = i.Medication_ID AND a.Resolved_Date IS NULL);
+END;
+GO
 
 SELECT * FROM sys.triggers;
 
@@ -875,6 +1339,19 @@ CREATE UNIQUE CLUSTERED INDEX IX_InventorySummary_MedID
 ON vw_InventorySummary(Medication_ID);
 GO
 
+-- stock on hand in either mode: the folded Quantity plus newer ledger entries
+-- (vw_InventorySummary shows the folded Quantity only)
+CREATE OR ALTER VIEW vw_StockOnHand
+AS
+SELECT
+    i.Medication_ID,
+    i.Quantity + ISNULL((SELECT SUM(l.Qty_Change) FROM dbo.Stock_Ledger l
+                         WHERE l.Medication_ID = i.Medication_ID
+                           AND l.Entry_ID > i.Ledger_Through), 0) AS Quantity,
+    i.Unit_Price
+FROM dbo.Medication_Inventory i;
+GO
+
 
 
 --working
@@ -900,11 +1377,49 @@ CREATE NONCLUSTERED INDEX IX_User_Role ON [User](RoleID);
 CREATE NONCLUSTERED INDEX IX_User_Active ON [User](IsActive);
 
 CREATE NONCLUSTERED INDEX IX_Patient_Email ON Patient(Email);
+-- patient search: name-prefix seeks over active patients only
+CREATE NONCLUSTERED INDEX IX_Patient_LastKey ON Patient(Last_Key, First_Key) WHERE Is_Active = 1;
+CREATE NONCLUSTERED INDEX IX_Patient_FirstKey ON Patient(First_Key, Last_Key) WHERE Is_Active = 1;
 CREATE NONCLUSTERED INDEX IX_Medication_Generic ON Medication(Generic_Name);
 CREATE NONCLUSTERED INDEX IX_Medication_Brand ON Medication(Brand_Name);
 CREATE NONCLUSTERED INDEX IX_Prescription_Patient ON Prescription(Patient_ID);
 CREATE NONCLUSTERED INDEX IX_Prescription_Medication ON Prescription(Medication_ID);
 CREATE NONCLUSTERED INDEX IX_Prescription_Status ON Prescription(Status);
+
+-- watermarks for the client-side medication catalog refresh: Row_Version
+-- here, Modified_Date on the SQLite stand-in
+CREATE NONCLUSTERED INDEX IX_Medication_Version ON Medication(Row_Version);
+CREATE NONCLUSTERED INDEX IX_Inventory_Version ON Medication_Inventory(Row_Version);
+CREATE NONCLUSTERED INDEX IX_Medication_Modified ON Medication(Modified_Date);
+CREATE NONCLUSTERED INDEX IX_Inventory_Modified ON Medication_Inventory(Modified_Date);
+CREATE NONCLUSTERED INDEX IX_StockLedger_Version ON Stock_Ledger(Row_Version) INCLUDE (Medication_ID);
+CREATE NONCLUSTERED INDEX IX_StockLedger_Date ON Stock_Ledger(Entry_Date) INCLUDE (Medication_ID);
+
+-- at most one open alert per medication; the trigger relies on it to dedupe.
+-- The old trigger raised an alert on every low-stock update and never
+-- resolved any, so first close all but the newest open alert per medication.
+UPDATE Stock_Alerts SET Resolved_Date = GETDATE()
+WHERE Resolved_Date IS NULL
+  AND EXISTS (SELECT 1 FROM Stock_Alerts n
+              WHERE n.Medication_ID = Stock_Alerts.Medication_ID
+                AND n.Resolved_Date IS NULL AND n.Alert_ID > Stock_Alerts.Alert_ID);
+CREATE UNIQUE NONCLUSTERED INDEX UX_StockAlerts_Open ON Stock_Alerts(Medication_ID) WHERE Resolved_Date IS NULL;
+CREATE NONCLUSTERED INDEX IX_InvLog_Med ON Medication_Inventory_Log(Medication_ID, Change_Date);
+CREATE NONCLUSTERED INDEX IX_StockLedger_Med ON Stock_Ledger(Medication_ID, Entry_ID) INCLUDE (Qty_Change);
+CREATE NONCLUSTERED INDEX IX_SaleItem_Sale ON Sale_Item(SaleID);
+CREATE NONCLUSTERED INDEX IX_SalesByMed_Revenue ON Sales_By_Medication(Revenue);
+CREATE NONCLUSTERED INDEX IX_SaleHeader_Date ON Sale_Header(SaleDate);
+-- "history of record X": one seek per tier, hot and archive alike
+CREATE NONCLUSTERED INDEX IX_PatientHistory_Record ON Patient_History(Patient_ID, Operation_Date);
+CREATE NONCLUSTERED INDEX IX_MedicationHistory_Record ON Medication_History(Medication_ID, Operation_Date);
+CREATE NONCLUSTERED INDEX IX_PrescriptionHistory_Record ON Prescription_History(Prescription_ID, Operation_Date);
+CREATE NONCLUSTERED INDEX IX_UserActions_Record ON User_Actions(Record_ID, Action_Date);
+CREATE NONCLUSTERED INDEX IX_StockAlerts_Med ON Stock_Alerts(Medication_ID, Alert_Date);
+CREATE NONCLUSTERED INDEX IX_PatientHistoryArchive_Record ON Patient_History_Archive(Patient_ID, Operation_Date) ON PS_AuditYear(Operation_Date);
+CREATE NONCLUSTERED INDEX IX_MedicationHistoryArchive_Record ON Medication_History_Archive(Medication_ID, Operation_Date) ON PS_AuditYear(Operation_Date);
+CREATE NONCLUSTERED INDEX IX_PrescriptionHistoryArchive_Record ON Prescription_History_Archive(Prescription_ID, Operation_Date) ON PS_AuditYear(Operation_Date);
+CREATE NONCLUSTERED INDEX IX_UserActionsArchive_Record ON User_Actions_Archive(Record_ID, Action_Date) ON PS_AuditYear(Action_Date);
+CREATE NONCLUSTERED INDEX IX_StockAlertsArchive_Med ON Stock_Alerts_Archive(Medication_ID, Alert_Date) ON PS_AuditYear(Alert_Date);
 GO
 
 
@@ -1,28 +1,25 @@
 ###############################################################################
 #  HOSPITAL / PHARMACY MANAGEMENT – PyQt5 + SQL-Server
 ###############################################################################
-from PyQt5.QtWidgets import QTabWidget
-import sys, hashlib
+import os, sys, time
+T0 = time.perf_counter()      # startup probe: cold-start times are measured from here
+
 from datetime import datetime
 from decimal import Decimal
 
-import pyodbc
-from PyQt5.QtCore    import Qt
+from PyQt5.QtCore    import Qt, QTimer
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QPushButton, QMessageBox, QTableWidget, QTableWidgetItem, QHeaderView,
-    QGroupBox, QGridLayout, QComboBox, QStackedWidget, QSpinBox
+    QGroupBox, QGridLayout, QComboBox, QStackedWidget, QSpinBox, QTableView,
+    QFileDialog, QTabWidget
 )
 
-# ─────────────────────────────────────────────────────────────────────────────
-#  DB CONNECTION  (edit if your instance differs)
-# ─────────────────────────────────────────────────────────────────────────────
-CONNECT_STRING = (
-    "DRIVER={ODBC Driver 17 for SQL Server};"
-    "SERVER=DESKTOP-PKT7RAS\\SQLEXPRESS;"
-    "DATABASE=PharmacyManagementSystem2;"
-    "Trusted_Connection=yes;"
-)
+# bulk, documents and client (asyncio via service) are imported where they're
+# first used, so none of them sit between launch and the login window
+from db import DB
+from models import PagedModel
+from workers import Runner
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  SMALL UI HELPERS
@@ -61,198 +58,30 @@ def spin(minv, maxv):
     s.setMinimumHeight(28)
     return s
 
-# ─────────────────────────────────────────────────────────────────────────────
-#  DATABASE ADAPTER  (all SQL in one place)
-# ─────────────────────────────────────────────────────────────────────────────
-class DB:
-    def __init__(self):
-        self.cn  = pyodbc.connect(CONNECT_STRING, autocommit=True)
-        self.cur = self.cn.cursor()
-
-    # auth
-    def login(self, u, p):
-        h = hashlib.sha256(p.encode()).digest()
-        self.cur.execute(
-            "SELECT r.RoleName,u.FullName "
-            "FROM [User] u JOIN Role r ON r.RoleID=u.RoleID "
-            "WHERE u.Username=? AND u.PasswordHash=? AND u.IsActive=1",
-            u, pyodbc.Binary(h)
-        )
-        r = self.cur.fetchone()
-        return (r.RoleName, r.FullName) if r else (None, None)
-
-    # patients
-    def new_pid(self):
-        self.cur.execute("EXEC SP_GenerateNextPatientID")
-        return self.cur.fetchone()[0]
-
-    def add_pat(self, p):
-        self.cur.execute(
-            "INSERT INTO Patient(Patient_ID,First_Name,Last_Name,Date_of_Birth,Gender,Email,Created_Date,Is_Active) "
-            "VALUES(?,?,?,?,?, ?,SYSDATETIME(),1)",
-            p['id'], p['first'], p['last'], p['dob'], p['gender'], p['email']
-        )
-
-    def upd_pat(self, p):
-        self.cur.execute(
-            "UPDATE Patient SET First_Name=?,Last_Name=?,Date_of_Birth=?,Gender=?,Email=?,Modified_Date=SYSDATETIME() "
-            "WHERE Patient_ID=? AND Is_Active=1",
-            p['first'], p['last'], p['dob'], p['gender'], p['email'], p['id']
-        )
-        return self.cur.rowcount
-
-    def get_pat(self, pid):
-        self.cur.execute(
-            "SELECT Patient_ID,First_Name,Last_Name,"
-            "CONVERT(varchar(10),Date_of_Birth,23) AS DOB,Gender,Email "
-            "FROM Patient WHERE Patient_ID=? AND Is_Active=1",
-            pid
-        )
-        return self.cur.fetchone()
-
-    # doctors
-    def specs(self):
-        self.cur.execute("SELECT DISTINCT Specialization FROM Doctor WHERE Is_Active=1")
-        return [r[0] for r in self.cur.fetchall()]
-
-    def docs_by_spec(self, sp):
-        self.cur.execute(
-            "SELECT Doctor_ID,Full_Name,Room_No FROM Doctor "
-            "WHERE Is_Active=1 AND Specialization=? ORDER BY Full_Name",
-            sp
-        )
-        return self.cur.fetchall()
-
-    # meds / prescriptions
-    def med_search(self, txt):
-        like = f"%{txt}%"
-        self.cur.execute("""
-            SELECT m.Generic_Name,m.Brand_Name,m.Medication_ID,
-                   ISNULL(i.Quantity,0) AS Stock
-            FROM Medication m
-            LEFT JOIN Medication_Inventory i ON i.Medication_ID=m.Medication_ID
-            WHERE m.Is_Active=1 AND (m.Generic_Name LIKE ? OR m.Brand_Name LIKE ?)
-            ORDER BY m.Generic_Name,m.Brand_Name
-        """, like, like)
-        return self.cur.fetchall()
-
-    def new_rxid(self):
-        self.cur.execute("EXEC SP_GenerateNextPrescriptionID")
-        return self.cur.fetchone()[0]
-
-    def add_rx(self, r):
-        self.cur.execute("""
-            INSERT INTO Prescription
-            (Prescription_ID,Patient_ID,Medication_ID,Prescription_Date,
-             Dosage,Quantity,Days_Supply,Refills_Authorized,Refills_Remaining,
-             Instructions,Status,Created_Date)
-            VALUES(?,?,?,?,?,?,?,?,?,'Active',SYSDATETIME())
-        """, r['id'], r['pid'], r['mid'], r['date'],
-             r['dosage'], r['qty'], r['days'], r['ref'], r['ref'], r['sig']
-        )
-
-    def rxs_of(self, pid):
-        self.cur.execute("""
-            SELECT p.Prescription_ID,p.Medication_ID,
-                   m.Generic_Name+' ('+m.Brand_Name+')',p.Dosage,
-                   p.Quantity,p.Refills_Remaining
-            FROM Prescription p
-            JOIN Medication m ON m.Medication_ID=p.Medication_ID
-            WHERE p.Patient_ID=? AND p.Status='Active'
-        """, pid)
-        return self.cur.fetchall()
-
-    # inventory / sales
-    def inv(self, mid):
-        self.cur.execute("""
-            SELECT i.Medication_ID,m.Generic_Name,m.Brand_Name,
-                   i.Quantity,i.Unit_Price
-            FROM Medication_Inventory i
-            JOIN Medication m ON m.Medication_ID=i.Medication_ID
-            WHERE i.Medication_ID=?
-        """, mid)
-        return self.cur.fetchone()
-
-    def adjust(self, mid, dq):
-        self.cur.execute(
-            "UPDATE Medication_Inventory SET Quantity=Quantity+? WHERE Medication_ID=?",
-            dq, mid
-        )
-
-    def inv_list(self, like):
-        self.cur.execute("""
-            SELECT i.Medication_ID,m.Generic_Name,m.Brand_Name,
-                   i.Quantity,i.Unit_Price
-            FROM Medication_Inventory i
-            JOIN Medication m ON m.Medication_ID=i.Medication_ID
-            WHERE (m.Generic_Name LIKE ? OR m.Brand_Name LIKE ?)
-            ORDER BY m.Generic_Name
-        """, like, like)
-        return self.cur.fetchall()
-
-    def upsert_med(self, mid, gen, br):
-        """
-        Insert new medication if it doesn't exist; otherwise update its names.
-        """
-        self.cur.execute("""
-            MERGE Medication AS tgt
-            USING (SELECT ? AS mid, ? AS gen, ? AS br) AS src
-              ON tgt.Medication_ID = src.mid
-            WHEN MATCHED THEN
-              UPDATE SET Generic_Name = src.gen,
-                         Brand_Name   = src.br
-            WHEN NOT MATCHED THEN
-              INSERT (Medication_ID, Generic_Name, Brand_Name, Is_Active)
-              VALUES (src.mid, src.gen, src.br, 1);
-        """, mid, gen, br)
-
-    def upsert_inv(self, mid, qty, prc):
-        """
-        Insert or update inventory quantity and price.
-        """
-        self.cur.execute("""
-            MERGE Medication_Inventory AS tgt
-            USING (SELECT ? AS mid, ? AS qty, ? AS prc) AS src
-              ON tgt.Medication_ID = src.mid
-            WHEN MATCHED THEN
-              UPDATE SET Quantity   = src.qty,
-                         Unit_Price = src.prc
-            WHEN NOT MATCHED THEN
-              INSERT (Medication_ID, Quantity, Unit_Price)
-              VALUES (src.mid, src.qty, src.prc);
-        """, mid, qty, prc)
-
-    def save_sale(self, cashier, pat, total, items):
-        self.cur.execute(
-            "INSERT INTO Sale_Header(Patient_ID,Cashier,Total) "
-            "OUTPUT inserted.SaleID VALUES(?,?,?)",
-            pat, cashier, total
-        )
-        sid = self.cur.fetchone()[0]
-        for mid, qty, price in items:
-            self.cur.execute(
-                "INSERT INTO Sale_Item(SaleID,Medication_ID,Qty,UnitPrice)VALUES(?,?,?,?)",
-                sid, mid, qty, price
-            )
-            self.adjust(mid, -qty)
-        return sid
-
-    def new_med_id(self):
-        """Call the SP to get the next Medication_ID (e.g. 'M001')."""
-        self.cur.execute("EXEC SP_GenerateNextMedicationID")
-        return self.cur.fetchone()[0]
-
-    def close(self):
-        self.cn.close()
+def table_view(model):
+    v = QTableView()
+    v.setModel(model)
+    v.setSelectionBehavior(QTableView.SelectRows)
+    v.setEditTriggers(QTableView.NoEditTriggers)
+    v.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    return v
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  BASE WINDOW WITH LOGOUT
 # ─────────────────────────────────────────────────────────────────────────────
 class RoleWin(QWidget):
-    def __init__(self, login, title):
+    """
+    Built on a role's first login, then reused: start() shows it for the
+    next user, logout() hides it and reset() clears the last user's work.
+    """
+    TITLE = ""
+
+    def __init__(self, login, who):
         super().__init__()
         self.login = login
-        self.setWindowTitle(title)
+        self.who   = who
+        self.setWindowTitle(f"{self.TITLE} – {who}")
+        self.bg = Runner(self)        # DB calls run off the GUI thread
         self.out_btn = modern_button("Logout ⏻", "danger")
         self.out_btn.clicked.connect(self.logout)
 
@@ -260,17 +89,44 @@ class RoleWin(QWidget):
         hbox.addStretch()
         hbox.addWidget(self.out_btn)
 
+    def start(self, who):
+        self.who = who
+        self.setWindowTitle(f"{self.TITLE} – {who}")
+        self.show()
+
+    def reset(self):
+        """Clear patient, form and cart state; each role window adds its own."""
+
     def logout(self):
         self.close()
-        self.login.show()
+        self.reset()
+        self.bg.drop()            # late results must not land in the next user's session
+        self.login.back()
+
+    def print_doc(self, kind, doc, name, title):
+        """Render once off the GUI thread: PDF under DOCS_DIR, text for the preview."""
+        import documents
+        path = os.path.join(documents.DOCS_DIR, f"{name}.pdf")
+        self.bg.run(None, documents.renderer().save, kind, doc, path,
+                    done=lambda txt: self._preview(title, txt, path))
+
+    def _preview(self, title, txt, path):
+        dlg = QMessageBox(self)
+        dlg.setWindowTitle(title)
+        dlg.setTextFormat(Qt.PlainText)
+        dlg.setText(txt)
+        dlg.setInformativeText(f"Saved to {os.path.abspath(path)}")
+        dlg.setStandardButtons(QMessageBox.Ok)
+        dlg.exec_()
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  LOGIN WINDOW
 # ─────────────────────────────────────────────────────────────────────────────
 class LoginWin(QWidget):
-    def __init__(self, db):
+    def __init__(self, db, probe):
         super().__init__()
-        self.db = db
+        self.db, self.probe = db, probe
+        self.windows = {}         # role → its window, built on first login
         self.setWindowTitle("Hospital Login")
         self.setFixedSize(350, 220)
 
@@ -281,35 +137,60 @@ class LoginWin(QWidget):
         self.p = nice_line("Password"); self.p.setEchoMode(QLineEdit.Password)
         self.msg = QLabel(); self.msg.setStyleSheet("color:red;")
 
-        btn = modern_button("Log-in", "primary")
-        btn.clicked.connect(self.go)
+        self.bg = Runner(self)
+        self.btn = modern_button("Log-in", "primary")
+        self.btn.clicked.connect(self.go)
 
-        for w in (self.u, self.p, self.msg, btn):
+        for w in (self.u, self.p, self.msg, self.btn):
             lay.addWidget(w, alignment=Qt.AlignCenter)
 
+        # connect while the user types; a login before this lands opens its own
+        self.bg.run(None, warm_up, db, done=lambda _: probe.mark("warm"), error=self._unreachable)
+
+    def _unreachable(self, e):
+        self.msg.setText(f"❌ Database unreachable: {e}")
+        if self.probe.mode == "exit":
+            QApplication.exit(1)
+
+    def paintEvent(self, e):
+        super().paintEvent(e)
+        self.probe.mark("first_paint")
+
+    def back(self):
+        self.p.clear()
+        self.msg.clear()
+        self.show()
+
     def go(self):
-        role, name = self.db.login(self.u.text().strip(), self.p.text())
+        self.bg.run("login", self.db.login, self.u.text().strip(), self.p.text(),
+                    done=self._logged_in, busy=self.btn)
+
+    def _logged_in(self, res):
+        role, name = res
         if not role:
             self.msg.setText("❌ Wrong user / password")
             return
 
-        if   role == "Intern":     self.next = Reception    (self.db, name, self)
-        elif role == "Doctor":     self.next = DoctorWindow (self.db, name, self)
-        elif role == "Pharmacist": self.next = Pharmacy     (self.db, name, self)
-        elif role == "Manager":    self.next = Manager      (self.db, name, self)
-        else:
+        cls = ROLE_WINDOWS.get(role)
+        if cls is None:
             QMessageBox.warning(self, "Error", f"Unknown role: {role}")
             return
 
-        self.next.show()
+        win = self.windows.get(role)
+        if win is None:
+            with self.db.metrics.timed(f"window.{cls.__name__}"):
+                win = self.windows[role] = cls(self.db, name, self)
+        win.start(name)
         self.hide()
 
 # ─────────────────────────────────────────────────────────────────────────────
 #  1.  RECEPTION  (Intern)
 # ─────────────────────────────────────────────────────────────────────────────
 class Reception(RoleWin):
+    TITLE = "Reception"
+
     def __init__(self, db, who, login):
-        super().__init__(login, f"Reception – {who}")
+        super().__init__(login, who)
         self.db = db
         self.setMinimumSize(800, 600)
 
@@ -329,10 +210,9 @@ class Reception(RoleWin):
         main.addLayout(srch)
 
         # Search results
-        self.search_results = QTableWidget(0, 3)
-        self.search_results.setHorizontalHeaderLabels(["Patient ID", "First Name", "Last Name"])
-        self.search_results.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.search_results.cellDoubleClicked.connect(self.load_from_row)
+        self.results = PagedModel(["Patient ID", "First Name", "Last Name"], self.bg)
+        self.search_results = table_view(self.results)
+        self.search_results.doubleClicked.connect(self.load_from_row)
         main.addWidget(self.search_results)
 
         # form -------------------------------------------------------
@@ -355,10 +235,10 @@ class Reception(RoleWin):
             form.addWidget(w, r, 1)
 
         # doctor choice ----------------------------------------
-        self.sp  = QComboBox(); self.sp.addItems(db.specs())
+        self.sp  = QComboBox()
         self.sp.currentTextChanged.connect(lambda sp: self.fill_docs(sp))
         self.doc = QComboBox()
-        self.fill_docs(self.sp.currentText())
+        # doctors come from the shared reference cache (filled by start())
 
         form.addWidget(QLabel("Specialisation"), 6, 0)
         form.addWidget(self.sp,               6, 1)
@@ -376,31 +256,29 @@ class Reception(RoleWin):
         row.addStretch()
         main.addLayout(row)
 
+    def start(self, who):
+        if not self.sp.count():   # one query per TTL, usually already cached by warm_up
+            self.bg.run("specs", self.db.refdata().specs, done=self.sp.addItems)
+        super().start(who)
+
+    def reset(self):
+        self.search_input.clear()
+        self.results.clear()
+        for w in (self.pid, self.fst, self.lst, self.dob, self.mail):
+            w.clear()
+        self.gen.setCurrentIndex(0)
+
     def search_patients(self):
         text = self.search_input.text().strip()
         if not text:
             return
+        self.results.load(lambda last, n: self.db.search_pats(text, last, n))
 
-        like = f"%{text}%"
-        self.db.cur.execute(
-            """
-            SELECT Patient_ID, First_Name, Last_Name
-            FROM Patient
-            WHERE Is_Active = 1 AND (
-                Patient_ID LIKE ? OR First_Name LIKE ? OR Last_Name LIKE ?)
-            ORDER BY Created_Date DESC
-            """, like, like, like
-        )
-        rows = self.db.cur.fetchall()
+    def load_from_row(self, ix):
+        pid = self.results.rows[ix.row()][0]
+        self.bg.run("load", self.db.get_pat, pid, done=self._show_patient)
 
-        self.search_results.setRowCount(len(rows))
-        for r, row in enumerate(rows):
-            for c, val in enumerate(row):
-                self.search_results.setItem(r, c, QTableWidgetItem(str(val)))
-
-    def load_from_row(self, row, _):
-        pid = self.search_results.item(row, 0).text()
-        rec = self.db.get_pat(pid)
+    def _show_patient(self, rec):
         if not rec:
             QMessageBox.warning(self, "Error", "Could not load patient")
             return
@@ -412,16 +290,16 @@ class Reception(RoleWin):
         self.gen.setCurrentText(rec.Gender)
 
     def fill_docs(self, sp):
+        self.bg.run("docs", self.db.refdata().docs, sp, done=self._show_docs)
+
+    def _show_docs(self, docs):
         self.doc.clear()
-        for d in self.db.docs_by_spec(sp):
+        for d in docs:
             self.doc.addItem(f"{d.Full_Name}  (Room {d.Room_No})")
 
     def collect(self):
-        pid = self.pid.text().strip()
-        if not pid:
-            pid = self.db.new_pid()
         return {
-            'id': pid,
+            'id':    self.pid.text().strip(),
             'first': self.fst.text().strip(),
             'last':  self.lst.text().strip(),
             'dob':   self.dob.text().strip(),
@@ -444,15 +322,25 @@ class Reception(RoleWin):
             QMessageBox.warning(self, "Bad date", "Use YYYY-MM-DD")
             return
 
-        self.db.add_pat(p)
-        self.pid.setText(p['id'])
-        QMessageBox.information(self, "OK", f"Patient {p['id']} added ✔")
+        def work():
+            p['id'] = self.db.new_pid()
+            self.db.add_pat(p)
+            return p['id']
+        self.bg.run(None, work, done=self._added, busy=self.sender())
+
+    def _added(self, pid):
+        self.pid.setText(pid)
+        QMessageBox.information(self, "OK", f"Patient {pid} added ✔")
 
     def upd(self):
         if not self.pid.text():
             QMessageBox.warning(self, "ID?", "Load a patient first")
             return
-        if self.db.upd_pat(self.collect()):
+        self.bg.run(None, self.db.upd_pat, self.collect(),
+                    done=self._updated, busy=self.sender())
+
+    def _updated(self, n):
+        if n:
             QMessageBox.information(self, "Saved", "Patient updated ✔")
         else:
             QMessageBox.warning(self, "Err", "ID invalid or inactive")
@@ -461,22 +349,18 @@ class Reception(RoleWin):
         if not self.pid.text():
             QMessageBox.warning(self, "No ID", "Add or load patient first")
             return
-        spec     = self.sp.currentText()
-        doc_line = self.doc.currentText()
-        lines = [
-            "================ VISIT SLIP ===============",
-            f"Patient ID : {self.pid.text()}",
-            f"Name       : {self.fst.text()} {self.lst.text()}",
-            f"Visit To   : {spec}",
-            f"Doctor     : {doc_line}",
-            "==========================================="
-        ]
-        QMessageBox.information(self, "Visit Slip", "\n".join(lines))
+        import documents
+        pid = self.pid.text()
+        doc = documents.slip(pid, f"{self.fst.text()} {self.lst.text()}",
+                             self.sp.currentText(), self.doc.currentText())
+        self.print_doc("slip", doc, f"slip-{pid}-{doc['when']:%Y%m%d-%H%M%S}", "Visit Slip")
 
 class DoctorWindow(RoleWin):
+    TITLE = "Doctor"
+
     def __init__(self, db, who, login):
-        super().__init__(login, f"Doctor – {who}")
-        self.db, self.who = db, who
+        super().__init__(login, who)
+        self.db = db
         self.setMinimumSize(1000, 600)
 
         # ─── split layout: left = work area, right = history ─────────────
@@ -513,15 +397,15 @@ class DoctorWindow(RoleWin):
         self.med_srch = nice_line("generic / brand name")
         btn_find = modern_button("Search 🔍", "secondary")
         btn_find.clicked.connect(self.med_search)
+        self.med_srch.textChanged.connect(self._type_ahead)
         mbar.addWidget(self.med_srch)
         mbar.addWidget(btn_find)
         mbar.addStretch()
         mlay.addLayout(mbar)
 
-        self.tbl_med = QTableWidget(0, 4)
-        self.tbl_med.setHorizontalHeaderLabels(["Generic", "Brand", "ID", "Stock"])
-        self.tbl_med.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_med.cellDoubleClicked.connect(self.pick_med)
+        self.meds = PagedModel(["Generic", "Brand", "ID", "Stock"], self.bg)
+        self.tbl_med = table_view(self.meds)
+        self.tbl_med.doubleClicked.connect(self.pick_med)
         mlay.addWidget(self.tbl_med)
         left.addWidget(medgrp)
 
@@ -555,10 +439,9 @@ class DoctorWindow(RoleWin):
 
         # ─── prescription history + print ───────────────────────────────
         right.addWidget(banner("Previous prescriptions"))
-        self.tbl_hist = QTableWidget(0, 6)
-        self.tbl_hist.setHorizontalHeaderLabels(
-            ["Rx ID", "Med ID", "Name", "Dosage", "Qty", "Refills"])
-        self.tbl_hist.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.history = PagedModel(
+            ["Rx ID", "Med ID", "Name", "Dosage", "Qty", "Refills"], self.bg)
+        self.tbl_hist = table_view(self.history)
         right.addWidget(self.tbl_hist)
 
         btn_print = modern_button("Generate patient form 🖶", "primary")
@@ -566,13 +449,25 @@ class DoctorWindow(RoleWin):
         right.addWidget(btn_print, alignment=Qt.AlignLeft)
 
 
+    def reset(self):
+        self.patient_id = self.patient_name = None
+        self.patient_box.setText("No patient loaded")
+        self.search_id.clear()
+        self.med_srch.clear()
+        self.meds.clear()
+        self.history.clear()
+        self.clear_form()
+
     def load_patient(self):
         pid = self.search_id.text().strip()
-        row = self.db.get_pat(pid)
+        self.bg.run("patient", self.db.get_pat, pid, done=self._show_patient)
+
+    def _show_patient(self, row):
         if not row:
             QMessageBox.warning(self, "Not found", "No active patient with that ID")
             return
-        self.patient_id = pid
+        self.patient_id = row.Patient_ID
+        self.patient_name = f"{row.First_Name} {row.Last_Name}"
         self.patient_box.setText(
             f"<b>{row.Patient_ID}</b> — {row.First_Name} {row.Last_Name}, "
             f"DOB {row.DOB}, {row.Gender}<br>Email {row.Email}"
@@ -581,19 +476,23 @@ class DoctorWindow(RoleWin):
 
 
     def med_search(self):
-        rows = self.db.med_search(self.med_srch.text().strip())
+        self.bg.run("meds", self.db.catalog().search, self.med_srch.text().strip(),
+                    done=self._meds_found)
+
+    def _meds_found(self, rows):
         if not rows:
             QMessageBox.information(self, "Not available",
                                     "No medication with that name is in stock.")
             return
-        self.tbl_med.setRowCount(len(rows))
-        for r, rec in enumerate(rows):
-            for c, val in enumerate(rec):
-                self.tbl_med.setItem(r, c, QTableWidgetItem(str(val)))
+        self.meds.set_rows(rows)
+
+    def _type_ahead(self, text):
+        # served from the in-memory catalog; a newer keystroke drops older results
+        self.bg.run("meds", self.db.catalog().search, text.strip(), done=self.meds.set_rows)
 
 
-    def pick_med(self, row, _col):
-        self.med_id.setText(self.tbl_med.item(row, 2).text())
+    def pick_med(self, ix):
+        self.med_id.setText(self.meds.rows[ix.row()][2])
         self.dosage.setFocus()
 
 
@@ -606,7 +505,6 @@ class DoctorWindow(RoleWin):
             return
 
         pr = {
-            'id':     self.db.new_rxid(),
             'pid':    self.patient_id,
             'mid':    self.med_id.text(),
             'date':   datetime.now().strftime("%Y-%m-%d"),
@@ -617,24 +515,16 @@ class DoctorWindow(RoleWin):
             'sig':    self.sig.text().strip()
         }
 
-        try:
-            # note: exactly TEN markers here to match ten values below
-            self.db.cur.execute("""
-                INSERT INTO Prescription
-                  (Prescription_ID,Patient_ID,Medication_ID,Prescription_Date,
-                   Dosage,Quantity,Days_Supply,Refills_Authorized,Refills_Remaining,
-                   Instructions,Status,Created_Date)
-                VALUES(?,?,?,?,?,?,?,?,? ,?,'Active',SYSDATETIME())
-            """,
-            pr['id'], pr['pid'], pr['mid'], pr['date'],
-            pr['dosage'], pr['qty'], pr['days'], pr['ref'], pr['ref'], pr['sig']
-            )
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save: {e}")
-            return
+        def work():
+            pr['id'] = self.db.new_rxid()
+            self.db.add_rx(pr)
+            return pr['id']
+        self.bg.run(None, work, done=self._rx_saved, busy=self.sender(),
+                    error=lambda e: QMessageBox.critical(self, "Error", f"Failed to save: {e}"))
 
+    def _rx_saved(self, rxid):
         QMessageBox.information(self, "Saved",
-                                f"Prescription {pr['id']} stored ✔")
+                                f"Prescription {rxid} stored ✔")
         self.clear_form()
         self.refresh_history()
 
@@ -649,11 +539,8 @@ class DoctorWindow(RoleWin):
 
 
     def refresh_history(self):
-        rows = self.db.rxs_of(self.patient_id)
-        self.tbl_hist.setRowCount(len(rows))
-        for r, rec in enumerate(rows):
-            for c, val in enumerate(rec):
-                self.tbl_hist.setItem(r, c, QTableWidgetItem(str(val)))
+        pid = self.patient_id
+        self.history.load(lambda last, n: self.db.rxs_of(pid, after=last, n=n))
 
 
     def generate_form(self):
@@ -661,33 +548,16 @@ class DoctorWindow(RoleWin):
             QMessageBox.warning(self, "Load patient", "No patient selected")
             return
 
-        # re-query directly so you always get the latest data
-        self.db.cur.execute("""
-            SELECT p.Prescription_ID,
-                   m.Generic_Name+' ('+m.Brand_Name+')' AS MedName,
-                   p.Dosage, p.Quantity, p.Refills_Remaining
-              FROM Prescription p
-              JOIN Medication m ON m.Medication_ID=p.Medication_ID
-             WHERE p.Patient_ID=? AND p.Status='Active'
-             ORDER BY p.Created_Date DESC
-        """, self.patient_id)
-
-        lines = [
-            "===================================================",
-            f" Doctor: {self.who}",
-            f" Patient ID: {self.patient_id}",
-            "---------------------------------------------------"
-        ]
-        for pid, name, dosage, qty, ref in self.db.cur.fetchall():
-            lines.append(f"{pid}  {name}  {dosage}  Qty:{qty}  Refills:{ref}")
-        lines.append("===================================================")
+        # re-query so you always get the latest data
+        self.bg.run("form", self.db.rxs_of, self.patient_id, True, done=self._show_form)
 
-        dlg = QMessageBox(self)
-        dlg.setWindowTitle("Prescription form preview")
-        dlg.setTextFormat(Qt.PlainText)
-        dlg.setText("\n".join(lines))
-        dlg.setStandardButtons(QMessageBox.Ok)
-        dlg.exec_()
+    def _show_form(self, rows):
+        import documents
+        doc = documents.rx_form(self.who, self.patient_id, self.patient_name,
+                                [(rx, name, dose, qty, ref, None)
+                                 for rx, _mid, name, dose, qty, ref in rows])
+        self.print_doc("rx_form", doc, f"rx-form-{self.patient_id}-{datetime.now():%Y%m%d-%H%M%S}",
+                       "Prescription form preview")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -695,13 +565,16 @@ class DoctorWindow(RoleWin):
 # ─────────────────────────────────────────────────────────────────────────────
 
 class Pharmacy(RoleWin):
+    TITLE = "Pharmacy"
+
     def __init__(self, db, who, login):
-        super().__init__(login, f"Pharmacy – {who}")
+        super().__init__(login, who)
         self.db      = db
-        self.cashier = who
         self.cart    = []  # (med_id, name, qty, unit_price, line_total)
         self.patient_id = None
         self.patient_name = None
+        import documents
+        documents.renderer().start()   # day reprints batch on it; launched from the GUI thread
 
         self.setMinimumSize(980, 600)
         main = QVBoxLayout(self)
@@ -722,12 +595,12 @@ class Pharmacy(RoleWin):
         self.w_srch = nice_line("generic / brand")
         btn_w_search = modern_button("Search 🔍", "primary")
         btn_w_search.clicked.connect(self._walkin_search)
+        self.w_srch.textChanged.connect(self._walkin_search)
         sb.addWidget(self.w_srch); sb.addWidget(btn_w_search); sb.addStretch()
         wl.addLayout(sb)
-        self.tbl_w = QTableWidget(0,5)
-        self.tbl_w.setHorizontalHeaderLabels(["Generic","Brand","ID","Stock","Unit Price"])
-        self.tbl_w.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_w.cellClicked.connect(self._on_walkin_select)
+        self.walk = PagedModel(["Generic","Brand","ID","Stock","Unit Price"], self.bg)
+        self.tbl_w = table_view(self.walk)
+        self.tbl_w.clicked.connect(self._on_walkin_select)
         wl.addWidget(self.tbl_w)
         hb = QHBoxLayout()
         hb.addWidget(QLabel("Qty:")); self.w_qty = spin(1,1); self.w_qty.setEnabled(False)
@@ -752,10 +625,9 @@ class Pharmacy(RoleWin):
         hl.addWidget(self.patient_box)
 
         # Prescription history
-        self.tbl_rx = QTableWidget(0,6)
-        self.tbl_rx.setHorizontalHeaderLabels(["Rx ID","Med ID","Name","Dosage","Qty","Refills"])
-        self.tbl_rx.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_rx.cellClicked.connect(self._on_rx_select)
+        self.rxs = PagedModel(["Rx ID","Med ID","Name","Dosage","Qty","Refills"], self.bg)
+        self.tbl_rx = table_view(self.rxs)
+        self.tbl_rx.setSelectionMode(QTableView.ExtendedSelection)
         hl.addWidget(self.tbl_rx)
         btn_rx_add = modern_button("Add Rx to cart ➕", "success")
         btn_rx_add.clicked.connect(self._add_rx)
@@ -766,12 +638,12 @@ class Pharmacy(RoleWin):
         self.h_srch = nice_line("Search Medications")
         btn_h_search = modern_button("Search Meds 🔍", "primary")
         btn_h_search.clicked.connect(self._hospital_med_search)
+        self.h_srch.textChanged.connect(self._hospital_med_search)
         mh.addWidget(self.h_srch); mh.addWidget(btn_h_search); mh.addStretch()
         hl.addLayout(mh)
-        self.tbl_h = QTableWidget(0,5)
-        self.tbl_h.setHorizontalHeaderLabels(["Generic","Brand","ID","Stock","Unit Price"])
-        self.tbl_h.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl_h.cellClicked.connect(self._on_hosp_select)
+        self.hosp = PagedModel(["Generic","Brand","ID","Stock","Unit Price"], self.bg)
+        self.tbl_h = table_view(self.hosp)
+        self.tbl_h.clicked.connect(self._on_hosp_select)
         hl.addWidget(self.tbl_h)
         btn_h_add = modern_button("Add Med to cart ➕", "success")
         btn_h_add.clicked.connect(self._add_hosp_med)
@@ -788,28 +660,41 @@ class Pharmacy(RoleWin):
 
         ft = QHBoxLayout()
         self.lbl_total = QLabel("Total: 0.00"); self.lbl_total.setStyleSheet("font-size:18px;")
-        btn_co = modern_button("Checkout 💰", "success"); btn_co.clicked.connect(self._do_checkout)
-        ft.addWidget(self.lbl_total); ft.addStretch(); ft.addWidget(btn_co)
+        self.btn_co = modern_button("Checkout 💰", "success"); self.btn_co.clicked.connect(self._do_checkout)
+        btn_day = modern_button("Reprint today's receipts", "secondary")
+        btn_day.clicked.connect(self.reprint_day)
+        ft.addWidget(self.lbl_total); ft.addStretch(); ft.addWidget(btn_day); ft.addWidget(self.btn_co)
         main.addLayout(ft)
 
+    def reset(self):
+        self.cart.clear()
+        self._refresh_cart()
+        self.patient_id = self.patient_name = None
+        self.patient_box.setText("No patient loaded")
+        for w in (self.w_srch, self.h_pid, self.h_srch):
+            w.clear()
+        for m in (self.walk, self.rxs, self.hosp):
+            m.clear()
+        self.w_qty.setEnabled(False)
+        self._sel_mid = self._h_mid = None
+
     def _walkin_search(self):
-        rows = self.db.med_search(self.w_srch.text().strip())
-        self.tbl_w.setRowCount(len(rows))
-        for r,(g,b,i,stk) in enumerate(rows):
-            price = self.db.inv(i).Unit_Price
-            for c,v in enumerate((g,b,i,stk,price)):
-                self.tbl_w.setItem(r,c,QTableWidgetItem(str(v)))
+        self.bg.run("walkin", self.db.catalog().search, self.w_srch.text().strip(), True,
+                    done=self._show_walkin)
+
+    def _show_walkin(self, rows):
+        self.walk.set_rows(rows)
         self.w_qty.setEnabled(False)
 
-    def _on_walkin_select(self, row, _):
-        stk = int(self.tbl_w.item(row,3).text())
-        self._sel_mid   = self.tbl_w.item(row,2).text()
-        self._sel_name  = f"{self.tbl_w.item(row,0).text()} ({self.tbl_w.item(row,1).text()})"
-        self._sel_price = Decimal(self.tbl_w.item(row,4).text())
+    def _on_walkin_select(self, ix):
+        gen, br, mid, stk, prc = self.walk.rows[ix.row()]
+        self._sel_mid   = mid
+        self._sel_name  = f"{gen} ({br})"
+        self._sel_price = Decimal(str(prc))
         self.w_qty.setRange(1, stk); self.w_qty.setValue(1); self.w_qty.setEnabled(True)
 
     def _add_walkin(self):
-        if not hasattr(self, "_sel_mid"):
+        if not getattr(self, "_sel_mid", None):
             QMessageBox.warning(self, "No selection", "Pick a med first")
             return
         line = self.w_qty.value() * self._sel_price
@@ -818,7 +703,9 @@ class Pharmacy(RoleWin):
 
     def _load_patient(self):
         pid = self.h_pid.text().strip()
-        rec = self.db.get_pat(pid)
+        self.bg.run("patient", self.db.get_pat, pid, done=self._show_patient)
+
+    def _show_patient(self, rec):
         if not rec:
             QMessageBox.warning(self, "Not found", "No active patient with that ID")
             return
@@ -826,49 +713,43 @@ class Pharmacy(RoleWin):
         self.patient_name = f"{rec.First_Name} {rec.Last_Name}"
         self.patient_box.setText(f"<b>{self.patient_id}</b> — {self.patient_name}")
         # load prescriptions
-        rows = self.db.rxs_of(self.patient_id)
-        self.tbl_rx.setRowCount(len(rows))
-        for r, rec in enumerate(rows):
-            for c, val in enumerate(rec):
-                self.tbl_rx.setItem(r,c,QTableWidgetItem(str(val)))
-        self._rx_sel = None
-
-    def _on_rx_select(self, row, _):
-        mid = self.tbl_rx.item(row,1).text()
-        qty = int(self.tbl_rx.item(row,4).text())
-        inv = self.db.inv(mid)
-        if not inv or inv.Unit_Price is None:
-            QMessageBox.warning(self, "Inventory Missing", "No price info available.")
-            self._rx_sel = None; return
-        self._rx_sel = {"rx_id":self.tbl_rx.item(row,0).text(),"mid":mid,
-                        "name":f"{inv.Generic_Name} ({inv.Brand_Name})",
-                        "qty":qty,"price":Decimal(inv.Unit_Price)}
+        pid = self.patient_id
+        self.rxs.load(lambda last, n: self.db.rxs_of(pid, after=last, n=n))
 
     def _add_rx(self):
-        if not getattr(self, "_rx_sel", None):
-            QMessageBox.warning(self, "No Rx", "Select a prescription first")
+        """Dispense every selected prescription in one call (one refill each)."""
+        picked = sorted({ix.row() for ix in self.tbl_rx.selectionModel().selectedRows()})
+        if not picked or not self.patient_id:
+            QMessageBox.warning(self, "No Rx", "Select one or more prescriptions first")
             return
-        s = self._rx_sel
-        # check refills
-        self.db.cur.execute("SELECT Refills_Remaining FROM Prescription WHERE Prescription_ID=?", s["rx_id"])
-        if not self.db.cur.fetchone()[0]:
-            QMessageBox.warning(self, "No Refills", "No refills remaining."); return
-        line = s["qty"] * s["price"]
-        self.cart.append((s["mid"], s["name"], s["qty"], s["price"], line))
-        self.db.cur.execute("UPDATE Prescription SET Refills_Remaining=Refills_Remaining-1 WHERE Prescription_ID=?", s["rx_id"])
+        rxids = [self.rxs.rows[r][0] for r in picked]
+        self.bg.run(None, self.db.dispense_refills, self.patient_id, rxids,
+                    done=self._rx_added, busy=self.sender())
+
+    def _rx_added(self, lines):
+        for l in lines:
+            if l.Ok:
+                price = Decimal(str(l.Unit_Price))
+                self.cart.append((l.Medication_ID, l.Name, l.Qty, price, l.Qty * price))
         self._refresh_cart()
+        bad = [f"{l.Prescription_ID}: " + ("not this patient's" if l.Medication_ID is None
+                                           else "no price on file" if l.Unit_Price is None
+                                           else "no refills remaining")
+               for l in lines if not l.Ok]
+        if bad:
+            QMessageBox.warning(self, "Not Dispensed", "\n".join(bad))
+        if any(l.Ok for l in lines):
+            pid = self.patient_id
+            self.rxs.load(lambda last, n: self.db.rxs_of(pid, after=last, n=n))
 
     def _hospital_med_search(self):
-        rows = self.db.med_search(self.h_srch.text().strip())
-        self.tbl_h.setRowCount(len(rows))
-        for r,(g,b,i,stk) in enumerate(rows):
-            price = self.db.inv(i).Unit_Price
-            for c,v in enumerate((g,b,i,stk,price)):
-                self.tbl_h.setItem(r,c,QTableWidgetItem(str(v)))
+        self.bg.run("hosp", self.db.catalog().search, self.h_srch.text().strip(), True,
+                    done=self.hosp.set_rows)
 
-    def _on_hosp_select(self, row, _):
-        stk = int(self.tbl_h.item(row,3).text()); self._h_mid = self.tbl_h.item(row,2).text()
-        self._h_price = Decimal(self.tbl_h.item(row,4).text()); self._h_qty = 1
+    def _on_hosp_select(self, ix):
+        rec = self.hosp.rows[ix.row()]
+        self._h_mid = rec[2]
+        self._h_price = Decimal(str(rec[4])); self._h_qty = 1
 
     def _add_hosp_med(self):
         if not getattr(self, '_h_mid', None) or not self.patient_id:
@@ -889,15 +770,36 @@ class Pharmacy(RoleWin):
     def _do_checkout(self):
         pid = self.patient_id or 'Walk-in'; name = self.patient_name or 'Walk-in'
         total = Decimal(self.lbl_total.text().split(':')[1])
-        items = [(m,q,p) for m,_,q,p,_ in self.cart]
-        sid = self.db.save_sale(self.cashier, pid, total, items)
-        lines = ["============== RECEIPT ==============",
-                 f"Cashier  : {self.cashier}", f"Date     : {datetime.now():%Y-%m-%d %H:%M}",
-                 "-------------------------------------"]
-        for _,n,qty,unit,line in self.cart: lines.append(f"{n} x{qty} @ {unit:.2f} = {line:.2f}")
-        lines += ["-------------------------------------", f"Total: {total:.2f}", "====================================="]
-        QMessageBox.information(self, "Receipt", "\n".join(lines))
-        self.cart.clear(); self._refresh_cart()
+        cart  = list(self.cart)
+        items = [(m,q,p) for m,_,q,p,_ in cart]
+        self.bg.run(None, self.db.checkout, self.who, pid, total, items,
+                    done=lambda res: self._checked_out(res, pid, cart, total), busy=self.btn_co)
+
+    def _checked_out(self, res, pid, cart, total):
+        if res.SaleID is not None:
+            self._receipt(res.SaleID, pid, cart, total)
+            return
+        names = {m: n for m, n, *_ in cart}
+        short = [f"{names.get(l.Medication_ID, l.Medication_ID)}: want {l.Qty}, "
+                 + (f"{l.Available} in stock" if l.Available < l.Qty
+                    else f"price is now {l.Unit_Price}")
+                 for l in res.lines if not l.Ok]
+        QMessageBox.warning(self, "Not Enough Stock",
+                            "Nothing was sold. Adjust these lines:\n\n" + "\n".join(short))
+
+    def _receipt(self, sid, pid, cart, total):
+        import documents
+        doc = documents.receipt(sid, self.who, pid, datetime.now(), total, cart)
+        self.print_doc("receipt", doc, f"receipt-{sid}", "Receipt")
+        del self.cart[:len(cart)]     # keep anything added while the sale was saving
+        self._refresh_cart()
+
+    def reprint_day(self):
+        """Today's receipts as one PDF, rendered in parallel on the document pool."""
+        import documents
+        self.bg.run("reprint", documents.batch, self.db, "receipts",
+                    done=lambda res: QMessageBox.information(
+                        self, "Receipts", f"{res[0]} receipts saved to {os.path.abspath(res[1])}"))
 
 
 
@@ -906,10 +808,11 @@ class Pharmacy(RoleWin):
 #  4.  INVENTORY (Manager)
 # ─────────────────────────────────────────────────────────────────────────────
 class Manager(RoleWin):
+    TITLE = "Inventory"
+
     def __init__(self, db, who, login):
-        super().__init__(login, f"Inventory – {who}")
+        super().__init__(login, who)
         self.db = db
-        self.setWindowTitle(f"Inventory – {who}")
         self.setMinimumSize(820, 520)
 
         main = QVBoxLayout(self)
@@ -922,24 +825,28 @@ class Manager(RoleWin):
         self.add_out(hdr)
         main.addLayout(hdr)
 
+        tabs = QTabWidget()
+        main.addWidget(tabs)
+
+        # Inventory tab
+        stock = QWidget(); sl = QVBoxLayout(stock)
+
         # ─── Search Bar ─────────────────────────────────────────────────
         search_row = QHBoxLayout()
         self.srch = nice_line("generic / brand")
         btn_search = modern_button("Search", "primary")
         btn_search.clicked.connect(self.refresh)
+        self.srch.textChanged.connect(self._filter)
         search_row.addWidget(self.srch)
         search_row.addWidget(btn_search)
         search_row.addStretch()
-        main.addLayout(search_row)
+        sl.addLayout(search_row)
 
         # ─── Inventory Table ────────────────────────────────────────────
-        self.tbl = QTableWidget(0, 5)
-        self.tbl.setHorizontalHeaderLabels(
-            ["Med ID", "Generic", "Brand", "Qty", "Price"]
-        )
-        self.tbl.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.tbl.cellClicked.connect(self.fill)
-        main.addWidget(self.tbl)
+        self.inv = PagedModel(["Med ID", "Generic", "Brand", "Qty", "Price"], self.bg)
+        self.tbl = table_view(self.inv)
+        self.tbl.clicked.connect(self.fill)
+        sl.addWidget(self.tbl)
 
         # ─── Form ───────────────────────────────────────────────────────
         form = QGridLayout()
@@ -955,7 +862,7 @@ class Manager(RoleWin):
         form.addWidget(QLabel("Qty"),       1, 2); form.addWidget(self.qty, 1, 3)
         form.addWidget(QLabel("Price"),     2, 2); form.addWidget(self.prc, 2, 3)
 
-        main.addLayout(form)
+        sl.addLayout(form)
 
         # ─── Buttons ────────────────────────────────────────────────────
         btn_row = QHBoxLayout()
@@ -966,26 +873,123 @@ class Manager(RoleWin):
         btn_row.addWidget(btn_add)
         btn_row.addWidget(btn_update)
         btn_row.addStretch()
-        main.addLayout(btn_row)
-
-        # initial load
-        self.refresh()
+        btn_import = modern_button("Import CSV…", "secondary")
+        btn_export = modern_button("Export CSV…", "secondary")
+        btn_import.clicked.connect(self.import_csv)
+        btn_export.clicked.connect(self.export_csv)
+        btn_row.addWidget(btn_import)
+        btn_row.addWidget(btn_export)
+        sl.addLayout(btn_row)
+        tabs.addTab(stock, "Inventory")
+
+        # Dashboard tab: rollups only, so it opens instantly on any history
+        dash = QWidget(); dl = QVBoxLayout(dash)
+        kr = QHBoxLayout()
+        self.kpi = QLabel("…")
+        self.kpi.setStyleSheet("border:1px solid #aaa; padding:6px;")
+        btn_dash = modern_button("Refresh", "primary")
+        btn_dash.clicked.connect(self.refresh_dashboard)
+        kr.addWidget(self.kpi, 1); kr.addWidget(btn_dash)
+        dl.addLayout(kr)
+        grid = QGridLayout()
+        self.top_sellers = PagedModel(["Med ID", "Generic", "Brand", "Units", "Revenue", "Last sale"], self.bg)
+        self.daily       = PagedModel(["Date", "Sales", "Units", "Revenue"], self.bg)
+        self.by_cashier  = PagedModel(["Cashier", "Sales", "Revenue"], self.bg)
+        self.by_patient  = PagedModel(["Customer", "Sales", "Revenue"], self.bg)
+        for k, (title, model) in enumerate((("Top sellers", self.top_sellers),
+                                            ("Last 30 days", self.daily),
+                                            ("By cashier", self.by_cashier),
+                                            ("Walk-in vs hospital", self.by_patient))):
+            box = QGroupBox(title); QVBoxLayout(box).addWidget(table_view(model))
+            grid.addWidget(box, k // 2, k % 2)
+        dl.addLayout(grid)
+        tabs.addTab(dash, "Dashboard")
+
+        # Reorder tab: last stored forecast, recomputed on demand
+        reo = QWidget(); rl = QVBoxLayout(reo)
+        rr = QHBoxLayout()
+        self.reorder_note = QLabel("Suggestions from the last forecast run.")
+        btn_fc = modern_button("Recompute", "primary")
+        btn_fc.clicked.connect(self.recompute_reorder)
+        rr.addWidget(self.reorder_note, 1); rr.addWidget(btn_fc)
+        rl.addLayout(rr)
+        self.reorder = PagedModel(["Med ID", "Generic", "Brand", "On hand", "Per day",
+                                   "Days left", "Reorder at", "Suggest"], self.bg)
+        rl.addWidget(table_view(self.reorder))
+        tabs.addTab(reo, "Reorder")
+
+        def on_tab(ix):
+            if tabs.widget(ix) is dash:
+                self.refresh_dashboard()
+            elif tabs.widget(ix) is reo:
+                self.bg.run("reorder", self.db.reorder_suggestions, done=self.reorder.set_rows)
+        tabs.currentChanged.connect(on_tab)
+        self.tabs = tabs
+
+    def start(self, who):
+        self.refresh()            # every login picks up catalog changes since the last
+        super().start(who)
+
+    def reset(self):
+        self.tabs.setCurrentIndex(0)
+        for w in (self.srch, self.mid, self.gen, self.br, self.prc):
+            w.clear()
+        self.qty.setValue(0)
+        for m in (self.inv, self.top_sellers, self.daily, self.by_cashier, self.by_patient,
+                  self.reorder):
+            m.clear()
+        self.kpi.setText("…")
 
     def refresh(self):
-        """Reload the inventory list."""
-        rows = self.db.inv_list(f"%{self.srch.text().strip()}%")
-        self.tbl.setRowCount(len(rows))
-        for r, row in enumerate(rows):
-            for c, v in enumerate(row):
-                self.tbl.setItem(r, c, QTableWidgetItem(str(v)))
-
-    def fill(self, row, _):
+        """Pull the latest catalog changes and reload the inventory list."""
+        cat, txt = self.db.catalog(), self.srch.text().strip()
+        def work():
+            cat.refresh()
+            return cat.inv_list(txt)
+        self.bg.run("list", work, done=self.inv.set_rows)
+
+    def refresh_dashboard(self):
+        """Fold in the sales since the last look, then read the rollups."""
+        def work():
+            self.db.refresh_rollups()
+            return self.db.dashboard()
+        self.bg.run("dash", work, done=self._show_dashboard)
+
+    def _show_dashboard(self, d):
+        rev, stock = d["revenue"], d["stock"]
+        money = lambda v: f"{Decimal(str(v or 0)):,.2f}"
+        self.kpi.setText(
+            f"<b>Revenue</b> today {money(rev.Today)} · 7 days {money(rev.Week)} · "
+            f"30 days {money(rev.Month)} · all time {money(rev.Total)} ({rev.Sales or 0} sales)"
+            f"<br><b>Stock value</b> {money(stock.Value)} over {stock.Items} medications")
+        self.top_sellers.set_rows(d["top"])
+        self.daily.set_rows(d["daily"])
+        self.by_cashier.set_rows(d["cashiers"])
+        self.by_patient.set_rows(d["patients"])
+
+    def recompute_reorder(self):
+        """Re-run the demand forecast, then show what is due."""
+        def work():
+            n, due, _ = self.db.refresh_forecast()
+            return n, due, self.db.reorder_suggestions()
+        def done(res):
+            n, due, rows = res
+            self.reorder_note.setText(f"{n} medications forecast, {due} due for reorder.")
+            self.reorder.set_rows(rows)
+        self.bg.run("reorder", work, done=done)
+
+    def _filter(self, *_):
+        self.bg.run("list", self.db.catalog().inv_list, self.srch.text().strip(),
+                    done=self.inv.set_rows)
+
+    def fill(self, ix):
         """Populate the form from the selected table row."""
-        self.mid.setText(self.tbl.item(row,0).text())
-        self.gen.setText(self.tbl.item(row,1).text())
-        self.br .setText(self.tbl.item(row,2).text())
-        self.qty.setValue(int(self.tbl.item(row,3).text()))
-        self.prc.setText(self.tbl.item(row,4).text())
+        mid, gen, br, qty, prc = self.inv.rows[ix.row()]
+        self.mid.setText(str(mid))
+        self.gen.setText(gen)
+        self.br .setText(br)
+        self.qty.setValue(int(qty))
+        self.prc.setText(str(prc))
 
     def add_new_med(self):
         """Add a new medication + initial inventory. Med ID field must be blank."""
@@ -1007,24 +1011,15 @@ class Manager(RoleWin):
             QMessageBox.warning(self, "Data", "Generic & Brand are required")
             return
 
-        # 1) generate new ID
-        new_mid = self.db.new_med_id()
-        self.mid.setText(str(new_mid))
-
-        # 2) insert into Medication
-        self.db.cur.execute(
-            "INSERT INTO Medication(Medication_ID,Generic_Name,Brand_Name,Is_Active) "
-            "VALUES(?,?,?,1)",
-            new_mid, gen, br
-        )
-
-        # 3) insert initial inventory
-        self.db.cur.execute(
-            "INSERT INTO Medication_Inventory(Medication_ID,Quantity,Unit_Price) "
-            "VALUES(?,?,?)",
-            new_mid, qty, price
-        )
+        def work():
+            # 1) generate new ID, 2) insert into Medication + initial inventory
+            new_mid = self.db.new_med_id()
+            self.db.add_med(new_mid, gen, br, qty, price)
+            return new_mid
+        self.bg.run(None, work, done=self._med_added, busy=self.sender())
 
+    def _med_added(self, new_mid):
+        self.mid.setText(str(new_mid))
         QMessageBox.information(self, "Saved",
                                 f"New medication added with ID {new_mid}")
         self.refresh()
@@ -1045,32 +1040,111 @@ class Manager(RoleWin):
             return
         qty = self.qty.value()
 
-        # ensure med exists
-        self.db.cur.execute("SELECT 1 FROM Medication WHERE Medication_ID=?", mid)
-        if not self.db.cur.fetchone():
-            QMessageBox.warning(self, "Missing", f"Med {mid} not found.")
-            return
-
-        # try-catch so window doesn't close
-        try:
+        def work():
+            # ensure med exists
+            if not self.db.med_exists(mid):
+                return False
             self.db.upsert_med(mid, gen, br)
             self.db.upsert_inv(mid, qty, price)
-        except Exception as e:
-            QMessageBox.critical(self, "Update Error", f"Failed to update: {e}")
-            return
+            return True
+        # error handler so window doesn't close
+        self.bg.run(None, work, done=lambda ok: self._med_updated(mid, ok), busy=self.sender(),
+                    error=lambda e: QMessageBox.critical(self, "Update Error", f"Failed to update: {e}"))
 
+    def _med_updated(self, mid, ok):
+        if not ok:
+            QMessageBox.warning(self, "Missing", f"Med {mid} not found.")
+            return
         QMessageBox.information(self, "Saved", f"Medication {mid} updated ✔")
         self.refresh()
 
+    def import_csv(self):
+        """Merge a supplier CSV (see bulk.COLUMNS) into medications + stock."""
+        path, _ = QFileDialog.getOpenFileName(self, "Import price list", "", "CSV files (*.csv)")
+        if not path:
+            return
+        import bulk
+        self.bg.run(None, bulk.import_csv, self.db, path, done=self._imported, busy=self.sender(),
+                    error=lambda e: QMessageBox.critical(self, "Import Error", f"Import failed: {e}"))
+
+    def _imported(self, res):
+        msg = f"{res.lines} lines: {res.inserted} added, {res.updated} updated"
+        if res.rejected:
+            msg += f", {len(res.rejected)} rejected\n\n" + "\n".join(
+                f"line {no}: {why}" for no, why in res.rejected[:15])
+        QMessageBox.information(self, "Import", msg)
+        self.refresh()
+
+    def export_csv(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export inventory", "inventory.csv",
+                                              "CSV files (*.csv)")
+        if not path:
+            return
+        import bulk
+        self.bg.run(None, bulk.export_csv, self.db, path, busy=self.sender(),
+                    done=lambda n: QMessageBox.information(self, "Export", f"{n} rows written to {path}"))
+
+
 
+ROLE_WINDOWS = {"Intern": Reception, "Doctor": DoctorWindow,
+                "Pharmacist": Pharmacy, "Manager": Manager}
 
 # ─────────────────────────────────────────────────────────────────────────────
+#  STARTUP
+# ─────────────────────────────────────────────────────────────────────────────
+METRICS_DIR   = os.environ.get("HMS_METRICS_DIR")   # JSON + Prometheus textfile go here
+METRICS_EVERY = 60                                    # seconds between dumps
+STARTUP_PROBE = os.environ.get("HMS_STARTUP_PROBE")  # "1": print cold-start times, "exit": and quit
+WARM_CONNECTIONS = 2                                  # login + the first window's query
+
+class StartupProbe:
+    """
+    Seconds from T0 to "first_paint" (login window drawn), "warm" (pool
+    connected, reference data cached) and "usable" (both), recorded once
+    each on db.metrics as startup.<mark>.
+    """
+    def __init__(self, metrics, mode=STARTUP_PROBE):
+        self.metrics, self.mode = metrics, mode
+        self.marks = {}
+
+    def mark(self, name):
+        if name in self.marks:
+            return
+        self.marks[name] = secs = time.perf_counter() - T0
+        self.metrics.record("startup." + name, secs)
+        if self.mode:
+            print(f"startup: {name} {secs * 1000:.0f} ms", file=sys.stderr)
+        if name != "usable" and {"first_paint", "warm"} <= self.marks.keys():
+            self.mark("usable")
+        elif name == "usable" and self.mode == "exit":
+            QApplication.quit()
+
+def warm_up(db):
+    """Background, while the login window shows: open connections, prime reference data."""
+    db.warm(WARM_CONNECTIONS)
+    if db.dialect != "remote":    # the service wants a session token for this
+        db.refdata().specs()
+
+def open_db():
+    if os.environ.get("HMS_SERVICE_URL"):
+        from client import SERVICE_URL, RemoteDB
+        return RemoteDB(SERVICE_URL)
+    return DB(warm=False)         # LoginWin warms it off the GUI thread
+
 def main():
     app   = QApplication(sys.argv)
-    db    = DB()
-    login = LoginWin(db)
+    db    = open_db()
+    login = LoginWin(db, StartupProbe(db.metrics))
     login.show()
+    if METRICS_DIR:
+        dump = QTimer(app)
+        dump.timeout.connect(lambda: db.metrics.dump(METRICS_DIR))
+        dump.start(METRICS_EVERY * 1000)
     app.exec_()
+    if METRICS_DIR:
+        db.metrics.dump(METRICS_DIR)
+    if "documents" in sys.modules:  # only once something was printed
+        sys.modules["documents"].close()
     db.close()
 
 if __name__ == "__main__":
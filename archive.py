@@ -0,0 +1,32 @@
+###############################################################################
+#  AUDIT ARCHIVE – move cold audit rows out of the hot tables (run nightly)
+###############################################################################
+import argparse, sys, time
+
+from db import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH, ARCHIVE_PAUSE
+from statements import AUDIT
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m archive",
+                                 description="Move audit rows past the hot window into the *_Archive tables.")
+    ap.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="rows newer than this stay hot")
+    ap.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="rows moved per transaction")
+    ap.add_argument("--pause", type=float, default=ARCHIVE_PAUSE, help="seconds between batches")
+    ap.add_argument("--table", action="append", choices=sorted(AUDIT), help="only this table (repeatable)")
+    a = ap.parse_args(argv)
+
+    from db import DB
+    db = DB()
+    try:
+        t = time.perf_counter()
+        moved = db.archive_audit(a.days, a.batch, a.table, a.pause)
+        for table, n in moved.items():
+            print(f"{table:22} {n:>10,} rows archived", file=sys.stderr)
+        print(f"done in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the data layer.
+
+    python -m bench                       # SQLite, default sizes
+    python -m bench --compare old.json    # flag regressions against a run
+
+datagen builds deterministic synthetic data through the normal schema,
+harness times the DB methods and writes comparable JSON.
+"""
@@ -0,0 +1,143 @@
+###############################################################################
+#  SYNTHETIC DATA – deterministic bulk load through the normal schema
+###############################################################################
+import random
+from datetime import datetime, timedelta
+
+from db import ID_DIGITS, ID_SEQUENCES
+from statements import register
+
+FIRST = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+         "David", "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+         "Thomas", "Sarah", "Ahmed", "Fatima", "Ali", "Aisha", "Omar", "Zainab", "Wei",
+         "Mei", "Raj", "Priya", "Carlos", "Sofia", "Luis", "Elena", "Ivan", "Olga"]
+LAST  = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+         "Rodriguez", "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Taylor",
+         "Thomas", "Moore", "Jackson", "Khan", "Ahmed", "Hussain", "Malik", "Chen", "Wang",
+         "Li", "Patel", "Shah", "Singh", "Kumar", "Ivanov", "Petrov", "Nguyen", "Tran"]
+SYLL  = ["ab", "ac", "al", "am", "an", "ar", "ba", "ce", "cil", "cl", "da", "de", "di",
+         "do", "fen", "fl", "ga", "gli", "ib", "in", "lo", "lin", "ma", "mi", "mox",
+         "na", "ol", "on", "pa", "pr", "pro", "ra", "ri", "sar", "ta", "te", "ti",
+         "tra", "ur", "va", "vi", "xa", "zo", "zol"]
+SUFFIX = ["ine", "ol", "ide", "ate", "ex", "in", "one", "am", "il", "an", "ium", "pril",
+          "sartan", "statin", "mab", "cillin", "azole", "mycin", "olol", "dipine"]
+DOSES = ["5 mg daily", "10 mg daily", "250 mg q8h", "500 mg q12h", "1 tab bid", "2 puffs prn"]
+
+CHUNK = 20_000      # rows per executemany / transaction
+
+register("bench.max_sale", "SELECT COALESCE(MAX(SaleID), 0) FROM Sale_Header")
+
+
+def scale(patients):
+    """Row counts that grow together, e.g. 100k patients → 10k meds, 1M Rx."""
+    return dict(patients=patients, meds=max(100, patients // 10),
+                prescriptions=patients * 10, sales=max(100, patients // 2))
+
+
+def _ids(db, kind, count):
+    """`count` IDs taken from the kind's sequence so live inserts can't collide."""
+    seq, prefix = ID_SEQUENCES[kind]
+    first = db.reserve_ids(seq, count)
+    return [f"{prefix}{first + k:0{ID_DIGITS}d}" for k in range(count)]
+
+
+def _load(db, sql, rows):
+    for k in range(0, len(rows), CHUNK):
+        with db.pool.transaction() as cur:
+            if hasattr(cur, "fast_executemany"):
+                cur.fast_executemany = True
+            cur.executemany(sql, rows[k:k + CHUNK])
+
+
+def _stamp(t):
+    return t.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate(db, patients=100_000, meds=None, prescriptions=None, sales=None,
+             seed=42, now=None):
+    """
+    Fill `db` with synthetic rows; the same seed always gives the same data
+    (IDs aside, which come from the sequences).  Returns the row counts.
+    """
+    n = scale(patients)
+    meds          = n["meds"] if meds is None else meds
+    prescriptions = n["prescriptions"] if prescriptions is None else prescriptions
+    sales         = n["sales"] if sales is None else sales
+    rnd = random.Random(seed)
+    now = now or datetime(2025, 1, 1)
+
+    # medications + stock ----------------------------------------------------
+    mids, names, seen = _ids(db, "medication", meds), [], set()
+    while len(names) < meds:
+        gen = "".join(rnd.choice(SYLL) for _ in range(rnd.randint(1, 3))) + rnd.choice(SUFFIX)
+        br  = "".join(rnd.choice(SYLL) for _ in range(2)).title() + rnd.choice(["", "x", " XR", " Forte"])
+        if (gen, br) not in seen:
+            seen.add((gen, br))
+            names.append((gen.title(), br))
+    _load(db, "INSERT INTO Medication(Medication_ID,Generic_Name,Brand_Name,Is_Active) VALUES(?,?,?,1)",
+          [(m, g, b) for m, (g, b) in zip(mids, names)])
+    stocked = [m for m in mids if rnd.random() < 0.9]
+    _load(db, "INSERT INTO Medication_Inventory(Medication_ID,Quantity,Unit_Price) VALUES(?,?,?)",
+          [(m, rnd.randint(1_000, 1_000_000), f"{rnd.uniform(0.5, 300):.2f}") for m in stocked])
+
+    # patients ---------------------------------------------------------------
+    pids = _ids(db, "patient", patients)
+    rows = []
+    for k, pid in enumerate(pids):
+        created = now - timedelta(minutes=rnd.randint(0, 5 * 365 * 24 * 60))
+        dob = now - timedelta(days=rnd.randint(365, 90 * 365))
+        rows.append((pid, rnd.choice(FIRST), rnd.choice(LAST), dob.strftime("%Y-%m-%d"),
+                     rnd.choice("MFO"), f"{pid.lower()}.{k}@bench.example", _stamp(created)))
+    _load(db, "INSERT INTO Patient(Patient_ID,First_Name,Last_Name,Date_of_Birth,Gender,Email,"
+              "Created_Date,Is_Active) VALUES(?,?,?,?,?,?,?,1)", rows)
+
+    # prescriptions: distinct meds per patient, so one Active per pair ------
+    rxids, rows, k = _ids(db, "prescription", prescriptions), [], 0
+    per = max(1, prescriptions // max(1, patients))
+    while k < prescriptions:
+        pid = pids[rnd.randrange(patients)]
+        for mid in rnd.sample(mids, min(per, meds, prescriptions - k)):
+            refills = rnd.randint(0, 5)
+            status = "Active" if rnd.random() < 0.3 else rnd.choice(["Completed", "Cancelled"])
+            when = now - timedelta(days=rnd.randint(0, 3 * 365))
+            rows.append((rxids[k], pid, mid, when.strftime("%Y-%m-%d"), rnd.choice(DOSES),
+                         rnd.randint(1, 90), rnd.randint(1, 90), refills, rnd.randint(0, refills),
+                         status, _stamp(when)))
+            k += 1
+    # a patient drawn twice could repeat a pair; keep one Active per pair
+    active = set()
+    for j, r in enumerate(rows):
+        if r[9] == "Active":
+            if (r[1], r[2]) in active:
+                rows[j] = r[:9] + ("Completed",) + r[10:]
+            active.add((r[1], r[2]))
+    _load(db, "INSERT INTO Prescription(Prescription_ID,Patient_ID,Medication_ID,Prescription_Date,"
+              "Dosage,Quantity,Days_Supply,Refills_Authorized,Refills_Remaining,Status,Created_Date) "
+              "VALUES(?,?,?,?,?,?,?,?,?,?,?)", rows)
+
+    # sales history: headers get explicit IDs so items can point at them ----
+    base = (db._one("bench.max_sale")[0] or 0) + 1
+    heads, items = [], []
+    for s in range(sales):
+        sid, lines, total = base + s, [], 0.0
+        for mid in rnd.sample(stocked, min(len(stocked), rnd.randint(1, 4))):
+            qty, price = rnd.randint(1, 5), round(rnd.uniform(0.5, 300), 2)
+            lines.append((sid, mid, qty, f"{price:.2f}"))
+            total += qty * price
+        pat = pids[rnd.randrange(patients)] if rnd.random() < 0.6 else "Walk-in"
+        when = now - timedelta(minutes=rnd.randint(0, 365 * 24 * 60))
+        heads.append((sid, pat, "bench", f"{total:.2f}", _stamp(when)))
+        items += lines
+    ident = db.dialect == "mssql"
+    for k in range(0, len(heads), CHUNK):
+        with db.pool.transaction() as cur:
+            if ident:
+                cur.execute("SET IDENTITY_INSERT Sale_Header ON")
+            cur.executemany("INSERT INTO Sale_Header(SaleID,Patient_ID,Cashier,Total,SaleDate) "
+                            "VALUES(?,?,?,?,?)", heads[k:k + CHUNK])
+            if ident:
+                cur.execute("SET IDENTITY_INSERT Sale_Header OFF")
+    _load(db, "INSERT INTO Sale_Item(SaleID,Medication_ID,Qty,UnitPrice) VALUES(?,?,?,?)", items)
+
+    return {"patients": patients, "meds": meds, "stocked": len(stocked),
+            "prescriptions": prescriptions, "sales": sales, "sale_items": len(items)}
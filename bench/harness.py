@@ -0,0 +1,214 @@
+###############################################################################
+#  BENCHMARK HARNESS – time every DB method at several data sizes
+###############################################################################
+import argparse, json, os, platform, random, sqlite3, statistics, sys, tempfile, time
+from datetime import datetime
+from decimal import Decimal
+
+from db import DB, ID_BLOCK, SqliteBackend
+from statements import INT, register
+from bench.datagen import generate, scale
+
+SIZES     = (1_000, 10_000, 100_000)    # patients; the other tables scale with it
+REPEAT    = 200                         # timed calls per method
+WARMUP    = 5
+TOLERANCE = 0.25                        # p50 slowdown reported by --compare
+
+# cases that change data (sales, refills, stock levels, sequence numbers):
+# always run on the generated SQLite files, on a live server only with
+# --allow-writes, which is meant for a scratch copy
+WRITES = {"save_sale", "checkout", "dispense_refills", "upsert_med", "upsert_inv",
+          "new_pid", "new_rxid", "new_med_id", "reserve_ids"}
+
+register("bench.patients", *(
+    f"SELECT {top}Patient_ID, First_Name, Last_Name FROM Patient "
+    f"WHERE Is_Active = 1 ORDER BY Patient_ID{limit}"
+    for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))), types=(INT,))
+register("bench.meds", *(
+    f"SELECT {top}m.Medication_ID, m.Generic_Name, m.Brand_Name, i.Unit_Price "
+    f"FROM Medication m JOIN Medication_Inventory i ON i.Medication_ID = m.Medication_ID "
+    f"ORDER BY m.Medication_ID{limit}"
+    for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))), types=(INT,))
+
+
+def _samples(db, rnd, n=2000):
+    """Real keys from the database so lookups hit (and miss) like a user would."""
+    pats = db._page("bench.patients", n)
+    meds = db._page("bench.meds", n)
+    if not pats or not meds:
+        raise SystemExit("benchmark database has no patients or stocked medications")
+    return [tuple(p) for p in pats], [tuple(m) for m in meds]
+
+
+def cases(db, rnd):
+    """(name, call) pairs; each call draws its own arguments from `rnd`."""
+    pats, meds = _samples(db, rnd)
+    pick_pat   = lambda: rnd.choice(pats)
+    pick_med   = lambda: rnd.choice(meds)
+    cart       = lambda: [(m[0], 1, Decimal(str(m[3]))) for m in rnd.sample(meds, 3)]
+    cat        = db.catalog()
+
+    def sale():
+        items = cart()
+        return db.save_sale("bench", pick_pat()[0], sum(q * p for _, q, p in items), items)
+
+    def checkout():
+        items = cart()
+        return db.checkout("bench", pick_pat()[0], sum(q * p for _, q, p in items), items)
+
+    def refills():
+        pid = pick_pat()[0]
+        return db.dispense_refills(pid, [r[0] for r in db.rxs_of(pid)])
+
+    def upsert_med():
+        mid, gen, br, _ = pick_med()
+        return db.upsert_med(mid, gen, br)
+
+    def upsert_inv():
+        mid, *_, price = pick_med()
+        return db.upsert_inv(mid, rnd.randint(1_000, 100_000), Decimal(str(price)))
+
+    return [
+        ("login",             lambda: db.login("pharm1", "pharm123")),
+        ("get_pat",           lambda: db.get_pat(pick_pat()[0])),
+        ("search_pats_id",    lambda: db.search_pats(pick_pat()[0])),
+        ("search_pats_name",  lambda: db.search_pats(pick_pat()[2][:3])),
+        ("search_pats_full",  lambda: db.search_pats(" ".join(pick_pat()[1:]))),
+        ("med_search",        lambda: db.med_search(pick_med()[1][:4])),
+        ("med_search_priced", lambda: db.med_search(pick_med()[1][:4], True)),
+        ("catalog_search",    lambda: cat.search(pick_med()[1][:4], True)),
+        ("rxs_of",            lambda: db.rxs_of(pick_pat()[0])),
+        ("inv",               lambda: db.inv(pick_med()[0])),
+        ("inv_many",          lambda: db.inv_many([m[0] for m in rnd.sample(meds, 50)])),
+        ("inv_list",          lambda: db.inv_list(pick_med()[1][:3])),
+        ("save_sale",         sale),
+        ("checkout",          checkout),
+        ("dispense_refills",  refills),
+        ("upsert_med",        upsert_med),
+        ("upsert_inv",        upsert_inv),
+        ("new_pid",           db.new_pid),
+        ("new_rxid",          db.new_rxid),
+        ("new_med_id",        db.new_med_id),
+        ("reserve_ids",       lambda: db.reserve_ids("Seq_PatientID", ID_BLOCK)),
+    ]
+
+
+def _pct(xs, p):
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+
+def time_call(fn, repeat=REPEAT, warmup=WARMUP):
+    for _ in range(warmup):
+        fn()
+    ms = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        ms.append((time.perf_counter() - t) * 1000)
+    ms.sort()
+    return {"n": repeat, "min_ms": ms[0], "p50_ms": _pct(ms, 50), "p95_ms": _pct(ms, 95),
+            "p99_ms": _pct(ms, 99), "mean_ms": statistics.fmean(ms), "max_ms": ms[-1]}
+
+
+def run(db, repeat=REPEAT, seed=42, only=None, writes=True):
+    rnd, out = random.Random(seed), {}
+    for name, fn in cases(db, rnd):
+        if (only and name not in only) or (name in WRITES and not writes):
+            continue
+        out[name] = time_call(fn, repeat)
+        print(f"  {name:<18} p50 {out[name]['p50_ms']:8.3f} ms   p95 {out[name]['p95_ms']:8.3f} ms",
+              file=sys.stderr)
+    return out
+
+
+def run_sqlite(patients, workdir, repeat=REPEAT, seed=42, only=None, keep=False, stock_mode="row"):
+    path = os.path.join(workdir, f"bench-{patients}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    db = DB(SqliteBackend(path), stock_mode=stock_mode)
+    try:
+        t = time.perf_counter()
+        rows = generate(db, patients, seed=seed)
+        load_s = time.perf_counter() - t
+        print(f"[{patients}] loaded {rows} in {load_s:.1f}s", file=sys.stderr)
+        return {"rows": rows, "load_s": load_s, "methods": run(db, repeat, seed, only)}
+    finally:
+        db.close()
+        if not keep:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+def compare(base, cur, tolerance=TOLERANCE):
+    """[(size, method, base_p50, p50, ratio)] for methods that got slower."""
+    slow = []
+    for size, res in cur["results"].items():
+        old = base.get("results", {}).get(size)
+        if not old:
+            continue
+        for name, st in res["methods"].items():
+            b = old["methods"].get(name)
+            if b and b["p50_ms"] > 0 and st["p50_ms"] / b["p50_ms"] > 1 + tolerance:
+                slow.append((size, name, b["p50_ms"], st["p50_ms"], st["p50_ms"] / b["p50_ms"]))
+    return slow
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bench", description="Time the DB methods.")
+    ap.add_argument("--backend", choices=["sqlite", "mssql"], default="sqlite",
+                    help="mssql times the read-only methods on the configured server "
+                         "(no data is generated)")
+    ap.add_argument("--allow-writes", action="store_true",
+                    help="with --backend mssql, also time the methods that write: they ring "
+                         "up sales, use refills and overwrite stock, so only on a scratch database")
+    ap.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                    help="patient counts for the sqlite runs, comma separated")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", help="comma separated method names")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--workdir", default=tempfile.gettempdir())
+    ap.add_argument("--keep", action="store_true", help="keep the generated sqlite files")
+    ap.add_argument("--stock-mode", choices=["row", "ledger"], default="row")
+    ap.add_argument("--compare", metavar="BASE_JSON", help="report p50 regressions against a previous run")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    a = ap.parse_args(argv)
+    only = set(a.only.split(",")) if a.only else None
+
+    results = {}
+    if a.backend == "mssql":
+        if not a.allow_writes:
+            print("read-only run: " + ", ".join(sorted(WRITES)) + " skipped (see --allow-writes)",
+                  file=sys.stderr)
+        db = DB()
+        try:
+            results["live"] = {"rows": None, "load_s": None,
+                               "methods": run(db, a.repeat, a.seed, only, a.allow_writes)}
+        finally:
+            db.close()
+    else:
+        for size in (int(s) for s in a.sizes.split(",")):
+            results[str(size)] = run_sqlite(size, a.workdir, a.repeat, a.seed, only, a.keep,
+                                            a.stock_mode)
+
+    doc = {
+        "meta": {"backend": a.backend, "when": datetime.now().isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "machine": platform.platform(), "repeat": a.repeat, "seed": a.seed,
+                 "stock_mode": a.stock_mode, "writes": a.backend == "sqlite" or a.allow_writes,
+                 "scale": {s: scale(int(s)) for s in results if s.isdigit()}},
+        "results": results,
+    }
+    with open(a.out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+    print(f"wrote {a.out}", file=sys.stderr)
+
+    if a.compare:
+        with open(a.compare, encoding="utf-8") as f:
+            slow = compare(json.load(f), doc, a.tolerance)
+        for size, name, old, new, ratio in slow:
+            print(f"REGRESSION [{size}] {name}: p50 {old:.3f} → {new:.3f} ms (x{ratio:.2f})")
+        if slow:
+            sys.exit(1)
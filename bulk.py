@@ -0,0 +1,164 @@
+###############################################################################
+#  BULK IMPORT / EXPORT – streaming CSV in and out of the medication catalog
+###############################################################################
+import argparse, csv, sys, uuid
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+CHUNK = 1000        # CSV lines staged and merged per transaction
+PAGE  = 2000        # rows per export page
+
+# CSV header, matched case-insensitively; Medication_ID and Quantity may be
+# blank (match by name / allocate an ID, keep the current stock)
+COLUMNS  = ("Medication_ID", "Generic_Name", "Brand_Name", "Quantity", "Unit_Price")
+REQUIRED = ("Generic_Name", "Brand_Name", "Unit_Price")
+EXPORT   = COLUMNS + ("TotalValue",)
+
+ImportResult = namedtuple("ImportResult", "lines inserted updated rejected")
+
+
+def _line(no, rec):
+    """One CSV record → staged row, or raise ValueError with the reason."""
+    mid = rec.get("medication_id", "").strip().upper() or None
+    gen = rec.get("generic_name", "").strip()
+    br  = rec.get("brand_name", "").strip()
+    qty = rec.get("quantity", "").strip()
+    prc = rec.get("unit_price", "").strip()
+    if not gen or not br:
+        raise ValueError("generic and brand name are required")
+    if len(gen) > 100 or len(br) > 100 or (mid and len(mid) > 10):
+        raise ValueError("value too long")
+    try:
+        qty = int(qty) if qty else None
+    except ValueError:
+        raise ValueError(f"bad quantity {qty!r}") from None
+    try:
+        prc = Decimal(prc).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise ValueError(f"bad price {prc!r}") from None
+    if (qty is not None and qty < 0) or prc < 0 or prc >= Decimal("1e8"):
+        raise ValueError("quantity and price must be in range")
+    return (no, mid, gen, br, qty, prc)
+
+
+def _dedupe(rows):
+    """
+    Keep the last line per Medication_ID, and per name pair among lines
+    without an ID, so no medication is merged twice in one chunk.
+    """
+    seen_id, seen_name, keep, dropped = set(), set(), [], []
+    for r in reversed(rows):
+        name = (r[2].casefold(), r[3].casefold())
+        if r[1] in seen_id if r[1] else name in seen_name:
+            dropped.append((r[0], "superseded by a later line"))
+            continue
+        seen_id.add(r[1])
+        seen_name.add(name)
+        keep.append(r)
+    return keep[::-1], dropped
+
+
+def read_chunks(f, chunk=CHUNK):
+    """
+    Yield ([staged rows], [(line_no, error)]) per `chunk` data lines of an
+    open CSV file, without reading the whole file.
+    """
+    reader = csv.DictReader(f)
+    head = {(h or "").strip().lower() for h in reader.fieldnames or ()}
+    missing = [c for c in REQUIRED if c.lower() not in head]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    rows, bad = [], []
+    for rec in reader:
+        rec = {(k or "").strip().lower(): v or "" for k, v in rec.items()}
+        try:
+            rows.append(_line(reader.line_num, rec))
+        except ValueError as e:
+            bad.append((reader.line_num, str(e)))
+        if len(rows) + len(bad) >= chunk:
+            yield rows, bad
+            rows, bad = [], []
+    if rows or bad:
+        yield rows, bad
+
+
+def import_csv(db, path, chunk=CHUNK, progress=None):
+    """
+    Stream `path` into Medication / Medication_Inventory, one staged
+    set-based merge per chunk (DB.import_chunk).  A failed chunk rolls back
+    alone; earlier chunks stay committed.  Returns an ImportResult.
+    """
+    batch = str(uuid.uuid4())
+    lines = inserted = updated = 0
+    rejected = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for rows, bad in read_chunks(f, chunk):
+            rows, dup = _dedupe(rows)
+            lines += len(rows) + len(dup) + len(bad)
+            rejected += bad + dup
+            if rows:
+                ins, upd, rej = db.import_chunk(batch, rows)
+                inserted, updated = inserted + ins, updated + upd
+                rejected += rej
+            if progress:
+                progress(lines)
+    return ImportResult(lines, inserted, updated, sorted(rejected))
+
+
+def export_csv(db, path, page=PAGE):
+    """Write the inventory summary to `path` page by page; returns the row count."""
+    n, after = 0, ""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f)
+        out.writerow(EXPORT)
+        while True:
+            rows = db.inventory_summary(after, page)
+            out.writerows(rows)
+            n += len(rows)
+            if len(rows) < page:
+                return n
+            after = rows[-1][0]
+
+
+def write_rejects(path, rejected):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        out = csv.writer(f)
+        out.writerow(("Line", "Error"))
+        out.writerows(rejected)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bulk",
+                                 description="Bulk CSV import / export of the medication inventory.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="merge a CSV price list into the inventory")
+    imp.add_argument("csv")
+    imp.add_argument("--chunk", type=int, default=CHUNK)
+    imp.add_argument("--rejects", metavar="CSV", help="write rejected lines and reasons here")
+    exp = sub.add_parser("export", help="write the inventory summary to a CSV")
+    exp.add_argument("csv")
+    exp.add_argument("--page", type=int, default=PAGE)
+    a = ap.parse_args(argv)
+
+    from db import DB
+    db = DB()
+    try:
+        if a.cmd == "export":
+            print(f"exported {export_csv(db, a.csv, a.page)} rows to {a.csv}", file=sys.stderr)
+            return
+        res = import_csv(db, a.csv, a.chunk,
+                         progress=lambda n: print(f"  {n} lines", file=sys.stderr))
+        print(f"{res.lines} lines: {res.inserted} inserted, {res.updated} updated, "
+              f"{len(res.rejected)} rejected", file=sys.stderr)
+        if a.rejects:
+            write_rejects(a.rejects, res.rejected)
+        for no, why in res.rejected[:20]:
+            print(f"  line {no}: {why}", file=sys.stderr)
+        if res.rejected:
+            sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+###############################################################################
+#  MEDICATION CATALOG – client-side cache with type-ahead indexes
+###############################################################################
+import threading, time, unicodedata
+from collections import namedtuple
+
+Med    = namedtuple("Med", "Medication_ID Generic_Name Brand_Name Is_Active Quantity Unit_Price")
+Hit    = namedtuple("Hit", "Generic_Name Brand_Name Medication_ID Stock")
+Priced = namedtuple("Priced", "Generic_Name Brand_Name Medication_ID Stock Unit_Price")
+InvRow = namedtuple("InvRow", "Medication_ID Generic_Name Brand_Name Quantity Unit_Price")
+
+MAX_AGE   = 10      # seconds before a search pulls the latest changes
+FUZZY_MIN = 0.3     # trigram similarity needed for a typo match
+
+
+def norm(s):
+    """lower-case, accent-free, punctuation → space"""
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    return " ".join("".join(c if c.isalnum() else " " for c in s).split())
+
+
+def trigrams(s, pad=True):
+    if pad:
+        s = f"  {s} "
+    return {s[k:k + 3] for k in range(len(s) - 2)}
+
+
+def similarity(a, b):
+    ga, gb = trigrams(a), trigrams(b)
+    return len(ga & gb) / len(ga | gb) if ga or gb else 0.0
+
+
+class _Node:
+    __slots__ = ("kids", "ids")
+
+    def __init__(self):
+        self.kids = {}
+        self.ids  = set()     # every med with a word passing through this node
+
+
+class Trie:
+    """Word-prefix index: prefix → set of Medication_IDs."""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, word, mid):
+        n = self.root
+        for ch in word:
+            n = n.kids.setdefault(ch, _Node())
+            n.ids.add(mid)
+
+    def remove(self, word, mid):
+        n = self.root
+        for ch in word:
+            n = n.kids.get(ch)
+            if n is None:
+                return
+            n.ids.discard(mid)
+
+    def find(self, prefix):
+        n = self.root
+        for ch in prefix:
+            n = n.kids.get(ch)
+            if n is None:
+                return set()
+        return n.ids
+
+
+class MedCatalog:
+    """
+    In-memory copy of Medication + Medication_Inventory.
+
+    refresh() pulls only rows written since the watermark taken before the
+    last load (DB.catalog_mark), so keeping the cache current costs one
+    small query.  search() never touches the server unless the copy is
+    older than MAX_AGE; one caller loads while the others keep searching
+    the copy they have.
+    """
+
+    def __init__(self, db, max_age=MAX_AGE):
+        self.db       = db
+        self.max_age  = max_age
+        self.meds     = {}           # Medication_ID → Med
+        self._keys    = {}           # Medication_ID → normalised "generic brand"
+        self._trie    = Trie()
+        self._grams   = {}           # trigram → {Medication_ID}
+        self._mark    = None         # DB.catalog_mark() taken before the last load
+        self._fetched = 0.0
+        self._lock    = threading.RLock()     # the indexes
+        self._load    = threading.RLock()     # one refresh at a time
+
+    # loading ---------------------------------------------------------------
+    def refresh(self, full=False):
+        with self._load:
+            full = full or self._mark is None
+            mark = self.db.catalog_mark()
+            rows = self.db.catalog_rows(None if full else self._mark)
+            with self._lock:
+                if full:
+                    self.meds.clear(); self._keys.clear()
+                    self._trie = Trie(); self._grams.clear()
+                for r in rows:        # _put replaces: rows read twice are harmless
+                    self._put(Med(r.Medication_ID, r.Generic_Name, r.Brand_Name,
+                                  bool(r.Is_Active), r.Quantity, r.Unit_Price))
+                self._mark, self._fetched = mark, time.monotonic()
+            return len(rows)
+
+    def _stale(self):
+        return not self._fetched or time.monotonic() - self._fetched > self.max_age
+
+    def _fresh(self):
+        if self._stale():
+            with self._load:
+                if self._stale():     # another caller may have loaded while we waited
+                    self.refresh()
+
+    def _put(self, med):
+        mid = med.Medication_ID
+        self._drop(mid)
+        self.meds[mid] = med
+        key = self._keys[mid] = norm(f"{med.Generic_Name} {med.Brand_Name}")
+        for w in set(key.split()):
+            self._trie.add(w, mid)
+        for g in trigrams(key):
+            self._grams.setdefault(g, set()).add(mid)
+
+    def _drop(self, mid):
+        key = self._keys.pop(mid, None)
+        if key is None:
+            return
+        self.meds.pop(mid, None)
+        for w in set(key.split()):
+            self._trie.remove(w, mid)
+        for g in trigrams(key):
+            ids = self._grams.get(g)
+            if ids:
+                ids.discard(mid)
+
+    # lookups ---------------------------------------------------------------
+    def _match(self, txt, limit=None):
+        """
+        Ranked Medication_IDs for `txt`: word-prefix hits first, then plain
+        substring hits (the old LIKE '%txt%'), then typo-tolerant trigram hits.
+        """
+        q = norm(txt)
+        order = lambda ids: sorted(ids, key=lambda m: self._keys[m])
+        if not q:
+            return order(self._keys)
+
+        words = q.split()
+        pref = set(self._trie.find(words[0]))
+        for w in words[1:]:
+            pref &= self._trie.find(w)
+        out = order(pref)
+        if limit and len(out) >= limit:
+            return out[:limit]
+
+        # unpadded grams: a substring need not start on a word boundary
+        inner = trigrams(q, pad=False)
+        if inner:
+            cand = None
+            for g in sorted(inner, key=lambda g: len(self._grams.get(g, ()))):
+                cand = set(self._grams.get(g, ())) if cand is None else cand & self._grams.get(g, set())
+                if not cand:
+                    break
+        else:
+            cand = set(self._keys)
+        out += order(m for m in (cand or set()) - pref if q in self._keys[m])
+        if (limit and len(out) >= limit) or len(q) < 3:
+            return out[:limit] if limit else out
+
+        # typo tolerance: best trigram similarity against the whole name or any word
+        grams, seen, hits = trigrams(q), set(out), {}
+        for g in grams:
+            for m in self._grams.get(g, ()):
+                hits[m] = hits.get(m, 0) + 1
+        need = FUZZY_MIN * len(grams)     # fewer shared grams can't reach FUZZY_MIN
+        fuzzy = []
+        for m in [m for m, n in hits.items() if n >= need and m not in seen]:
+            key = self._keys[m]
+            sim = max(similarity(q, w) for w in [key] + key.split())
+            if sim >= FUZZY_MIN:
+                fuzzy.append((-sim, key, m))
+        out += [m for *_, m in sorted(fuzzy)]
+        return out[:limit] if limit else out
+
+    def search(self, txt, priced=False, limit=None):
+        """Same shape as DB.med_search: active meds, priced=True needs inventory."""
+        self._fresh()
+        with self._lock:
+            rows = []
+            for mid in self._match(txt):
+                m = self.meds[mid]
+                if not m.Is_Active or (priced and m.Quantity is None):
+                    continue
+                stock = m.Quantity or 0
+                rows.append(Priced(m.Generic_Name, m.Brand_Name, mid, stock, m.Unit_Price) if priced
+                            else Hit(m.Generic_Name, m.Brand_Name, mid, stock))
+                if limit and len(rows) >= limit:
+                    break
+            return rows
+
+    def inv_list(self, txt):
+        """Same shape as DB.inv_list: every med that has an inventory row."""
+        self._fresh()
+        with self._lock:
+            return [InvRow(m.Medication_ID, m.Generic_Name, m.Brand_Name, m.Quantity, m.Unit_Price)
+                    for m in map(self.meds.get, self._match(txt)) if m.Quantity is not None]
+
+    def get(self, mid):
+        self._fresh()
+        return self.meds.get(mid)
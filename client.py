@@ -0,0 +1,121 @@
+###############################################################################
+#  CLIENT MODE – the DB interface, served by service.py instead of pyodbc
+###############################################################################
+import functools, http.client, os, threading
+from urllib.parse import urlsplit
+
+from db import OutOfStock, PoolTimeout
+from metrics import Metrics
+from service import API, READS, dumps, loads
+
+# set to e.g. http://pharmacy-srv:8765 to run the windows against the service
+SERVICE_URL = os.environ.get("HMS_SERVICE_URL")
+TIMEOUT     = 60       # seconds per request
+
+
+class ServiceError(RuntimeError):
+    """The service answered with an error it has no local exception type for."""
+
+
+class _Remote:
+    """Stands in for db.catalog() / db.refdata(): calls run on the service's copy."""
+
+    def __init__(self, rdb, owner):
+        self._rdb, self._owner = rdb, owner
+
+    def __getattr__(self, attr):
+        name = f"{self._owner}.{attr}"
+        if name not in API:
+            raise AttributeError(attr)
+        return functools.partial(self._rdb._call, name)
+
+
+class RemoteDB:
+    """
+    Same calls as db.DB, each one POSTed to the service.  One keep-alive
+    connection per thread (the windows' Runner threads), so the service
+    sees a few sockets per counter and the DB sees only its own pool.
+    login() keeps the session token for the calls that follow.
+    """
+    dialect = "remote"
+
+    def __init__(self, url=SERVICE_URL, timeout=TIMEOUT):
+        u = urlsplit(url)
+        self.host, self.port = u.hostname, u.port or 80
+        self.timeout = timeout
+        self.token   = None
+        self.metrics = Metrics()
+        self._local  = threading.local()
+        self._conns  = []
+        self._lock   = threading.Lock()
+        self._catalog = _Remote(self, "catalog")
+        self._refdata = _Remote(self, "refdata")
+
+    def _conn(self):
+        cn = getattr(self._local, "cn", None)
+        if cn is None:
+            cn = self._local.cn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            with self._lock:
+                self._conns.append(cn)
+        return cn
+
+    def _post(self, path, payload, retry=False):
+        body = dumps(payload)
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in (1, 2):
+            cn = self._conn()
+            try:
+                cn.request("POST", path, body, headers)
+                res = cn.getresponse()
+                data = res.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # the service dropped an idle keep-alive socket: reconnect, and
+                # resend only reads (a write may have gone through)
+                cn.close()
+                if attempt == 2 or not retry:
+                    raise
+        out = loads(data) if data else {}
+        if res.status == 200:
+            return out
+        err, msg = out.get("error"), out.get("message", f"HTTP {res.status}")
+        if err == "OutOfStock":
+            raise OutOfStock(out.get("short", []))
+        if err == "PoolTimeout":
+            raise PoolTimeout(msg)
+        if res.status in (401, 403):
+            raise PermissionError(msg)
+        raise ServiceError(f"{err}: {msg}" if err else msg)
+
+    def _call(self, name, *args, **kw):
+        with self.metrics.timed(name):
+            return self._post(f"/call/{name}", {"args": args, "kwargs": kw}, name in READS)["result"]
+
+    def __getattr__(self, name):
+        if name in API:
+            return functools.partial(self._call, name)
+        raise AttributeError(name)
+
+    def warm(self, n=1):
+        """Open this thread's keep-alive socket now; raises if the service is down."""
+        self._conn().connect()
+
+    def login(self, u, p):
+        with self.metrics.timed("login"):
+            res = self._post("/login", {"user": u, "password": p})
+        self.token = res["token"]
+        return res["role"], res["name"]
+
+    def catalog(self):
+        return self._catalog
+
+    def refdata(self):
+        return self._refdata
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for cn in conns:
+            cn.close()
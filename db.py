@@ -0,0 +1,1173 @@
+###############################################################################
+#  DATA LAYER – backends, connection pool and the DB adapter
+###############################################################################
+import hashlib, json, logging, os, re, sqlite3, threading, time, uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import statements as Q
+from metrics import Metrics, instrument, row_count
+from singleflight import SingleFlight, coalesce, invalidating
+from statements import STATEMENTS
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  DB CONNECTION  (edit if your instance differs)
+# ─────────────────────────────────────────────────────────────────────────────
+CONNECT_STRING = (
+    "DRIVER={ODBC Driver 17 for SQL Server};"
+    "SERVER=DESKTOP-PKT7RAS\\SQLEXPRESS;"
+    "DATABASE=PharmacyManagementSystem2;"
+    "Trusted_Connection=yes;"
+)
+
+# "mssql" talks to the instance above, "sqlite" runs on a local file
+BACKEND     = os.environ.get("HMS_BACKEND", "mssql")
+SQLITE_PATH = os.environ.get("HMS_SQLITE_PATH", "pharmacy.db")
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SQLQuery1.sql")
+
+POOL_SIZE    = 8     # max open connections per process
+POOL_TIMEOUT = 30    # seconds to wait for a free connection
+PING_AFTER   = 30    # idle seconds before a connection is re-checked
+
+SEARCH_LIMIT = 50    # patient search rows per page
+ID_BLOCK     = 50    # IDs reserved per round trip by the hi/lo allocator
+
+# ID kind → (sequence in SQLQuery1.sql, prefix)
+ID_SEQUENCES = {
+    "patient":      ("Seq_PatientID",      "P"),
+    "medication":   ("Seq_MedicationID",   "M"),
+    "prescription": ("Seq_PrescriptionID", "PR"),
+}
+ID_DIGITS = 6        # minimum width, grows past 999999
+
+# "row" updates Medication_Inventory.Quantity in place; "ledger" appends
+# stock movements to Stock_Ledger and folds them in every LEDGER_COMPACT_EVERY s
+STOCK_MODE           = os.environ.get("HMS_STOCK_MODE", "row")
+LEDGER_COMPACT_EVERY = 60
+
+# concurrent identical reads share one query (singleflight.py); with a TTL
+# the result is also reused for that many seconds, until the next write
+FLIGHT_TTL = float(os.environ.get("HMS_FLIGHT_TTL", "0"))
+
+# audit rows older than this move to the *_Archive tables (DB.archive_audit),
+# ARCHIVE_BATCH rows per transaction with ARCHIVE_PAUSE s between batches
+ARCHIVE_AFTER_DAYS = 90
+ARCHIVE_BATCH      = 5000
+ARCHIVE_PAUSE      = 0.05
+
+log = logging.getLogger("hms.db")
+
+# same demo accounts the MERGE at the end of SQLQuery1.sql creates
+DEMO_USERS = [
+    ("intern1",  "Intern",     "Intern User", "intern@demo.com", "intern123"),
+    ("doctor1",  "Doctor",     "Dr. Demo",    "doctor@demo.com", "doc123"),
+    ("pharm1",   "Pharmacist", "Pharma Demo", "pharm@demo.com",  "pharm123"),
+    ("manager1", "Manager",    "Inv Manager", "inv@demo.com",    "inv123"),
+]
+
+
+class PoolTimeout(RuntimeError):
+    """No connection became free within POOL_TIMEOUT."""
+
+
+class OutOfStock(RuntimeError):
+    """A sale would take stock below zero; `short` lists the Medication_IDs."""
+
+    def __init__(self, short):
+        super().__init__(f"not enough stock for {', '.join(map(str, short))}")
+        self.short = list(short)
+
+
+# reserve_stock / checkout results, one per medication in the cart, with the
+# stock on hand and price on file when the line was checked.  Ok is False
+# with Available >= Qty when the drug was repriced since the cart was built.
+StockLine = namedtuple("StockLine", "Medication_ID Qty Ok Available Unit_Price")
+Checkout  = namedtuple("Checkout", "SaleID lines")     # SaleID None: nothing saved
+# dispense_refills results, one per prescription asked for.  Medication_ID
+# is None when the patient has no such prescription.
+Refill = namedtuple("Refill", "Prescription_ID Medication_ID Name Qty Unit_Price Stock Refills_Left Ok")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  BACKENDS
+# ─────────────────────────────────────────────────────────────────────────────
+class Backend:
+    """Knows how to open, check and classify failures of one kind of connection."""
+    dialect = None
+
+    def connect(self):
+        raise NotImplementedError
+
+    def ping(self, cn):
+        cur = cn.cursor()
+        try:
+            cur.execute("SELECT 1")
+            cur.fetchone()
+        finally:
+            cur.close()
+
+    def is_disconnect(self, exc):
+        """True if `exc` means the connection itself is dead."""
+        return False
+
+    # connections are autocommit; these bracket one explicit transaction
+    def begin(self, cn):
+        cn.autocommit = False
+
+    def commit(self, cn):
+        cn.commit()
+        cn.autocommit = True
+
+    def rollback(self, cn):
+        cn.rollback()
+        cn.autocommit = True
+
+    def input_sizes(self, types):
+        """setinputsizes() list for statements.py parameter types, or None."""
+        return None
+
+
+class SqlServerBackend(Backend):
+    dialect = "mssql"
+
+    # SQLSTATEs pyodbc reports for a dropped / unusable link
+    LOST = ("08S01", "08001", "08003", "08007", "HYT00", "HYT01")
+
+    def __init__(self, conn_str=CONNECT_STRING):
+        self.conn_str = conn_str
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.conn_str, autocommit=True)
+
+    def is_disconnect(self, exc):
+        import pyodbc
+        return (isinstance(exc, pyodbc.Error) and bool(exc.args)
+                and exc.args[0] in self.LOST)
+
+    def input_sizes(self, types):
+        # one fixed declaration per type keeps a single cached plan per statement
+        import pyodbc
+        odbc = {
+            Q.ID:    (pyodbc.SQL_WVARCHAR, 10, 0),
+            Q.NAME:  (pyodbc.SQL_WVARCHAR, 100, 0),
+            Q.LIKE:  (pyodbc.SQL_WVARCHAR, 110, 0),
+            Q.TEXT:  (pyodbc.SQL_WVARCHAR, 500, 0),
+            Q.JSON:  (pyodbc.SQL_WLONGVARCHAR, 0, 0),
+            Q.INT:   (pyodbc.SQL_INTEGER, 0, 0),
+            Q.MONEY: (pyodbc.SQL_DECIMAL, 10, 2),
+            Q.RATE:  (pyodbc.SQL_DECIMAL, 12, 3),
+            Q.HASH:  (pyodbc.SQL_VARBINARY, 32, 0),
+            Q.DATE:  (pyodbc.SQL_WVARCHAR, 30, 0),
+            Q.STAMP: (pyodbc.SQL_TYPE_TIMESTAMP, 27, 7),
+            Q.VERSION: (pyodbc.SQL_BINARY, 8, 0),
+        }
+        return [odbc[t] for t in types] if types else None
+
+
+_ROW_TYPES = {}
+
+def _named_row(cur, raw):
+    """sqlite3 row factory giving pyodbc-style rows (index *and* attribute access)."""
+    names = tuple(d[0] for d in cur.description)
+    cls = _ROW_TYPES.get(names)
+    if cls is None:
+        cls = _ROW_TYPES[names] = namedtuple("Row", names, rename=True)
+    return cls(*raw)
+
+
+sqlite3.register_adapter(Decimal, str)
+
+
+def _now():
+    return datetime.now().isoformat(" ", "milliseconds")
+
+
+class SqliteBackend(Backend):
+    """File based stand-in that builds the SQLQuery1.sql tables on first use."""
+    dialect = "sqlite"
+
+    def __init__(self, path=SQLITE_PATH, schema=SCHEMA_FILE):
+        if path == ":memory:":
+            # a named shared-cache DB so every pooled connection sees the same data
+            path = f"file:hms-{uuid.uuid4().hex}?mode=memory&cache=shared"
+        self.path   = path
+        self.schema = schema
+        self._lock  = threading.Lock()
+        self._ready = False
+        self._anchor = None     # keeps an in-memory DB alive between checkouts
+
+    def connect(self):
+        cn = sqlite3.connect(self.path, uri=self.path.startswith("file:"),
+                             timeout=POOL_TIMEOUT, isolation_level=None,
+                             check_same_thread=False)
+        cn.row_factory = _named_row
+        cn.create_function("SYSDATETIME", 0, _now)
+        cn.create_function("GETDATE", 0, _now)
+        cn.execute("PRAGMA busy_timeout=%d" % (POOL_TIMEOUT * 1000))
+        with self._lock:
+            if not self._ready:
+                if "mode=memory" in self.path:
+                    self._anchor = sqlite3.connect(self.path, uri=True,
+                                                   check_same_thread=False)
+                else:
+                    cn.execute("PRAGMA journal_mode=WAL")
+                self._build(cn)
+                self._ready = True
+        return cn
+
+    def is_disconnect(self, exc):
+        return isinstance(exc, sqlite3.ProgrammingError) and "closed" in str(exc)
+
+    def begin(self, cn):
+        # take the write lock up front so two checkouts can't deadlock on upgrade
+        cn.execute("BEGIN IMMEDIATE")
+
+    def commit(self, cn):
+        cn.execute("COMMIT")
+
+    def rollback(self, cn):
+        if cn.in_transaction:
+            cn.execute("ROLLBACK")
+
+    # schema ------------------------------------------------------------
+    def _build(self, cn):
+        if cn.execute("SELECT 1 FROM sqlite_master WHERE name='Patient'").fetchone():
+            return
+        with open(self.schema, encoding="utf-8-sig") as f:
+            stmts = sqlite_schema(f.read())
+        cn.execute("BEGIN")
+        try:
+            for s in stmts:
+                cn.execute(s)
+            for user, role, full, mail, pwd in DEMO_USERS:
+                cn.execute(
+                    "INSERT INTO [User](Username,PasswordHash,RoleID,FullName,Email) "
+                    "SELECT ?,?,RoleID,?,? FROM Role WHERE RoleName=?",
+                    (user, hashlib.sha256(pwd.encode()).digest(), full, mail, role))
+            cn.execute("COMMIT")
+        except Exception:
+            cn.execute("ROLLBACK")
+            raise
+
+
+# T-SQL → SQLite rewrites for the parts of the schema script we replay
+_SQLITE_DDL = [
+    (r"\b(?:BIG)?INT\s+IDENTITY\s*\(\s*1\s*,\s*1\s*\)\s+PRIMARY\s+KEY", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (r"\(\s*MAX\s*\)", ""),
+    (r"\b(?:GETDATE|SYSDATETIME)\(\)", "(strftime('%Y-%m-%d %H:%M:%f','now','localtime'))"),
+    (r"\bSYSTEM_USER\b", "'sqlite'"),
+    (r"\bROWVERSION\b", "INTEGER NOT NULL DEFAULT 0"),
+    (r"\b(?:NON)?CLUSTERED\s+", ""),
+    # computed column; NOCASE lets LIKE 'x%' seek the index
+    (r"^(\s*\w+)\s+AS\s+(.+?)\s+PERSISTED\b", r"\1 TEXT COLLATE NOCASE GENERATED ALWAYS AS (\2) STORED"),
+]
+
+def _sqlite_ddl(sql):
+    for pat, rep in _SQLITE_DDL:
+        sql = re.sub(pat, rep, sql, flags=re.I | re.M)
+    return sql
+
+
+def _close_paren(text, i):
+    """Index just past the parenthesis that matches the one at text[i]."""
+    depth, quoted = 0, False
+    for j in range(i, len(text)):
+        ch = text[j]
+        if ch == "'":
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return j + 1
+    raise ValueError("unbalanced parenthesis in schema script")
+
+
+def sqlite_schema(script):
+    """
+    Pull the tables, plain indexes and literal seed INSERTs out of the
+    SQL-Server script and return them as SQLite statements.
+    Procedures, triggers and views are SQL-Server only and are skipped.
+    """
+    text = re.sub(r"--[^\n]*", "", script)
+    tables, out = set(), []
+
+    for m in re.finditer(r"CREATE\s+TABLE\s+(\[?\w+\]?)\s*\(", text, re.I):
+        name = m.group(1).strip("[]")
+        end  = _close_paren(text, m.end() - 1)
+        if name.lower() not in tables:
+            tables.add(name.lower())
+            out.append(_sqlite_ddl(f"CREATE TABLE IF NOT EXISTS {text[m.start(1):end]}"))
+
+    # sequences become rows of a counter table (see DB.reserve_ids)
+    seqs = re.findall(r"CREATE\s+SEQUENCE\s+(?:dbo\.)?(\w+)\b[^;]*?\bSTART\s+WITH\s+(\d+)", text, re.I)
+    if seqs:
+        out.append("CREATE TABLE IF NOT EXISTS Id_Sequence "
+                   "(Name TEXT PRIMARY KEY, Next_Value INTEGER NOT NULL)")
+        out += [f"INSERT OR IGNORE INTO Id_Sequence VALUES ('{n}', {v})" for n, v in seqs]
+
+    idx = re.compile(r"CREATE\s+(UNIQUE\s+)?(?:(?:NON)?CLUSTERED\s+)?INDEX\s+(\w+)\s+"
+                     r"ON\s+(?:dbo\.)?(\[?\w+\]?)\s*(\([^)]*\))(\s+WHERE\s+[^;\n]+)?", re.I)
+    for m in idx.finditer(text):
+        uniq, name, tbl, cols, where = m.groups()
+        if tbl.strip("[]").lower() in tables:
+            out.append(f"CREATE {uniq or ''}INDEX IF NOT EXISTS {name} ON {tbl}{cols}"
+                       f"{(where or '').rstrip()}")
+
+    ins = re.compile(r"INSERT\s+INTO\s+(\[?\w+\]?)\s*\(([^)]*)\)\s*VALUES\s*", re.I)
+    for m in ins.finditer(text):
+        rows, j = [], m.end()
+        while j < len(text) and text[j] == "(":
+            k = _close_paren(text, j)
+            rows.append(text[j:k])
+            j = k
+            while j < len(text) and text[j] in " \t\r\n,":
+                j += 1
+        # T-SQL variables mean the INSERT lives inside a procedure / trigger
+        params = "@" in re.sub(r"'[^']*'", "", "".join(rows))
+        if rows and not params and m.group(1).strip("[]").lower() in tables:
+            out.append(_sqlite_ddl(f"INSERT OR IGNORE INTO {m.group(1)}({m.group(2)}) "
+                                   f"VALUES {', '.join(rows)}"))
+    return out
+
+
+def make_backend(kind=None):
+    kind = kind or BACKEND
+    if kind == "mssql":
+        return SqlServerBackend()
+    if kind == "sqlite":
+        return SqliteBackend()
+    raise ValueError(f"Unknown backend: {kind}")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  ID ALLOCATION
+# ─────────────────────────────────────────────────────────────────────────────
+class IdAllocator:
+    """
+    hi/lo IDs: one round trip reserves a block of `block` numbers from the
+    kind's sequence, the rest of the block is handed out locally.  Numbers
+    left over when the process exits are skipped, never reused.
+    """
+
+    def __init__(self, reserve, block=ID_BLOCK):
+        self.reserve = reserve         # reserve(sequence, count) → first number
+        self.block   = block
+        self._next   = {}              # kind → next free number
+        self._end    = {}              # kind → first number past the block
+        self._lock   = threading.Lock()
+
+    def next(self, kind):
+        seq, prefix = ID_SEQUENCES[kind]
+        with self._lock:
+            n = self._next.get(kind, 0)
+            if n >= self._end.get(kind, 0):
+                n = self.reserve(seq, self.block)
+                self._end[kind] = n + self.block
+            self._next[kind] = n + 1
+        return f"{prefix}{n:0{ID_DIGITS}d}"
+
+
+class LedgerCompactor(threading.Thread):
+    """Background thread that calls db.compact_ledger() every `every` seconds."""
+
+    def __init__(self, db, every=LEDGER_COMPACT_EVERY):
+        super().__init__(name="ledger-compactor", daemon=True)
+        self.db, self.every = db, every
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(self.every):
+            try:
+                self.db.compact_ledger()
+            except Exception:
+                log.exception("stock ledger compaction failed")
+
+    def stop(self):
+        self._halt.set()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  CONNECTION POOL
+# ─────────────────────────────────────────────────────────────────────────────
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool.  Idle connections are pinged before reuse once
+    they have sat for PING_AFTER seconds; dead ones are dropped and replaced.
+    """
+
+    def __init__(self, backend, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=PING_AFTER):
+        self.backend    = backend
+        self.size       = size
+        self.timeout    = timeout
+        self.ping_after = ping_after
+        self._idle   = []           # [(connection, last_used)]
+        self._stmts  = {}           # id(connection) → {statement name: cursor}
+        self._open   = 0
+        self._closed = False
+        self._cv     = threading.Condition()
+
+    def warm(self, n=1):
+        """Open up to `n` connections now (fails fast if the server is unreachable)."""
+        cns = [self.acquire() for _ in range(min(n, self.size))]
+        for cn in cns:
+            self.release(cn)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._cv:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    cn, used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    cn = used = None
+                    break
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise PoolTimeout(f"no free connection after {self.timeout}s")
+                self._cv.wait(left)
+
+        try:
+            if cn is not None and time.monotonic() - used > self.ping_after:
+                try:
+                    self.backend.ping(cn)
+                except Exception:
+                    self._discard(cn)
+                    cn = None
+            if cn is None:
+                cn = self.backend.connect()
+        except Exception:
+            with self._cv:
+                self._open -= 1
+                self._cv.notify()
+            raise
+        return cn
+
+    def release(self, cn, broken=False):
+        with self._cv:
+            if broken or self._closed:
+                self._open -= 1
+                self._discard(cn)
+            else:
+                self._idle.append((cn, time.monotonic()))
+            self._cv.notify()
+
+    @contextmanager
+    def connection(self):
+        cn = self.acquire()
+        broken = False
+        try:
+            yield cn
+        except Exception as e:
+            broken = self.backend.is_disconnect(e)
+            raise
+        finally:
+            self.release(cn, broken)
+
+    @contextmanager
+    def cursor(self):
+        """One cursor for one operation, on a pooled connection."""
+        with self.connection() as cn:
+            cur = cn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+    @contextmanager
+    def statement(self, name):
+        """
+        The connection's own cursor for statement `name`, kept open between
+        checkouts: running the same text again on it reuses the prepared
+        statement instead of compiling it anew.
+        """
+        with self.connection() as cn:
+            cache = self._stmts.setdefault(id(cn), {})
+            cur = cache.get(name)
+            if cur is None:
+                cur = cache[name] = cn.cursor()
+            yield cur
+
+    @contextmanager
+    def transaction(self):
+        """Cursor whose statements commit together or not at all."""
+        with self.connection() as cn:
+            self.backend.begin(cn)
+            cur = cn.cursor()
+            try:
+                yield cur
+                self.backend.commit(cn)
+            except BaseException:
+                try:
+                    self.backend.rollback(cn)
+                except Exception:
+                    pass
+                raise
+            finally:
+                cur.close()
+
+    def stats(self):
+        with self._cv:
+            return {"size": self.size, "open": self._open, "idle": len(self._idle)}
+
+    def close(self):
+        with self._cv:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cv.notify_all()
+        for cn, _ in idle:
+            self._discard(cn)
+
+    def _discard(self, cn):
+        for cur in self._stmts.pop(id(cn), {}).values():
+            self._quiet_close(cur)
+        self._quiet_close(cn)
+
+    @staticmethod
+    def _quiet_close(obj):
+        try:
+            obj.close()
+        except Exception:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  DATABASE ADAPTER  (all SQL in one place)
+# ─────────────────────────────────────────────────────────────────────────────
+class DB:
+    def __init__(self, backend=None, pool_size=POOL_SIZE, stock_mode=None,
+                 compact_every=LEDGER_COMPACT_EVERY, flight_ttl=None, warm=True):
+        self.backend = backend or make_backend()
+        self.dialect = self.backend.dialect
+        self.stock_mode = stock_mode or STOCK_MODE
+        if self.stock_mode not in ("row", "ledger"):
+            raise ValueError(f"Unknown stock mode: {self.stock_mode}")
+        self.pool    = ConnectionPool(self.backend, pool_size)
+        self.metrics = Metrics()
+        self.flight  = SingleFlight(FLIGHT_TTL if flight_ttl is None else flight_ttl, self.metrics)
+        if warm:                  # warm=False: the caller runs warm() off its own thread
+            self.pool.warm()
+        self.ids     = IdAllocator(self.reserve_ids)
+        self._sizes  = {}         # statement name → backend input sizes
+        self._catalog = None
+        self._refdata = None
+        self._lock    = threading.Lock()
+        self._compactor = None
+        if self.stock_mode == "ledger" and compact_every:
+            self._compactor = LedgerCompactor(self, compact_every)
+            self._compactor.start()
+
+    def warm(self, n=1):
+        """Open up to `n` pooled connections now; raises if the server is unreachable."""
+        self.pool.warm(n)
+
+    @property
+    def ledger(self):
+        return self.stock_mode == "ledger"
+
+    # helpers: statements run by name (statements.py) ---------------------
+    def _text(self, name):
+        """Statement text for the active backend."""
+        st = STATEMENTS[name]
+        sql = st.sqlite if self.dialect == "sqlite" and st.sqlite is not None else st.mssql
+        if sql is None:
+            raise KeyError(f"statement {name!r} has no {self.dialect} form")
+        return sql
+
+    def _run(self, cur, name, params=(), fetch=None, many=False):
+        """
+        Execute statement `name` on `cur` with its declared parameter types.
+        Timed as "sql.<name>"; returns fetch(cur), or the rowcount without one.
+        """
+        if name not in self._sizes:
+            self._sizes[name] = self.backend.input_sizes(STATEMENTS[name].types)
+        sizes = self._sizes[name]
+        t, rows = time.perf_counter(), 0
+        try:
+            if sizes:
+                cur.setinputsizes(sizes)
+            if many:
+                if hasattr(cur, "fast_executemany"):
+                    cur.fast_executemany = True     # pyodbc: one array-bound round trip
+                cur.executemany(self._text(name), params)
+            else:
+                cur.execute(self._text(name), params)
+            res = fetch(cur) if fetch else cur.rowcount
+            rows = row_count(res) if fetch else max(res, 0)
+        except Exception:
+            self.metrics.record("sql." + name, time.perf_counter() - t, 0,
+                                () if many else params, error=True)
+            raise
+        self.metrics.record("sql." + name, time.perf_counter() - t, rows, () if many else params)
+        self.metrics.add_rows(rows)
+        return res
+
+    def _read(self, fetch, name, params):
+        for attempt in (1, 2):
+            try:
+                with self.pool.statement(name) as cur:
+                    return self._run(cur, name, params, fetch)
+            except Exception as e:
+                # a dropped link is retried once on a fresh connection
+                if attempt == 2 or not self.backend.is_disconnect(e):
+                    raise
+
+    def _all(self, name, *params):
+        return self._read(lambda c: c.fetchall(), name, params)
+
+    def _one(self, name, *params):
+        return self._read(lambda c: c.fetchone(), name, params)
+
+    def _paged(self, n, params):
+        """Bind a TOP (?) / LIMIT ? row count where the dialect expects it."""
+        n = int(n)
+        return (n,) + params if self.dialect == "mssql" else params + (n,)
+
+    def _page(self, name, n, *params):
+        """First `n` rows of a paged statement (TOP (?) / LIMIT ? bound as a parameter)."""
+        return self._read(lambda c: c.fetchall(), name, self._paged(n, params))
+
+    @contextmanager
+    def _stream(self, name, params=(), n=None):
+        """
+        Run a statement (paged when `n` is given) and hand back its open
+        cursor, for callers that read it with fetchmany() instead of
+        holding every row.
+        """
+        params = tuple(params) if n is None else self._paged(n, tuple(params))
+        with self.pool.statement(name) as cur:
+            self._run(cur, name, params, lambda c: None)
+            yield cur
+
+    def _exec(self, name, *params):
+        with self.pool.statement(name) as cur:
+            return self._run(cur, name, params)
+
+    # auth
+    def login(self, u, p):
+        h = hashlib.sha256(p.encode()).digest()
+        r = self._one("login", u, h)
+        return (r.RoleName, r.FullName) if r else (None, None)
+
+    # ids
+    def reserve_ids(self, seq, count):
+        """First of `count` fresh numbers from sequence `seq`."""
+        return self._one("reserve_ids", seq, count)[0]
+
+    # patients
+    def new_pid(self):
+        return self.ids.next("patient")
+
+    def add_pat(self, p):
+        self._exec("add_pat", p['id'], p['first'], p['last'], p['dob'], p['gender'], p['email'])
+
+    def upd_pat(self, p):
+        return self._exec("upd_pat", p['first'], p['last'], p['dob'], p['gender'], p['email'], p['id'])
+
+    def get_pat(self, pid):
+        return self._one("get_pat", pid)
+
+    def search_pats(self, txt, after=None, n=None):
+        """
+        Ranked patient search, one keyset page of `n` rows after `after`.
+
+        An exact Patient_ID short-circuits to that one row.  Otherwise hits
+        come from index seeks on the persisted First_Key / Last_Key columns:
+          1  last-name prefix        ("first last" for two or more words)
+          2  first-name prefix       ("last first")
+          3  Patient_ID prefix
+        Rows are (Patient_ID, First, Last, Created_Date, Rank, K1, K2);
+        K1/K2 are the rank's sort keys and only matter for paging.
+        """
+        n = int(n or SEARCH_LIMIT)
+        words = re.sub(r"[%_\[\]]", "", txt).lower().split()
+        if not words:
+            return []
+        is_id = bool(len(words) == 1 and re.fullmatch(r"[a-z]*\d+", words[0]))
+        if is_id and after is None:
+            row = self._one("search_pats.id", words[0].upper())
+            if row:
+                return [row]
+
+        multi = len(words) > 1
+        if multi:
+            a, b = words[0] + "%", " ".join(words[1:]) + "%"
+            args = {1: [a, b], 2: [a, b, a, b]}
+        else:
+            w = words[0] + "%"
+            args = {1: [w], 2: [w, w], 3: [words[0].upper() + "%", w, w]}
+
+        after_rank = after[4] if after is not None else 0
+        params = []
+        for rank, *_ in Q.search_branches(multi, is_id):
+            if rank < after_rank:
+                continue
+            params += args[rank]
+            if rank == after_rank:
+                params += [after[5], after[5], after[6], after[6], after[0]]
+        if not params:
+            return []
+        return self._all(Q.search_pats(multi, is_id, after_rank, n), *params)
+
+    # doctors
+    def specs(self):
+        return [r[0] for r in self._all("specs")]
+
+    def docs_by_spec(self, sp):
+        return self._all("docs_by_spec", sp)
+
+    def doctors(self):
+        """Every active doctor, for the RefData cache."""
+        return self._all("doctors")
+
+    def refdata(self):
+        """Process-wide RefData cache over this DB."""
+        with self._lock:
+            if self._refdata is None:
+                from refdata import RefData
+                self._refdata = RefData(self)
+            return self._refdata
+
+    # meds / prescriptions
+    def med_search(self, txt, priced=False):
+        """
+        Active meds matching `txt` → (Generic, Brand, ID, Stock).
+        priced=True adds Unit_Price and keeps only meds that have an
+        inventory row, so a sales counter needs no follow-up lookups.
+        """
+        like = f"%{txt}%"
+        return self._all("med_search.priced" if priced else "med_search", like, like)
+
+    def new_rxid(self):
+        return self.ids.next("prescription")
+
+    def add_rx(self, r):
+        self._exec("add_rx", r['id'], r['pid'], r['mid'], r['date'],
+                   r['dosage'], r['qty'], r['days'], r['ref'], r['ref'], r['sig'])
+
+    def rxs_of(self, pid, newest_first=False, after=None, n=None):
+        """Active prescriptions; with `n`, one keyset page by Prescription_ID."""
+        if newest_first:
+            return self._all("rxs_of.newest", pid)
+        if not n:
+            return self._all("rxs_of", pid)
+        if after is None:
+            return self._page("rxs_of.page", n, pid)
+        return self._page("rxs_of.page_after", n, pid, after[0])
+
+    def refills_left(self, rxid):
+        r = self._one("refills_left", rxid)
+        return r[0] if r else 0
+
+    def use_refill(self, rxid):
+        return self._exec("use_refill", rxid)
+
+    def dispense_refills(self, pid, rxids):
+        """
+        Use one refill on each of patient `pid`'s prescriptions → [Refill],
+        one per ID in order.  The refill check and decrement for the whole
+        batch is a single UPDATE in one transaction; a line is dispensed
+        (Ok) only if it is Active, has a refill left and its drug is priced.
+        Price and stock come back with it, so the cart needs no lookups.
+        """
+        rxids = list(dict.fromkeys(rxids))
+        if not rxids:
+            return []
+        want = json.dumps(rxids)
+        if self.dialect == "mssql":
+            with self.pool.statement("dispense_refills") as cur:
+                rows = self._run(cur, "dispense_refills", (pid, want), lambda c: c.fetchall())
+            return [Refill(*r[:7], bool(r[7])) for r in rows]
+        with self.pool.transaction() as cur:
+            took = {r[0] for r in self._run(cur, "dispense_refills.take", (pid, want),
+                                            lambda c: c.fetchall())}
+            rows = self._run(cur, "dispense_refills.lines", (pid, want), lambda c: c.fetchall())
+        return [Refill(*r, r[0] in took) for r in rows]
+
+    # inventory / sales
+    def inv(self, mid):
+        return self._one("inv", mid)
+
+    IN_CHUNK = 1024    # SQL Server allows ~2100 parameters per statement
+
+    def _by_id(self, shape, ids):
+        """Rows of an IN-list statement (shape(size) → name) → {first column: row}."""
+        ids = list(dict.fromkeys(ids))
+        out = {}
+        for k in range(0, len(ids), self.IN_CHUNK):
+            part = ids[k:k + self.IN_CHUNK]
+            # pad to a power of two so only a handful of IN-list shapes get prepared
+            size = 1 << (len(part) - 1).bit_length()
+            part += part[-1:] * (size - len(part))
+            for r in self._all(shape(size), *part):
+                out[r[0]] = r
+        return out
+
+    def inv_many(self, mids):
+        """Inventory rows for many medications at once → {Medication_ID: row}."""
+        return self._by_id(Q.inv_many, mids)
+
+    def adjust(self, mid, dq, reason="Adjustment", ref=None):
+        """
+        Move stock by `dq`.  In ledger mode this appends a Stock_Ledger row
+        (reason: Sale, Receipt, Adjustment or Refill) and locks nothing.
+        """
+        if self.ledger:
+            self._exec("ledger.append", mid, dq, reason, ref)
+        else:
+            self._exec("adjust", dq, mid)
+
+    def compact_ledger(self):
+        """Fold pending Stock_Ledger entries into Medication_Inventory → rows folded."""
+        if self.dialect == "mssql":
+            return self._one("ledger.compact")[0]
+        with self.pool.transaction() as cur:
+            through = self._run(cur, "ledger.through", (), lambda c: c.fetchone()[0])
+            return self._run(cur, "ledger.compact", (through,)) if through else 0
+
+    def inv_list(self, like):
+        return self._all("inv_list", like, like)
+
+    def catalog_mark(self):
+        """Watermark for a later catalog_rows(since=...); take it before reading the rows."""
+        return self._one("catalog_rows.mark")[0]
+
+    def catalog_rows(self, since=None):
+        """
+        Medication + inventory rows for the client catalog; with `since`, only
+        rows either side written, or with stock ledger entries, at or after
+        that catalog_mark().
+        """
+        if since is None:
+            return self._all("catalog_rows")
+        return self._all("catalog_rows.since", since, since, since)
+
+    def catalog(self):
+        """Process-wide MedCatalog over this DB (loaded on first search)."""
+        with self._lock:
+            if self._catalog is None:
+                from catalog import MedCatalog
+                self._catalog = MedCatalog(self)
+            return self._catalog
+
+    def med_exists(self, mid):
+        return self._one("med_exists", mid) is not None
+
+    def add_med(self, mid, gen, br, qty, prc):
+        """Insert a brand-new medication and its opening inventory row."""
+        with self.pool.transaction() as cur:
+            self._run(cur, "add_med.med", (mid, gen, br))
+            self._run(cur, "add_med.inv", (mid, qty, prc))
+
+    def upsert_med(self, mid, gen, br):
+        """
+        Insert new medication if it doesn't exist; otherwise update its names.
+        """
+        self._exec("upsert_med", mid, gen, br)
+
+    def upsert_inv(self, mid, qty, prc):
+        """
+        Insert or update inventory quantity and price.
+        """
+        self._exec("upsert_inv", mid, qty, prc)
+
+    def import_chunk(self, batch, rows):
+        """
+        Stage one chunk of a bulk import and merge it in one transaction.
+        rows: [(line_no, med_id or None, generic, brand, qty or None, price)].
+        Returns (inserted, updated, [(line_no, error)]); rejected lines
+        are left out and the rest of the chunk still goes in.
+        """
+        with self.pool.transaction() as cur:
+            self._run(cur, "bulk.stage", [(batch,) + tuple(r) for r in rows], many=True)
+            self._run(cur, "bulk.match_names", (batch,))
+            fresh = self._run(cur, "bulk.unmatched", (batch,), lambda c: c.fetchall())
+            if fresh:
+                # one contiguous block, reserved on this cursor: a second
+                # connection would wait on our write lock under SQLite
+                seq, prefix = ID_SEQUENCES["medication"]
+                first = self._run(cur, "reserve_ids", (seq, len(fresh)), lambda c: c.fetchone()[0])
+                self._run(cur, "bulk.assign_id",
+                          [(f"{prefix}{first + k:0{ID_DIGITS}d}", batch, r[0])
+                           for k, r in enumerate(fresh)], many=True)
+            self._run(cur, "bulk.check_names", (batch,))
+            self._run(cur, "bulk.keep_qty", (batch,))
+            updated = self._run(cur, "bulk.existing", (batch,), lambda c: c.fetchone()[0])
+            self._run(cur, "bulk.merge_med", (batch,))
+            self._run(cur, "bulk.merge_inv", (batch,))
+            rejects = self._run(cur, "bulk.rejects", (batch,), lambda c: c.fetchall())
+            self._run(cur, "bulk.clear", (batch,))
+        return len(rows) - len(rejects) - updated, updated, [tuple(r) for r in rejects]
+
+    def inventory_summary(self, after="", n=500):
+        """One keyset page of active stock on hand and its value, ordered by Medication_ID."""
+        return self._page("inv_summary.page", n, after)
+
+    # reorder suggestions (computed by forecast.py) -------------------------
+    def save_reorder(self, rows, apply=False):
+        """
+        Replace Reorder_Suggestion with `rows` in one transaction.  apply=True
+        also makes each selling drug's reorder point / order-up-to level its
+        Low_Stock_Level / Restock_Level; returns the inventory rows changed.
+        """
+        with self.pool.transaction() as cur:
+            self._run(cur, "forecast.clear")
+            if rows:
+                self._run(cur, "forecast.save", rows, many=True)
+            return self._run(cur, "forecast.apply") if apply else 0
+
+    def refresh_forecast(self, apply=False):
+        """Run forecast.py here (it needs numpy) → (drugs, to reorder, levels changed)."""
+        import forecast
+        return forecast.run(self, apply)
+
+    def reorder_suggestions(self, n=500):
+        """Drugs due for reordering, fewest days of supply first."""
+        return self._page("reorder.page", n)
+
+    # printable documents (rendered by documents.py) ----------------------
+    def sales_on(self, day):
+        """Sales rung up on `day` and their lines → (headers, items), by SaleID."""
+        d = date.fromisoformat(str(day)[:10])
+        heads = self._all("docs.sales", d.isoformat(), (d + timedelta(days=1)).isoformat())
+        if not heads:
+            return [], []
+        return heads, self._all("docs.sale_items", heads[0][0], heads[-1][0])
+
+    def active_rxs(self, pids=None):
+        """Active prescriptions with patient and drug names, by patient; None: everyone's."""
+        if pids is None:
+            return self._all("docs.rx_all")
+        return self._all("docs.rx_of", json.dumps(list(pids)))
+
+    # audit archive: cold *_History / User_Actions / Stock_Alerts rows ------
+    def archive_audit(self, days=ARCHIVE_AFTER_DAYS, batch=ARCHIVE_BATCH, tables=None,
+                      pause=ARCHIVE_PAUSE):
+        """
+        Move audit rows older than `days` into the *_Archive tables, oldest
+        first, `batch` rows per transaction so the triggers appending new
+        rows never wait long → {table: rows moved}.
+        """
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(" ", "seconds")
+        if self.dialect == "mssql":
+            self._one("archive.extend")
+        moved = {}
+        for t in tables or Q.AUDIT:
+            moved[t] = 0
+            while True:
+                if self.dialect == "mssql":
+                    n = self._exec(f"archive.move.{t}", batch, cutoff)
+                else:
+                    with self.pool.transaction() as cur:
+                        self._run(cur, f"archive.copy.{t}", (batch, cutoff))
+                        n = self._run(cur, f"archive.drop.{t}", (batch, cutoff))
+                moved[t] += n
+                if n < batch:
+                    break
+                time.sleep(pause)
+        return moved
+
+    def audit_history(self, table, record, since=None, until=None, n=200):
+        """
+        Audit rows for one record, newest first, from the hot table and its
+        archive alike; each row starts with Tier ('hot' or 'archive').
+        table: a key of statements.AUDIT, e.g. "Patient_History".
+        """
+        if table not in Q.AUDIT:
+            raise ValueError(f"not an audit table: {table}")
+        since, until = str(since or "1900-01-01"), str(until or "9999-12-31")
+        return self._page(f"audit.{table}", n, record, since, until, record, since, until)
+
+    # sales analytics: rollups folded forward from a SaleID watermark ------
+    def refresh_rollups(self):
+        """Fold sales newer than the watermark into the Sales_* rollups → sales folded."""
+        if self.dialect == "mssql":
+            return self._one("rollup.refresh")[0]
+        with self.pool.transaction() as cur:
+            last, top = self._run(cur, "rollup.range", (), lambda c: c.fetchone())
+            if top is None or top <= last:
+                return 0
+            for name in ("rollup.daily", "rollup.medication", "rollup.cashier",
+                         "rollup.patient_type"):
+                self._run(cur, name, (last, top))
+            self._run(cur, "rollup.advance", (top,))
+            return self._run(cur, "rollup.count", (last, top), lambda c: c.fetchone()[0])
+
+    def dashboard(self, top=10, days=30, today=None):
+        """
+        Manager dashboard figures, read from the rollups and the inventory
+        view only, so the cost doesn't grow with the sales history.
+        """
+        today = today or date.today()
+        iso = lambda d: d.isoformat()
+        return {
+            "revenue":  self._one("dash.revenue", iso(today), iso(today - timedelta(days=6)),
+                                  iso(today - timedelta(days=days - 1))),
+            "daily":    self._all("dash.daily", iso(today - timedelta(days=days - 1))),
+            "top":      self._page("dash.top_meds", top),
+            "cashiers": self._all("dash.cashiers"),
+            "patients": self._all("dash.patient_types"),
+            "stock":    self._one("dash.stock_value"),
+        }
+
+    @staticmethod
+    def _wanted(items):
+        want = {}
+        for mid, qty, *_ in items:
+            want[mid] = want.get(mid, 0) + int(qty)
+        return want
+
+    @staticmethod
+    def _prices(items):
+        """Unit price per medication in the cart, where its lines carry one and agree."""
+        seen = {}
+        for mid, _, *rest in items:
+            seen.setdefault(mid, set()).add(Decimal(str(rest[0])) if rest and rest[0] is not None
+                                            else None)
+        return {m: ps.pop() for m, ps in seen.items() if len(ps) == 1 and None not in ps}
+
+    def _stock_lines(self, want, took=None):
+        """[StockLine] from a fresh read; took: the IDs reserved, else Ok = enough on hand."""
+        seen = self._by_id(Q.stock_levels, want)
+        return seen, [StockLine(mid, q,
+                                mid in took if took is not None
+                                else mid in seen and seen[mid].Quantity >= q,
+                                seen[mid].Quantity if mid in seen else 0,
+                                seen[mid].Unit_Price if mid in seen else None)
+                      for mid, q in want.items()]
+
+    def reserve_stock(self, items):
+        """
+        Take the stock for a cart, line by line → [StockLine].
+        items: [(med_id, qty[, unit_price])].  Each line is one decrement
+        guarded by the stock check (SP_ReserveStock), so counters selling the
+        same drug never fail each other while it lasts.  A line carrying a
+        unit price is only taken at that price.  Short or repriced lines are
+        reported, not rolled back: the Ok lines stay taken until the sale
+        saves or release_stock gives them back (see checkout).
+        Row mode only: in ledger mode sales append and never reserve.
+        """
+        if self.ledger:
+            raise RuntimeError("stock reservation needs HMS_STOCK_MODE=row")
+        want, price = self._wanted(items), self._prices(items)
+        if self.dialect == "mssql":
+            cart = json.dumps([{"mid": m, "qty": q, "price": str(price[m]) if m in price else None}
+                               for m, q in want.items()])
+            with self.pool.statement("reserve_stock") as cur:
+                got = {r[0]: r for r in self._run(cur, "reserve_stock", (cart,),
+                                                  lambda c: c.fetchall())}
+            return [StockLine(m, q, bool(got[m].Ok), got[m].Available, got[m].Unit_Price)
+                    for m, q in want.items()]
+        with self.pool.transaction() as cur:
+            took = {m for m, q in want.items()
+                    if self._run(cur, "reserve_stock.line", (q, m, price.get(m)))}
+        return self._stock_lines(want, took)[1]
+
+    def release_stock(self, items):
+        """Give back stock taken by reserve_stock (the sale didn't save)."""
+        back = [(q, m) for m, q in self._wanted(items).items()]
+        if back:
+            with self.pool.transaction() as cur:
+                self._run(cur, "adjust", back, many=True)
+
+    def checkout(self, cashier, pat, total, items):
+        """
+        Reserve the cart's stock, then save the sale → Checkout(SaleID, lines).
+        When a line is short or repriced SaleID is None, the lines already
+        taken are given back, nothing is sold and `lines` says which.  In
+        ledger mode the sale appends directly and save_sale checks on-hand.
+        """
+        if self.ledger:
+            try:
+                return Checkout(self.save_sale(cashier, pat, total, items),
+                                [StockLine(m, q, True, None, None)
+                                 for m, q in self._wanted(items).items()])
+            except OutOfStock:
+                return Checkout(None, self._stock_lines(self._wanted(items))[1])
+        lines = self.reserve_stock(items)
+        if not all(l.Ok for l in lines):
+            self.release_stock([(l.Medication_ID, l.Qty) for l in lines if l.Ok])
+            return Checkout(None, lines)
+        try:
+            return Checkout(self.save_sale(cashier, pat, total, items, reserved=True), lines)
+        except Exception:
+            self.release_stock(items)
+            raise
+
+    def _short(self, items):
+        return [l.Medication_ID for l in self._stock_lines(self._wanted(items))[1] if not l.Ok]
+
+    def save_sale(self, cashier, pat, total, items, reserved=False):
+        """
+        Write header + items and take the stock out in one transaction.
+        items: [(med_id, qty, unit_price)]; returns the new SaleID.
+        Fails as a whole (nothing written) with OutOfStock if any line would
+        take stock negative.  reserved=True: reserve_stock already took it.
+        """
+        if self.dialect == "mssql":
+            # one round trip: SP_SaveSale unpacks the JSON set-based
+            cart = json.dumps([{"mid": m, "qty": int(q), "price": str(p)} for m, q, p in items])
+            try:
+                with self.pool.statement("save_sale") as cur:
+                    return self._run(cur, "save_sale",
+                                     (pat, cashier, total, cart, int(self.ledger), int(reserved)),
+                                     lambda c: c.fetchone()[0])
+            except Exception as e:
+                # trg_Inv_NoNegative / SP_SaveSale's ledger check
+                if "cannot be negative" in str(e):
+                    raise OutOfStock(self._short(items)) from e
+                raise
+
+        try:
+            with self.pool.transaction() as cur:
+                sid = self._run(cur, "save_sale.header", (pat, cashier, total),
+                                lambda c: c.fetchone()[0])
+                self._run(cur, "save_sale.item",
+                          [(sid, mid, qty, price) for mid, qty, price in items], many=True)
+                if reserved:
+                    return sid
+                if not self.ledger:
+                    self._run(cur, "save_sale.stock", (sid, sid))
+                else:
+                    self._run(cur, "save_sale.ledger", (sid,))
+                    short = self._run(cur, "save_sale.short", (sid,), lambda c: c.fetchall())
+                    if short:
+                        raise OutOfStock([r[0] for r in short])
+        except sqlite3.IntegrityError as e:
+            if "Quantity" not in str(e):
+                raise
+            raise OutOfStock(self._short(items)) from e
+        return sid
+
+    def new_med_id(self):
+        """Next Medication_ID (e.g. 'M001000'), usually without a round trip."""
+        return self.ids.next("medication")
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.stop()
+        self.pool.close()
+
+
+# reads that many counters repeat at once; writes drop any TTL-cached result
+coalesce(DB, ["get_pat", "search_pats", "specs", "docs_by_spec", "doctors", "med_search",
+              "rxs_of", "refills_left", "inv", "inv_list", "med_exists", "catalog_rows",
+              "inventory_summary", "dashboard", "reorder_suggestions", "audit_history"])
+invalidating(DB, ["add_pat", "upd_pat", "add_rx", "use_refill", "dispense_refills", "adjust",
+                  "compact_ledger", "add_med", "upsert_med", "upsert_inv", "import_chunk", "refresh_rollups",
+                  "save_reorder", "archive_audit", "reserve_stock", "release_stock", "checkout", "save_sale"])
+
+# every public DB call is timed under its own name (see metrics.Metrics)
+instrument(DB, [n for n, v in list(vars(DB).items())
+                if callable(v) and not n.startswith("_") and n not in ("close", "catalog", "refdata")])
@@ -0,0 +1,359 @@
+###############################################################################
+#  DOCUMENTS – receipts, visit slips and Rx forms as text or PDF, off the GUI
+###############################################################################
+import argparse, hashlib, multiprocessing, os, sys, threading, time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+DOCS_DIR   = os.environ.get("HMS_DOCS_DIR", "documents")
+WORKERS    = min(4, os.cpu_count() or 1)   # render processes
+CHUNK      = 32       # documents per task sent to a worker
+CACHE_DOCS = 2048     # rendered documents kept for reprints
+
+# One template per kind.  Lines starting with "*" repeat once per item;
+# the rest are filled from the document's own fields (str.format).
+TEMPLATES = {
+    "receipt": """\
+============== RECEIPT ==============
+Sale     : #{sale}
+Cashier  : {cashier}
+Patient  : {patient}
+Date     : {when:%Y-%m-%d %H:%M}
+-------------------------------------
+*{name} x{qty} @ {price:.2f} = {line:.2f}
+-------------------------------------
+Total: {total:.2f}
+=====================================""",
+    "slip": """\
+================ VISIT SLIP ===============
+Patient ID : {patient}
+Name       : {name}
+Visit To   : {spec}
+Doctor     : {doctor}
+Date       : {when:%Y-%m-%d %H:%M}
+===========================================""",
+    "rx_form": """\
+===================================================
+ Doctor: {doctor}
+ Patient ID: {patient}   {name}
+---------------------------------------------------
+*{rx}  {drug}  {dosage}  Qty:{qty}  Refills:{refills}{sig}
+===================================================""",
+}
+
+# PDF page: A4 in points, Courier so the text layout survives
+PAGE_W, PAGE_H = 595, 842
+FONT_SIZE, LEADING, MARGIN = 10, 12, 50
+PAGE_LINES = (PAGE_H - 2 * MARGIN) // LEADING
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  RENDERING  (in the worker processes, or the caller's thread for one document)
+# ─────────────────────────────────────────────────────────────────────────────
+@lru_cache(maxsize=None)
+def _template(kind):
+    """Template text → (head, item, foot) format strings, parsed once per process."""
+    head, item, foot = [], [], []
+    for line in TEMPLATES[kind].splitlines():
+        if line.startswith("*"):
+            item.append(line[1:])
+        else:
+            (foot if item else head).append(line)
+    return "\n".join(head), "\n".join(item), "\n".join(foot)
+
+
+def text(kind, doc):
+    head, item, foot = _template(kind)
+    out = [head.format(**doc)]
+    if item:
+        out += [item.format(**i) for i in doc.get("items", ())]
+    if foot:
+        out.append(foot.format(**doc))
+    return "\n".join(out)
+
+
+def _esc(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_pages(lines):
+    """Text lines → one content stream per page."""
+    lines = lines or [""]
+    return [(f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_H - MARGIN} Td\n"
+             + "\n".join(f"({_esc(l)}) '" for l in lines[k:k + PAGE_LINES])
+             + "\nET").encode("cp1252", "replace")
+            for k in range(0, len(lines), PAGE_LINES)]
+
+
+def pdf(pages):
+    """Content streams → a complete PDF file (built-in Courier, no fonts embedded)."""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for content in pages:
+        objs.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                    b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                    % (PAGE_W, PAGE_H, len(objs)))
+        kids.append(len(objs))
+    objs[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids))
+    buf, offsets = bytearray(b"%PDF-1.4\n"), []
+    for n, body in enumerate(objs, 1):
+        offsets.append(len(buf))
+        buf += b"%d 0 obj\n%s\nendobj\n" % (n, body)
+    xref = len(buf)
+    buf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    buf += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    buf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    return bytes(buf)
+
+
+def _render_chunk(kind, fmt, docs):
+    """Worker task: text per document, or its PDF page streams."""
+    if fmt == "pdf":
+        return [pdf_pages(text(kind, d).splitlines()) for d in docs]
+    return [text(kind, d) for d in docs]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  RENDERER – process pool plus a cache of finished documents
+# ─────────────────────────────────────────────────────────────────────────────
+def _key(kind, fmt, doc):
+    return hashlib.sha1(repr((kind, fmt, sorted(doc.items()))).encode("utf-8")).digest()
+
+
+class Renderer:
+    """
+    Renders batches of document dicts (see the builders below) on a
+    process pool, CHUNK documents per task, so a batch of hundreds uses
+    every worker and the caller's thread only waits.  A single document
+    (render / save) is rendered in the calling thread: it takes far less
+    than a round trip to a worker.  A document rendered before (same
+    kind, format and fields) comes from the cache, so reprinting a day's
+    receipts only renders the new ones.  Thread safe.  Workers are
+    spawned, not forked, so they never inherit Qt state or a lock held
+    by another thread; start() launches them, from the GUI thread in the
+    app, and a batch without it starts the pool itself.
+    """
+
+    def __init__(self, workers=WORKERS, cache=CACHE_DOCS):
+        self.workers = workers
+        self.size    = cache
+        self._pool   = None
+        self._cache  = OrderedDict()
+        self._lock   = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def start(self):
+        """Create the pool and launch its workers now, without waiting for them."""
+        pool = self._executor()
+        for _ in range(self.workers):
+            pool.submit(int)
+
+    def _on_pool(self, kind, fmt, docs):
+        pool = self._executor()
+        futures = [pool.submit(_render_chunk, kind, fmt, docs[k:k + CHUNK])
+                   for k in range(0, len(docs), CHUNK)]
+        return [res for fut in futures for res in fut.result()]
+
+    def render_many(self, kind, docs, fmt="text"):
+        """Per document: text, or a list of PDF page streams (see pdf())."""
+        return self._rendered(kind, docs, fmt, self._on_pool)
+
+    def _rendered(self, kind, docs, fmt, run):
+        """Cached documents, plus run(kind, fmt, [the rest]) for those not seen before."""
+        if kind not in TEMPLATES:
+            raise ValueError(f"unknown document kind: {kind}")
+        keys = [_key(kind, fmt, d) for d in docs]
+        out, todo = [None] * len(docs), []
+        with self._lock:
+            for k, key in enumerate(keys):
+                hit = self._cache.get(key)
+                if hit is None:
+                    todo.append(k)
+                else:
+                    self._cache.move_to_end(key)
+                    out[k] = hit
+            self.hits += len(docs) - len(todo)
+            self.misses += len(todo)
+        if todo:
+            for k, res in zip(todo, run(kind, fmt, [docs[k] for k in todo])):
+                out[k] = res
+            with self._lock:
+                for k in todo:
+                    self._cache[keys[k]] = out[k]
+                while len(self._cache) > self.size:
+                    self._cache.popitem(last=False)
+        return out
+
+    def render(self, kind, doc, fmt="text"):
+        """One document, in the calling thread → text (str) or a PDF file (bytes)."""
+        res = self._rendered(kind, [doc], fmt, _render_chunk)[0]
+        return pdf(res) if fmt == "pdf" else res
+
+    def save(self, kind, doc, path):
+        """One document, rendered once in the calling thread: PDF to `path`, text returned."""
+        txt = self.render(kind, doc)
+        _save(path, pdf(pdf_pages(txt.splitlines())))
+        return txt
+
+    def write(self, kind, docs, path, fmt=None):
+        """Render `docs` on the pool into one file (a page per document for PDF) → count."""
+        fmt = fmt or ("pdf" if path.lower().endswith(".pdf") else "text")
+        res = self.render_many(kind, docs, fmt)
+        if fmt == "pdf":
+            _save(path, pdf([page for pages in res for page in pages]))
+        else:
+            _save(path, "\n\f\n".join(res).encode("utf-8"))
+        return len(docs)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def _save(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+_shared = None
+
+def renderer():
+    """The process-wide Renderer (one pool shared by every window)."""
+    global _shared
+    if _shared is None:
+        _shared = Renderer()
+    return _shared
+
+
+def close():
+    global _shared
+    if _shared is not None:
+        _shared.close()
+        _shared = None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  DOCUMENT BUILDERS – DB rows → plain dicts that pickle to the workers
+# ─────────────────────────────────────────────────────────────────────────────
+def _money(v):
+    return Decimal(str(v if v is not None else 0))
+
+
+def _when(v):
+    if isinstance(v, datetime):
+        return v
+    return datetime.fromisoformat(str(v)) if v else datetime.now()
+
+
+def receipt(sale, cashier, patient, when, total, cart):
+    """cart: [(med_id, name, qty, unit_price, ...)] as in the Pharmacy window."""
+    return {"sale": sale, "cashier": cashier, "patient": patient or "Walk-in",
+            "when": _when(when), "total": _money(total),
+            "items": [{"name": n, "qty": int(q), "price": _money(p), "line": int(q) * _money(p)}
+                      for _m, n, q, p, *_ in cart]}
+
+
+def slip(pid, name, spec, doctor, when=None):
+    return {"patient": pid, "name": name, "spec": spec, "doctor": doctor, "when": _when(when)}
+
+
+def rx_form(doctor, pid, name, rxs):
+    """rxs: (Prescription_ID, drug, dosage, qty, refills, instructions) per line."""
+    return {"doctor": doctor or "-", "patient": pid, "name": name,
+            "items": [_rx_line(*r) for r in rxs]}
+
+
+def _rx_line(rx, drug, dose, qty, ref, sig):
+    return {"rx": rx, "drug": drug, "dosage": dose, "qty": qty, "refills": ref,
+            "sig": f"\n    {sig}" if sig else ""}
+
+
+def day_receipts(db, day):
+    """Every receipt rung up on `day`, in SaleID order."""
+    heads, items = db.sales_on(day)
+    lines = {}
+    for sid, mid, name, qty, price in items:
+        lines.setdefault(sid, []).append((mid, name or mid, qty, price))
+    return [receipt(sid, cashier, pid, when, total, lines.get(sid, []))
+            for sid, pid, cashier, total, when in heads]
+
+
+def active_rx_forms(db, pids=None, doctor=None):
+    """One Rx form per patient with active prescriptions (pids: e.g. a ward's list)."""
+    forms, cur = [], None
+    for pid, first, last, rx, drug, dose, qty, ref, sig in db.active_rxs(pids):
+        if cur is None or cur["patient"] != pid:
+            cur = rx_form(doctor, pid, f"{first} {last}", [])
+            forms.append(cur)
+        cur["items"].append(_rx_line(rx, drug, dose, qty, ref, sig))
+    return forms
+
+
+def batch(db, job, path=None, fmt="pdf", day=None, pids=None, rnd=None):
+    """
+    Run a batch job → (documents, path):
+      "receipts"  every receipt of `day` (default today)
+      "rx-forms"  active-Rx forms for `pids` (default every patient)
+    """
+    rnd = rnd or renderer()
+    if job == "receipts":
+        day = str(day or date.today())
+        docs, kind, name = day_receipts(db, day), "receipt", f"receipts-{day}"
+    elif job == "rx-forms":
+        docs, kind, name = active_rx_forms(db, pids), "rx_form", f"rx-forms-{date.today()}"
+    else:
+        raise ValueError(f"unknown batch job: {job}")
+    path = path or os.path.join(DOCS_DIR, name + (".pdf" if fmt == "pdf" else ".txt"))
+    return rnd.write(kind, docs, path, fmt), path
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m documents",
+                                 description="Render a batch of receipts or Rx forms to PDF or text.")
+    ap.add_argument("job", choices=("receipts", "rx-forms"))
+    ap.add_argument("-o", "--out", help=f"output file (default under {DOCS_DIR}/)")
+    ap.add_argument("--format", choices=("pdf", "text"), default="pdf")
+    ap.add_argument("--date", help="receipts: day to reprint, YYYY-MM-DD (default today)")
+    ap.add_argument("--patients", help="rx-forms: comma separated Patient_IDs, or @file with one per line")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="render processes")
+    a = ap.parse_args(argv)
+
+    pids = None
+    if a.patients:
+        if a.patients.startswith("@"):
+            with open(a.patients[1:], encoding="utf-8") as f:
+                pids = [l.strip() for l in f if l.strip()]
+        else:
+            pids = [p.strip() for p in a.patients.split(",") if p.strip()]
+
+    from db import DB
+    db, rnd = DB(), Renderer(a.workers)
+    try:
+        t = time.perf_counter()
+        n, path = batch(db, a.job, a.out, a.format, a.date, pids, rnd)
+        print(f"{n} documents → {path} in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+    finally:
+        rnd.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
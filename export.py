@@ -0,0 +1,198 @@
+###############################################################################
+#  HISTORY EXPORT – streaming dumps of the sales / prescription / audit tables
+###############################################################################
+import argparse, bz2, csv, datetime, gzip, io, json, lzma, os, sys
+from decimal import Decimal
+
+from statements import EXPORTS, INT, export_page
+
+CHUNK = 10_000      # rows per keyset page (one short statement each)
+FETCH = 1_000       # rows per fetchmany() within a page
+
+FORMATS = ("csv", "jsonl", "parquet", "arrow")
+TEXT_CODECS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+EXTENSIONS  = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def batches(db, table, since=None, until=None, chunk=CHUNK, fetch=FETCH):
+    """
+    Yield lists of at most `fetch` rows of EXPORTS[table] in key order.
+    Each keyset page of `chunk` rows is its own statement, so no lock or
+    snapshot is held for the whole export, and only one fetchmany() batch
+    is in memory at a time.  since / until bound the table's date column
+    (since <= date < until, 'YYYY-MM-DD').
+    """
+    dated = since is not None or until is not None
+    name = export_page(table, dated)
+    key, after = EXPORTS[table][2], _start(table)
+    params = (since or "0001-01-01", until or "9999-12-31") if dated else ()
+    while True:
+        seen = 0
+        with db._stream(name, (after,) + params, chunk) as cur:
+            at = [d[0] for d in cur.description].index(key)
+            while True:
+                rows = cur.fetchmany(fetch)
+                if not rows:
+                    break
+                seen += len(rows)
+                after = rows[-1][at]
+                yield rows
+        if seen < chunk:
+            return
+
+
+def _start(table):
+    """Keyset value below every key of the table."""
+    return 0 if EXPORTS[table][3] == INT else ""
+
+
+def columns(db, table):
+    """Column names of an export, from an empty page."""
+    with db._stream(export_page(table, False), (_start(table),), 0) as cur:
+        names = [d[0] for d in cur.description]
+        cur.fetchall()
+        return names
+
+
+def _plain(v):
+    """JSON-safe value: money as a string (exact), dates as ISO text."""
+    if isinstance(v, Decimal):
+        return str(v)
+    if isinstance(v, (datetime.date, datetime.time)):
+        return v.isoformat()
+    if isinstance(v, bytes):
+        return v.hex()
+    return v
+
+
+def _open_text(path, compress):
+    if compress is None:
+        return open(path, "w", newline="", encoding="utf-8")
+    return io.TextIOWrapper(TEXT_CODECS[compress](path, "wb"), encoding="utf-8", newline="")
+
+
+def _write_csv(f, cols, source):
+    out, n = csv.writer(f), 0
+    out.writerow(cols)
+    for rows in source:
+        out.writerows(rows)
+        n += len(rows)
+    return n
+
+
+def _write_jsonl(f, cols, source):
+    n = 0
+    for rows in source:
+        f.writelines(json.dumps(dict(zip(cols, map(_plain, r))), ensure_ascii=False) + "\n"
+                     for r in rows)
+        n += len(rows)
+    return n
+
+
+def _arrow_type(pa, values):
+    """Column type from its first batch; decimals widened so later rows fit."""
+    t = pa.array(values).type
+    if pa.types.is_null(t):
+        return pa.string()
+    if pa.types.is_decimal(t):
+        return pa.decimal128(38, t.scale)
+    return t
+
+
+def _write_columnar(path, fmt, compress, cols, source, chunk):
+    """Parquet / Arrow IPC, one row group / record batch per `chunk` rows."""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError(f"{fmt} export needs pyarrow (pip install pyarrow)") from None
+    writer, schema, buf, n = None, None, [], 0
+
+    def flush():
+        nonlocal writer, schema
+        if schema is None:
+            schema = pa.schema([(c, _arrow_type(pa, [r[k] for r in buf])) for k, c in enumerate(cols)])
+        data = [pa.array([r[k] for r in buf], type=schema.field(k).type) for k in range(len(cols))]
+        batch = pa.RecordBatch.from_arrays(data, schema=schema)
+        if writer is None:
+            if fmt == "parquet":
+                import pyarrow.parquet as pq
+                writer = pq.ParquetWriter(path, schema, compression=compress or "snappy")
+            else:
+                opts = pa.ipc.IpcWriteOptions(compression=compress)
+                writer = pa.ipc.new_file(path, schema, options=opts)
+        writer.write_table(pa.Table.from_batches([batch]))
+        buf.clear()
+
+    try:
+        for rows in source:
+            buf += rows
+            n += len(rows)
+            if len(buf) >= chunk:
+                flush()
+        if buf or writer is None:
+            if not buf:
+                schema = pa.schema([(c, pa.string()) for c in cols])
+            flush()
+    finally:
+        if writer is not None:
+            writer.close()
+    return n
+
+
+def guess(path):
+    """(format, compression) from a file name like sales.csv.gz or rx.parquet."""
+    base, ext = os.path.splitext(path)
+    compress = EXTENSIONS.get(ext.lower())
+    if compress:
+        base, ext = os.path.splitext(base)
+    fmt = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".parquet": "parquet",
+           ".arrow": "arrow", ".feather": "arrow"}.get(ext.lower(), "csv")
+    return fmt, compress
+
+
+def export_table(db, table, path, fmt=None, compress=None, since=None, until=None,
+                 chunk=CHUNK, fetch=FETCH):
+    """
+    Stream EXPORTS[table] to `path`; returns the row count.  fmt and
+    compress default from the file name.  Text formats take gzip, bz2 or
+    xz; parquet / arrow take the codecs pyarrow knows (snappy, zstd, lz4…).
+    """
+    if table not in EXPORTS:
+        raise ValueError(f"Unknown export table: {table}")
+    g_fmt, g_comp = guess(path)
+    fmt, compress = fmt or g_fmt, compress or g_comp
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt in ("csv", "jsonl") and compress not in (None, *TEXT_CODECS):
+        raise ValueError(f"{fmt} compression must be one of {', '.join(TEXT_CODECS)}")
+    cols = columns(db, table)
+    source = batches(db, table, since, until, chunk, fetch)
+    if fmt in ("parquet", "arrow"):
+        return _write_columnar(path, fmt, compress, cols, source, chunk)
+    with _open_text(path, compress) as f:
+        return (_write_csv if fmt == "csv" else _write_jsonl)(f, cols, source)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m export",
+                                 description="Stream a history table to CSV, JSON Lines, Parquet or Arrow.")
+    ap.add_argument("table", choices=sorted(EXPORTS))
+    ap.add_argument("out", help="file name; the extension picks the format (e.g. sales.csv.gz)")
+    ap.add_argument("--format", choices=FORMATS)
+    ap.add_argument("--compress", help="gzip / bz2 / xz, or a pyarrow codec for parquet / arrow")
+    ap.add_argument("--since", metavar="YYYY-MM-DD", help="first day to include")
+    ap.add_argument("--until", metavar="YYYY-MM-DD", help="first day to leave out")
+    ap.add_argument("--chunk", type=int, default=CHUNK)
+    a = ap.parse_args(argv)
+
+    from db import DB
+    db = DB()
+    try:
+        n = export_table(db, a.table, a.out, a.format, a.compress, a.since, a.until, a.chunk)
+        print(f"exported {n} rows to {a.out}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+###############################################################################
+#  METRICS – per-statement latency histograms and a slow-query log
+###############################################################################
+import bisect, functools, json, logging, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from decimal import Decimal
+
+SLOW_MS = float(os.environ.get("HMS_SLOW_MS", "250"))   # slow-query log threshold
+SAMPLES = 2048      # recent latencies kept per statement for p50/p95/p99
+SLOW_KEEP = 200     # slow calls kept for the JSON snapshot
+
+# Prometheus histogram bucket bounds, seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_log = logging.getLogger("hms.slow")
+
+
+def shape(v):
+    """Type and size of a bound parameter, never its value (patient data)."""
+    if v is None:
+        return "null"
+    if isinstance(v, (str, bytes, list, tuple, set, dict)):
+        return f"{type(v).__name__}[{len(v)}]"
+    if isinstance(v, Decimal):
+        return "decimal"
+    return type(v).__name__
+
+
+def row_count(res):
+    """Rows in a fetch result: a list, one row or None."""
+    if res is None:
+        return 0
+    return len(res) if isinstance(res, list) else 1
+
+
+class _Stat:
+    __slots__ = ("calls", "errors", "rows", "total", "buckets", "recent")
+
+    def __init__(self):
+        self.calls = self.errors = self.rows = 0
+        self.total   = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)     # last one is +Inf
+        self.recent  = deque(maxlen=SAMPLES)
+
+
+def _pct(xs, p):
+    return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))] if xs else None
+
+
+class Metrics:
+    """
+    Thread-safe collector keyed by statement name.  Calls, rows and
+    errors are lifetime counters; percentiles come from the last SAMPLES
+    calls; anything over `slow_ms` is logged to "hms.slow".
+    """
+
+    def __init__(self, slow_ms=SLOW_MS):
+        self.slow_ms = slow_ms
+        self.started = time.time()
+        self.slow    = deque(maxlen=SLOW_KEEP)
+        self._stats  = {}
+        self._counts = {}         # (family, statement, outcome) → events
+        self._lock   = threading.Lock()
+        self._calls  = threading.local()     # stack of row counters, one per open call
+
+    def add_rows(self, n):
+        """Called by the DB helpers; credited to the innermost timed call."""
+        stack = getattr(self._calls, "stack", None)
+        if stack:
+            stack[-1] += n
+
+    def record(self, name, seconds, rows=0, params=(), error=False):
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = _Stat()
+            st.calls += 1
+            st.errors += error
+            st.rows  += rows
+            st.total += seconds
+            st.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+            st.recent.append(seconds)
+        ms = seconds * 1000
+        if ms >= self.slow_ms:
+            entry = {"at": time.time(), "stmt": name, "ms": round(ms, 3), "rows": rows,
+                     "params": [shape(p) for p in params], "error": error}
+            self.slow.append(entry)
+            slow_log.warning("slow %s %.1f ms rows=%d params=%s", name, ms, rows, entry["params"])
+
+    def count(self, family, name, outcome, n=1):
+        """Bump an event counter, e.g. ("flight", "get_pat", "shared")."""
+        key = (family, name, outcome)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + n
+
+    @contextmanager
+    def timed(self, name, params=()):
+        """Time a block that isn't a DB method (e.g. a multi-call worker)."""
+        t, err = time.perf_counter(), False
+        try:
+            yield
+        except Exception:
+            err = True
+            raise
+        finally:
+            self.record(name, time.perf_counter() - t, 0, params, error=err)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._counts.clear()
+            self.slow.clear()
+            self.started = time.time()
+
+    # export ----------------------------------------------------------------
+    def snapshot(self):
+        with self._lock:
+            items = [(n, st.calls, st.errors, st.rows, st.total, sorted(st.recent))
+                     for n, st in self._stats.items()]
+            slow = list(self.slow)
+            counts = sorted(self._counts.items())
+        out, events = {}, {}
+        for name, calls, errors, rows, total, xs in sorted(items):
+            out[name] = {
+                "calls": calls, "errors": errors, "rows": rows,
+                "mean_ms": total / calls * 1000 if calls else None,
+                "p50_ms": _ms(_pct(xs, 50)), "p95_ms": _ms(_pct(xs, 95)),
+                "p99_ms": _ms(_pct(xs, 99)), "max_ms": _ms(xs[-1] if xs else None),
+            }
+        for (family, name, outcome), n in counts:
+            events.setdefault(family, {}).setdefault(name, {})[outcome] = n
+        return {"since": self.started, "at": time.time(), "slow_ms": self.slow_ms,
+                "statements": out, "events": events, "slow": slow}
+
+    def to_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def prometheus(self):
+        with self._lock:
+            items = sorted((n, st.calls, st.errors, st.rows, st.total, list(st.buckets))
+                           for n, st in self._stats.items())
+            counts = sorted(self._counts.items())
+        out = [
+            "# HELP hms_db_call_seconds Latency of DB calls by statement.",
+            "# TYPE hms_db_call_seconds histogram",
+        ]
+        for name, calls, _e, _r, total, buckets in items:
+            label, acc = _label(name), 0
+            for bound, n in zip(BUCKETS, buckets):
+                acc += n
+                out.append(f'hms_db_call_seconds_bucket{{stmt="{label}",le="{bound}"}} {acc}')
+            out.append(f'hms_db_call_seconds_bucket{{stmt="{label}",le="+Inf"}} {calls}')
+            out.append(f'hms_db_call_seconds_sum{{stmt="{label}"}} {total:.6f}')
+            out.append(f'hms_db_call_seconds_count{{stmt="{label}"}} {calls}')
+        for metric, help_, col in (("hms_db_rows_total", "Rows returned or affected.", 3),
+                                   ("hms_db_errors_total", "DB calls that raised.", 2)):
+            out += [f"# HELP {metric} {help_}", f"# TYPE {metric} counter"]
+            out += [f'{metric}{{stmt="{_label(it[0])}"}} {it[col]}' for it in items]
+        for family in sorted({k[0] for k, _ in counts}):
+            metric = f"hms_{family}_total"
+            out += [f"# HELP {metric} {family} events by statement and outcome.",
+                    f"# TYPE {metric} counter"]
+            out += [f'{metric}{{stmt="{_label(name)}",outcome="{_label(outcome)}"}} {n}'
+                    for (fam, name, outcome), n in counts if fam == family]
+        return "\n".join(out) + "\n"
+
+    def to_prometheus(self, path):
+        # write-then-rename so a node_exporter textfile scrape never sees half a file
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def dump(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        self.to_json(os.path.join(folder, "hms_metrics.json"))
+        self.to_prometheus(os.path.join(folder, "hms_metrics.prom"))
+
+
+def _ms(s):
+    return None if s is None else s * 1000
+
+
+def _label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def instrument(cls, names):
+    """Wrap cls.<name> so each call is recorded on self.metrics under its name."""
+    for name in names:
+        fn = getattr(cls, name)
+
+        @functools.wraps(fn)
+        def call(self, *args, _fn=fn, _name=name, **kw):
+            m = self.metrics
+            stack = m._calls.__dict__.setdefault("stack", [])
+            stack.append(0)
+            t, err = time.perf_counter(), False
+            try:
+                return _fn(self, *args, **kw)
+            except Exception:
+                err = True
+                raise
+            finally:
+                m.record(_name, time.perf_counter() - t, stack.pop(), args, error=err)
+        setattr(cls, name, call)
+    return cls
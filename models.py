@@ -0,0 +1,105 @@
+###############################################################################
+#  TABLE MODELS – lazily paged rows for QTableView
+###############################################################################
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+PAGE = 200     # rows per fetchMore()
+
+
+class PagedModel(QAbstractTableModel):
+    """
+    Read-only table model holding rows as plain tuples.
+
+    load(fetch) pages through a keyset query: fetch(last_row, n) must return
+    the n rows that follow `last_row` (None for the first page).  The view
+    asks for the next page via canFetchMore/fetchMore only when it scrolls
+    near the end, and each page is fetched on the window's Runner.  A
+    page that fails is reported and ends paging until the next load(); one
+    dropped by the Runner (superseded, logout) can simply be asked for again.
+    Columns past len(headers) are kept (e.g. keyset columns) but not shown.
+    """
+    loaded = pyqtSignal(int)      # total rows after the first / each page lands
+
+    def __init__(self, headers, runner, page=PAGE, parent=None):
+        super().__init__(parent)
+        self.headers = list(headers)
+        self.runner  = runner
+        self.page    = page
+        self.rows    = []
+        self._fetch  = None
+        self._more   = False
+        self._busy   = False
+        self._gen    = 0
+
+    # filling ---------------------------------------------------------------
+    def load(self, fetch):
+        """Start over with a keyset-paged source."""
+        self._reset()
+        self._fetch, self._more = fetch, True
+        self.fetchMore()
+
+    def set_rows(self, rows):
+        """Show an already materialised result (e.g. from the catalog)."""
+        self._reset([tuple(r) for r in rows])
+        self.loaded.emit(len(self.rows))
+
+    def clear(self):
+        self._reset()
+
+    def _reset(self, rows=()):
+        self.beginResetModel()
+        self._gen += 1
+        self.rows, self._fetch, self._more, self._busy = list(rows), None, False, False
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return self._more and not self._busy and not parent.isValid()
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        self._busy = True
+        gen, last = self._gen, (self.rows[-1] if self.rows else None)
+        self.runner.run(("page", id(self)), self._fetch, last, self.page,
+                        done=lambda rows: self._append(gen, rows),
+                        error=lambda exc: self._failed(gen, exc),
+                        cancel=lambda: self._dropped(gen))
+
+    def _failed(self, gen, exc):
+        if gen != self._gen:
+            return
+        self._busy = self._more = False
+        self.runner.report(exc)
+
+    def _dropped(self, gen):
+        if gen == self._gen:
+            self._busy = False
+
+    def _append(self, gen, rows):
+        if gen != self._gen:
+            return
+        self._busy = False
+        self._more = len(rows) >= self.page
+        if rows:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self.rows.extend(tuple(r) for r in rows)
+            self.endInsertRows()
+        self.loaded.emit(len(self.rows))
+
+    # QAbstractTableModel ---------------------------------------------------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self.rows[index.row()][index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
@@ -0,0 +1,61 @@
+###############################################################################
+#  REFERENCE DATA – read-mostly lookups cached as immutable snapshots
+###############################################################################
+import threading, time
+from collections import namedtuple
+from types import MappingProxyType
+
+Doctor = namedtuple("Doctor", "Doctor_ID Full_Name Room_No")
+
+REF_TTL = 300       # seconds before the next lookup reloads
+
+
+class RefData:
+    """
+    Active doctors grouped by specialization, loaded with one query.
+
+    The snapshot is a read-only mapping {specialization: (Doctor, …)} that
+    is swapped whole on reload, so readers never see a half-built copy and
+    need no lock.  It reloads when older than `ttl` or after invalidate().
+    """
+
+    def __init__(self, db, ttl=REF_TTL):
+        self.db     = db
+        self.ttl    = ttl
+        self.hits   = 0
+        self.misses = 0
+        self._snap  = None
+        self._at    = 0.0
+        self._lock  = threading.Lock()
+
+    def snapshot(self):
+        snap = self._snap
+        if snap is not None and time.monotonic() - self._at <= self.ttl:
+            self.hits += 1
+            return snap
+        with self._lock:
+            # another thread may have reloaded while we waited
+            if self._snap is not snap and self._snap is not None:
+                self.hits += 1
+                return self._snap
+            self.misses += 1
+            groups = {}
+            for r in self.db.doctors():
+                groups.setdefault(r.Specialization, []).append(
+                    Doctor(r.Doctor_ID, r.Full_Name, r.Room_No))
+            self._snap = MappingProxyType({sp: tuple(ds) for sp, ds in groups.items()})
+            self._at   = time.monotonic()
+            return self._snap
+
+    def invalidate(self):
+        self._snap = None
+
+    def specs(self):
+        return list(self.snapshot())
+
+    def docs(self, sp):
+        return self.snapshot().get(sp, ())
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "age": time.monotonic() - self._at if self._snap is not None else None}
@@ -0,0 +1,320 @@
+###############################################################################
+#  SERVICE – one shared DB pool behind a small asyncio HTTP/JSON API
+###############################################################################
+import argparse, asyncio, datetime, json, logging, os, secrets, sys, time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+HOST = os.environ.get("HMS_SERVICE_HOST", "127.0.0.1")
+PORT = int(os.environ.get("HMS_SERVICE_PORT", "8765"))
+SESSION_TTL = 12 * 3600     # idle seconds before a login token expires
+MAX_BODY    = 4 << 20       # largest request body accepted, bytes
+
+# DB methods callable over the wire: everything the windows call, directly
+# or through bulk.py / documents.py.  Identical READS that arrive while one
+# is already running share its result instead of queueing a second query.
+READS = {
+    "get_pat", "search_pats", "specs", "docs_by_spec", "doctors", "med_search", "rxs_of",
+    "refills_left", "inv", "inv_many", "inv_list", "catalog_rows", "catalog_mark", "med_exists",
+    "inventory_summary", "dashboard", "reorder_suggestions", "sales_on", "active_rxs",
+    "audit_history",
+    "catalog.search", "catalog.inv_list", "catalog.get", "refdata.specs", "refdata.docs",
+}
+WRITES = {
+    "new_pid", "add_pat", "upd_pat", "new_rxid", "add_rx", "use_refill", "dispense_refills",
+    "adjust", "new_med_id", "add_med", "upsert_med", "upsert_inv", "import_chunk", "save_sale",
+    "checkout", "reserve_stock", "release_stock", "refresh_rollups", "refresh_forecast",
+    "save_reorder", "archive_audit", "compact_ledger", "catalog.refresh",
+}
+API = READS | WRITES
+
+# what each role may call, checked on every call before it runs; the
+# lookups behind every window (catalog, doctor list, patient header) are shared
+SHARED = {
+    "get_pat", "specs", "docs_by_spec", "doctors", "med_search", "inv", "inv_many", "inv_list",
+    "catalog_rows", "catalog_mark", "med_exists",
+    "catalog.search", "catalog.inv_list", "catalog.get", "refdata.specs", "refdata.docs",
+}
+ROLES = {
+    "Intern":     SHARED | {"search_pats", "new_pid", "add_pat", "upd_pat"},
+    "Doctor":     SHARED | {"search_pats", "rxs_of", "active_rxs", "new_rxid", "add_rx"},
+    "Pharmacist": SHARED | {"search_pats", "rxs_of", "refills_left", "active_rxs", "sales_on",
+                            "use_refill", "dispense_refills", "save_sale", "checkout",
+                            "reserve_stock", "release_stock"},
+    "Manager":    SHARED | {"inventory_summary", "dashboard", "reorder_suggestions", "sales_on",
+                            "audit_history", "adjust", "new_med_id", "add_med", "upsert_med",
+                            "upsert_inv", "import_chunk", "refresh_rollups", "refresh_forecast",
+                            "save_reorder", "archive_audit", "compact_ledger", "catalog.refresh"},
+    "CEO":        API,
+}
+
+# writes that record who made them → (position, name) of the argument naming
+# that user; it must be the session's own user, so no counter can book a sale
+# under someone else's name
+AS_USER = {"save_sale": (0, "cashier"), "checkout": (0, "cashier")}
+
+log = logging.getLogger("hms.service")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  WIRE FORMAT – JSON plus tagged rows, money and dates
+# ─────────────────────────────────────────────────────────────────────────────
+def _fields(v):
+    """Column names of a DB row (pyodbc Row or namedtuple), else None."""
+    if hasattr(v, "_fields"):
+        return v._fields
+    desc = getattr(v, "cursor_description", None)
+    return tuple(d[0] for d in desc) if desc else None
+
+
+def _tag(v):
+    if isinstance(v, Decimal):
+        return {"$dec": str(v)}
+    if isinstance(v, datetime.datetime):
+        return {"$dt": v.isoformat()}
+    if isinstance(v, datetime.date):
+        return {"$date": v.isoformat()}
+    if isinstance(v, (tuple, list)) or _fields(v):
+        names = _fields(v)
+        vals = [_tag(x) for x in v]
+        return {"$row": names, "v": vals} if names else vals
+    if isinstance(v, dict):
+        return {k: _tag(x) for k, x in v.items()}
+    if isinstance(v, (bytes, bytearray)):
+        return {"$hex": bytes(v).hex()}
+    return v
+
+
+_ROWS = {}
+
+def _untag(d):
+    if "$row" in d:
+        cls = _ROWS.get(tuple(d["$row"]))
+        if cls is None:
+            cls = _ROWS[tuple(d["$row"])] = namedtuple("Row", d["$row"], rename=True)
+        return cls(*d["v"])
+    if "$dec" in d:
+        return Decimal(d["$dec"])
+    if "$dt" in d:
+        return datetime.datetime.fromisoformat(d["$dt"])
+    if "$date" in d:
+        return datetime.date.fromisoformat(d["$date"])
+    if "$hex" in d:
+        return bytes.fromhex(d["$hex"])
+    return d
+
+
+def dumps(v):
+    return json.dumps(_tag(v), ensure_ascii=False).encode("utf-8")
+
+
+def loads(b):
+    return json.loads(b, object_hook=_untag)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  SERVER
+# ─────────────────────────────────────────────────────────────────────────────
+Session = namedtuple("Session", "role name seen")
+
+_STATUS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+           409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Service:
+    """
+    Routes (all JSON):
+      POST /login          {"user", "password"} → {"role", "name", "token"}
+      POST /call/<method>  {"args": [...], "kwargs": {...}}, Bearer token → result
+      GET  /health         pool and coalescing counters
+      GET  /metrics        Prometheus text for the shared DB
+    DB calls run on a thread pool the size of the connection pool.
+    """
+
+    def __init__(self, db, workers=None, session_ttl=SESSION_TTL):
+        self.db  = db
+        self.ttl = session_ttl
+        self.pool = ThreadPoolExecutor(workers or db.pool.size, thread_name_prefix="hms-db")
+        self.sessions  = {}       # token → Session
+        self.inflight  = {}       # (method, args) → Future of a running read
+        self.calls = self.coalesced = 0
+        self.started = time.time()
+
+    def _target(self, method):
+        if "." in method:
+            owner, attr = method.split(".", 1)
+            return getattr(getattr(self.db, owner)(), attr)
+        return getattr(self.db, method)
+
+    async def _blocking(self, fn, *args, **kw):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, lambda: fn(*args, **kw))
+
+    # routes ----------------------------------------------------------------
+    async def login(self, body):
+        role, name = await self._blocking(self.db.login, body.get("user", ""), body.get("password", ""))
+        if not role:
+            return {"role": None, "name": None, "token": None}
+        now = time.monotonic()
+        for t in [t for t, s in self.sessions.items() if now - s.seen > self.ttl]:
+            del self.sessions[t]
+        token = secrets.token_urlsafe(24)
+        self.sessions[token] = Session(role, name, now)
+        return {"role": role, "name": name, "token": token}
+
+    def _session(self, headers):
+        auth = headers.get("authorization", "")
+        token = auth[7:] if auth.lower().startswith("bearer ") else ""
+        s = self.sessions.get(token)
+        now = time.monotonic()
+        if s is None or now - s.seen > self.ttl:
+            self.sessions.pop(token, None)
+            raise HttpError(401, "not logged in")
+        self.sessions[token] = s._replace(seen=now)
+        return s
+
+    async def call(self, method, body, session):
+        if method not in API:
+            raise HttpError(404, f"no such method: {method}")
+        if method not in ROLES.get(session.role, ()):
+            raise HttpError(403, f"{session.role} may not call {method}")
+        args, kw = body.get("args", []), body.get("kwargs", {})
+        if method in AS_USER:
+            pos, arg = AS_USER[method]
+            if (args[pos] if len(args) > pos else kw.get(arg)) != session.name:
+                raise HttpError(403, f"{method}: {arg} must be the logged-in user")
+        self.calls += 1
+        fn = self._target(method)
+        if method not in READS:
+            return await self._blocking(fn, *args, **kw)
+        key = (method, json.dumps([_tag(args), _tag(kw)], sort_keys=True))
+        fut = self.inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+        fut = asyncio.ensure_future(self._blocking(fn, *args, **kw))
+        self.inflight[key] = fut
+        try:
+            return await asyncio.shield(fut)
+        finally:
+            if self.inflight.get(key) is fut:
+                del self.inflight[key]
+
+    def health(self):
+        now = time.monotonic()
+        return {"uptime": time.time() - self.started, "calls": self.calls,
+                "coalesced": self.coalesced, "inflight": len(self.inflight),
+                "sessions": sum(now - s.seen <= self.ttl for s in self.sessions.values()),
+                "pool": self.db.pool.stats()}
+
+    async def route(self, verb, path, headers, body):
+        if verb == "GET" and path == "/health":
+            return 200, "application/json", dumps(self.health())
+        if verb == "GET" and path == "/metrics":
+            return 200, "text/plain; version=0.0.4", self.db.metrics.prometheus().encode("utf-8")
+        if verb != "POST":
+            raise HttpError(404, f"no route for {verb} {path}")
+        try:
+            req = loads(body) if body else {}
+        except ValueError:
+            raise HttpError(400, "body is not JSON") from None
+        if path == "/login":
+            return 200, "application/json", dumps(await self.login(req))
+        if path.startswith("/call/"):
+            s = self._session(headers)
+            return 200, "application/json", dumps({"result": await self.call(path[6:], req, s)})
+        raise HttpError(404, f"no route for {verb} {path}")
+
+    # HTTP/1.1 with keep-alive; just enough for the client in client.py --------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                try:
+                    verb, path, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    return
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                n = int(headers.get("content-length") or 0)
+                try:
+                    if n > MAX_BODY:
+                        raise HttpError(413, "request too large")
+                    body = await reader.readexactly(n) if n else b""
+                    status, ctype, out = await self.route(verb, path, headers, body)
+                except HttpError as e:
+                    status, ctype, out = e.status, "application/json", dumps({"error": "HttpError",
+                                                                                "message": str(e)})
+                except Exception as e:
+                    status, ctype, out = self._failure(e)
+                writer.write(f"HTTP/1.1 {status} {_STATUS.get(status, '')}\r\n"
+                             f"Content-Type: {ctype}\r\nContent-Length: {len(out)}\r\n\r\n"
+                             .encode("latin-1") + out)
+                await writer.drain()
+                if status == 413 or headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+    def _failure(self, e):
+        """DB errors travel back by type so the client can raise the same one."""
+        from db import OutOfStock, PoolTimeout
+        err = {"error": type(e).__name__, "message": str(e)}
+        if isinstance(e, OutOfStock):
+            err["short"] = e.short
+            return 409, "application/json", dumps(err)
+        if not isinstance(e, (PoolTimeout, TypeError, ValueError)):
+            log.exception("call failed")
+        return 500, "application/json", dumps(err)
+
+    async def serve(self, host=HOST, port=PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        log.info("listening on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+        if ready:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m service",
+                                 description="Serve the DB layer to the counter windows over HTTP/JSON.")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--pool-size", type=int, help="DB connections (default db.POOL_SIZE)")
+    a = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    from db import DB, POOL_SIZE
+    db = DB(pool_size=a.pool_size or POOL_SIZE)
+    svc = Service(db)
+    try:
+        asyncio.run(svc.serve(a.host, a.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        svc.close()
+        db.close()
+        print("service stopped", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
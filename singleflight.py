@@ -0,0 +1,125 @@
+###############################################################################
+#  SINGLE-FLIGHT – concurrent identical reads share one query
+###############################################################################
+import functools, threading, time
+
+MAX_CACHED = 1024   # TTL results kept before expired ones are swept
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done  = threading.Event()
+        self.value = self.error = None
+
+
+def _share(v):
+    # each caller gets its own list; the rows inside are immutable
+    return list(v) if isinstance(v, list) else v
+
+
+class SingleFlight:
+    """
+    do(group, key, fn): the first caller of a key runs fn, callers that
+    arrive while it runs wait and get the same result (or exception).
+    With ttl > 0 the result is also reused for that many seconds, until
+    clear() (called after every write).  Outcomes are counted on `metrics`
+    as ("flight", group, "leader" | "shared" | "cached").
+    """
+
+    def __init__(self, ttl=0.0, metrics=None):
+        self.ttl     = ttl
+        self.metrics = metrics
+        self._calls  = {}         # key → _Call in progress
+        self._cache  = {}         # key → (expires, value)
+        self._gen    = 0          # bumped by clear(); stale leaders don't cache
+        self._lock   = threading.Lock()
+
+    def _count(self, group, outcome):
+        if self.metrics is not None:
+            self.metrics.count("flight", group, outcome)
+
+    def do(self, group, key, fn):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] > time.monotonic():
+                cached = True
+            else:
+                cached, call = False, self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                gen = self._gen
+        if cached:
+            self._count(group, "cached")
+            return _share(hit[1])
+        if not leader:
+            self._count(group, "shared")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.value)
+
+        self._count(group, "leader")
+        try:
+            call.value = fn()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                if call.error is None and self.ttl > 0 and gen == self._gen:
+                    if len(self._cache) >= MAX_CACHED:
+                        self._sweep()
+                    self._cache[key] = (time.monotonic() + self.ttl, call.value)
+            call.done.set()
+
+    def _sweep(self):
+        now = time.monotonic()
+        for k in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+            del self._cache[k]
+        if len(self._cache) >= MAX_CACHED:
+            self._cache.clear()
+
+    def clear(self):
+        """Forget cached results; reads already running finish but aren't joined."""
+        with self._lock:
+            self._gen += 1
+            self._cache.clear()
+            self._calls.clear()
+
+
+def coalesce(cls, names):
+    """Route cls.<name> through self.flight, keyed by the method and its arguments."""
+    for name in names:
+        fn = getattr(cls, name)
+
+        @functools.wraps(fn)
+        def call(self, *args, _fn=fn, _name=name, **kw):
+            key = (_name, args, tuple(sorted(kw.items())))
+            try:
+                hash(key)
+            except TypeError:           # e.g. a list argument: run it alone
+                return _fn(self, *args, **kw)
+            return self.flight.do(_name, key, lambda: _fn(self, *args, **kw))
+        setattr(cls, name, call)
+    return cls
+
+
+def invalidating(cls, names):
+    """After cls.<name> returns, drop every cached read (see SingleFlight.clear)."""
+    for name in names:
+        fn = getattr(cls, name)
+
+        @functools.wraps(fn)
+        def call(self, *args, _fn=fn, **kw):
+            try:
+                return _fn(self, *args, **kw)
+            finally:
+                self.flight.clear()
+        setattr(cls, name, call)
+    return cls
@@ -0,0 +1,794 @@
+###############################################################################
+#  STATEMENTS – every query the data layer runs, declared once by name
+###############################################################################
+from collections import namedtuple
+
+# mssql / sqlite: statement text per backend (sqlite=None → same text,
+# mssql=None → SQLite only).  types: the SQL-Server parameter types, in
+# order, so every call binds them the same way and the server keeps one plan
+# instead of one per NVARCHAR length.
+Stmt = namedtuple("Stmt", "mssql sqlite types")
+
+# parameter types (mapped to ODBC types by SqlServerBackend.input_sizes)
+ID, NAME, TEXT, LIKE, JSON = "id", "name", "text", "like", "json"
+INT, MONEY, HASH, DATE, STAMP = "int", "money", "hash", "date", "stamp"
+RATE, VERSION = "rate", "version"
+
+STATEMENTS = {}
+
+
+def register(name, mssql, sqlite=None, types=()):
+    STATEMENTS[name] = Stmt(mssql, sqlite, tuple(types))
+    return name
+
+
+def _both(template, **parts):
+    """Fill a template's {placeholders} once per dialect: parts are (mssql, sqlite)."""
+    return (template.format(**{k: v[0] for k, v in parts.items()}),
+            template.format(**{k: v[1] for k, v in parts.items()}))
+
+
+def on_hand(t="i"):
+    """
+    Stock on hand for inventory row `t`: the folded Quantity plus ledger
+    entries not yet compacted into it (none unless HMS_STOCK_MODE=ledger).
+    """
+    return (f"({t}.Quantity + COALESCE((SELECT SUM(l.Qty_Change) FROM Stock_Ledger l "
+            f"WHERE l.Medication_ID = {t}.Medication_ID AND l.Entry_ID > {t}.Ledger_Through), 0))")
+
+
+def ledger_top(mid, current):
+    """Newest ledger entry for `mid`: an absolute Quantity write folds everything up to it."""
+    return (f"COALESCE((SELECT MAX(l.Entry_ID) FROM Stock_Ledger l "
+            f"WHERE l.Medication_ID = {mid}), {current})")
+
+
+ON_HAND = on_hand()
+
+# auth -----------------------------------------------------------------------
+register("login", """
+    SELECT r.RoleName, u.FullName
+    FROM [User] u JOIN Role r ON r.RoleID = u.RoleID
+    WHERE u.Username = ? AND u.PasswordHash = ? AND u.IsActive = 1
+""", types=(NAME, HASH))
+
+# ids ------------------------------------------------------------------------
+register("reserve_ids",
+         "EXEC SP_ReserveIDs ?, ?",
+         "UPDATE Id_Sequence SET Next_Value = Next_Value + ?2 WHERE Name = ?1 "
+         "RETURNING Next_Value - ?2",
+         types=(NAME, INT))
+
+# patients -------------------------------------------------------------------
+register("add_pat", """
+    INSERT INTO Patient(Patient_ID, First_Name, Last_Name, Date_of_Birth, Gender, Email,
+                        Created_Date, Is_Active)
+    VALUES (?, ?, ?, ?, ?, ?, SYSDATETIME(), 1)
+""", types=(ID, NAME, NAME, DATE, ID, NAME))
+
+register("upd_pat", """
+    UPDATE Patient
+    SET First_Name = ?, Last_Name = ?, Date_of_Birth = ?, Gender = ?, Email = ?,
+        Modified_Date = SYSDATETIME()
+    WHERE Patient_ID = ? AND Is_Active = 1
+""", types=(NAME, NAME, DATE, ID, NAME, ID))
+
+register("get_pat", *_both("""
+    SELECT Patient_ID, First_Name, Last_Name, {dob} AS DOB, Gender, Email
+    FROM Patient WHERE Patient_ID = ? AND Is_Active = 1
+""", dob=("CONVERT(varchar(10), Date_of_Birth, 23)", "substr(Date_of_Birth, 1, 10)")),
+         types=(ID,))
+
+# doctors --------------------------------------------------------------------
+register("specs", "SELECT DISTINCT Specialization FROM Doctor WHERE Is_Active = 1")
+
+register("docs_by_spec", """
+    SELECT Doctor_ID, Full_Name, Room_No FROM Doctor
+    WHERE Is_Active = 1 AND Specialization = ? ORDER BY Full_Name
+""", types=(NAME,))
+
+register("doctors", """
+    SELECT Specialization, Doctor_ID, Full_Name, Room_No FROM Doctor
+    WHERE Is_Active = 1 ORDER BY Specialization, Full_Name
+""")
+
+# medications / prescriptions -------------------------------------------------
+_MED_SEARCH = """
+    SELECT m.Generic_Name, m.Brand_Name, m.Medication_ID,
+           COALESCE({on_hand}, 0) AS Stock{price}
+    FROM Medication m
+    {join} JOIN Medication_Inventory i ON i.Medication_ID = m.Medication_ID
+    WHERE m.Is_Active = 1 AND (m.Generic_Name LIKE ? OR m.Brand_Name LIKE ?)
+    ORDER BY m.Generic_Name, m.Brand_Name
+"""
+register("med_search", _MED_SEARCH.format(price="", join="LEFT", on_hand=ON_HAND),
+         types=(LIKE, LIKE))
+register("med_search.priced", _MED_SEARCH.format(price=", i.Unit_Price", join="INNER", on_hand=ON_HAND),
+         types=(LIKE, LIKE))
+
+register("add_rx", """
+    INSERT INTO Prescription
+    (Prescription_ID, Patient_ID, Medication_ID, Prescription_Date,
+     Dosage, Quantity, Days_Supply, Refills_Authorized, Refills_Remaining,
+     Instructions, Status, Created_Date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'Active', SYSDATETIME())
+""", types=(ID, ID, ID, DATE, NAME, INT, INT, INT, INT, TEXT))
+
+_RXS = """
+    SELECT {top}p.Prescription_ID, p.Medication_ID,
+           {name} AS MedName, p.Dosage,
+           p.Quantity, p.Refills_Remaining
+    FROM Prescription p
+    JOIN Medication m ON m.Medication_ID = p.Medication_ID
+    WHERE p.Patient_ID = ? AND p.Status = 'Active'{after}
+    ORDER BY {order}{limit}
+"""
+_RX_NAME = ("m.Generic_Name + ' (' + m.Brand_Name + ')'", "m.Generic_Name || ' (' || m.Brand_Name || ')'")
+_NO_PAGE = dict(top=("", ""), limit=("", ""))
+_PAGE    = dict(top=("TOP (?) ", ""), limit=("", " LIMIT ?"))
+register("rxs_of", *_both(_RXS, name=_RX_NAME, after=("", ""),
+                          order=("p.Prescription_ID",) * 2, **_NO_PAGE), types=(ID,))
+register("rxs_of.newest", *_both(_RXS, name=_RX_NAME, after=("", ""),
+                                 order=("p.Created_Date DESC",) * 2, **_NO_PAGE), types=(ID,))
+register("rxs_of.page", *_both(_RXS, name=_RX_NAME, after=("", ""),
+                               order=("p.Prescription_ID",) * 2, **_PAGE), types=(INT, ID))
+register("rxs_of.page_after", *_both(_RXS, name=_RX_NAME,
+                                     after=(" AND p.Prescription_ID > ?",) * 2,
+                                     order=("p.Prescription_ID",) * 2, **_PAGE),
+         types=(INT, ID, ID))
+
+register("refills_left", "SELECT Refills_Remaining FROM Prescription WHERE Prescription_ID = ?",
+         types=(ID,))
+
+register("use_refill", """
+    UPDATE Prescription SET Refills_Remaining = Refills_Remaining - 1
+    WHERE Prescription_ID = ?
+""", types=(ID,))
+
+# batch refills: SQLite takes them with one UPDATE inside DB.dispense_refills'
+# transaction, then reads the lines back; SP_DispenseRefills does both
+register("dispense_refills", "EXEC SP_DispenseRefills ?, ?", types=(ID, JSON))
+register("dispense_refills.take", None, """
+    UPDATE Prescription
+    SET Refills_Remaining = Refills_Remaining - 1, Modified_Date = SYSDATETIME()
+    WHERE Patient_ID = ?1 AND Status = 'Active' AND Refills_Remaining > 0
+      AND Prescription_ID IN (SELECT value FROM json_each(?2))
+      AND EXISTS (SELECT 1 FROM Medication_Inventory i
+                  WHERE i.Medication_ID = Prescription.Medication_ID AND i.Unit_Price IS NOT NULL)
+    RETURNING Prescription_ID
+""")
+register("dispense_refills.lines", None, f"""
+    SELECT j.value AS Prescription_ID, p.Medication_ID, {_RX_NAME[1]} AS Name, p.Quantity,
+           i.Unit_Price, {ON_HAND} AS Stock, p.Refills_Remaining AS Refills_Left
+    FROM json_each(?2) j
+    LEFT JOIN Prescription p ON p.Prescription_ID = j.value AND p.Patient_ID = ?1
+    LEFT JOIN Medication m ON m.Medication_ID = p.Medication_ID
+    LEFT JOIN Medication_Inventory i ON i.Medication_ID = p.Medication_ID
+    ORDER BY j.key
+""")
+
+# inventory ------------------------------------------------------------------
+INV_ROW = f"""
+    SELECT i.Medication_ID, m.Generic_Name, m.Brand_Name, {ON_HAND} AS Quantity, i.Unit_Price
+    FROM Medication_Inventory i
+    JOIN Medication m ON m.Medication_ID = i.Medication_ID
+"""
+register("inv", INV_ROW + " WHERE i.Medication_ID = ?", types=(ID,))
+
+
+def inv_many(size):
+    """IN-list lookup for exactly `size` IDs, registered on first use."""
+    name = f"inv_many.{size}"
+    if name not in STATEMENTS:
+        register(name, INV_ROW + f" WHERE i.Medication_ID IN ({','.join('?' * size)})",
+                 types=(ID,) * size)
+    return name
+
+
+register("adjust", """
+    UPDATE Medication_Inventory SET Quantity = Quantity + ?, Modified_Date = SYSDATETIME()
+    WHERE Medication_ID = ?
+""", types=(INT, ID))
+
+register("inv_list", INV_ROW + """
+    WHERE (m.Generic_Name LIKE ? OR m.Brand_Name LIKE ?)
+    ORDER BY m.Generic_Name
+""", types=(LIKE, LIKE))
+
+_CATALOG = f"""
+    SELECT m.Medication_ID, m.Generic_Name, m.Brand_Name, m.Is_Active,
+           {ON_HAND} AS Quantity, i.Unit_Price
+    FROM Medication m
+    LEFT JOIN Medication_Inventory i ON i.Medication_ID = m.Medication_ID
+"""
+register("catalog_rows", _CATALOG)
+
+# Catalog watermark, read before the rows it guards.  SQL Server: rows
+# written by transactions still open have Row_Version >= MIN_ACTIVE_ROWVERSION(),
+# so nothing that commits late is skipped.  SQLite runs one writer at a time,
+# so a Modified_Date trails its commit by at most one transaction: the mark
+# reaches back CATALOG_OVERLAP seconds and the catalog dedupes what it re-reads.
+# In ledger mode a sale only appends to Stock_Ledger, so a medication with a
+# ledger entry past the mark is re-read as well.
+CATALOG_OVERLAP = 60
+register("catalog_rows.mark", *_both("SELECT {mark}", mark=(
+    "CONVERT(BINARY(8), MIN_ACTIVE_ROWVERSION())",
+    f"datetime(SYSDATETIME(), '-{CATALOG_OVERLAP} seconds')")))
+register("catalog_rows.since", *_both(_CATALOG + """
+    WHERE m.{col} >= ? OR i.{col} >= ?
+       OR m.Medication_ID IN (SELECT l.Medication_ID FROM Stock_Ledger l WHERE l.{ledger} >= ?)
+""", col=("Row_Version", "Modified_Date"), ledger=("Row_Version", "Entry_Date")),
+         types=(VERSION, VERSION, VERSION))
+
+register("med_exists", "SELECT 1 FROM Medication WHERE Medication_ID = ?", types=(ID,))
+
+register("add_med.med", """
+    INSERT INTO Medication(Medication_ID, Generic_Name, Brand_Name, Is_Active)
+    VALUES (?, ?, ?, 1)
+""", types=(ID, NAME, NAME))
+
+register("add_med.inv", """
+    INSERT INTO Medication_Inventory(Medication_ID, Quantity, Unit_Price)
+    VALUES (?, ?, ?)
+""", types=(ID, INT, MONEY))
+
+register("upsert_med", """
+    MERGE Medication AS tgt
+    USING (SELECT ? AS mid, ? AS gen, ? AS br) AS src
+      ON tgt.Medication_ID = src.mid
+    WHEN MATCHED THEN
+      UPDATE SET Generic_Name  = src.gen,
+                 Brand_Name    = src.br,
+                 Modified_Date = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (Medication_ID, Generic_Name, Brand_Name, Is_Active)
+      VALUES (src.mid, src.gen, src.br, 1);
+""", """
+    INSERT INTO Medication(Medication_ID, Generic_Name, Brand_Name, Is_Active)
+    VALUES (?, ?, ?, 1)
+    ON CONFLICT(Medication_ID) DO UPDATE
+      SET Generic_Name  = excluded.Generic_Name,
+          Brand_Name    = excluded.Brand_Name,
+          Modified_Date = SYSDATETIME()
+""", types=(ID, NAME, NAME))
+
+register("upsert_inv", f"""
+    MERGE Medication_Inventory AS tgt
+    USING (SELECT ? AS mid, ? AS qty, ? AS prc) AS src
+      ON tgt.Medication_ID = src.mid
+    WHEN MATCHED THEN
+      UPDATE SET Quantity       = src.qty,
+                 Unit_Price     = src.prc,
+                 Ledger_Through = {ledger_top("src.mid", "tgt.Ledger_Through")},
+                 Modified_Date  = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (Medication_ID, Quantity, Unit_Price)
+      VALUES (src.mid, src.qty, src.prc);
+""", f"""
+    INSERT INTO Medication_Inventory(Medication_ID, Quantity, Unit_Price)
+    VALUES (?, ?, ?)
+    ON CONFLICT(Medication_ID) DO UPDATE
+      SET Quantity       = excluded.Quantity,
+          Unit_Price     = excluded.Unit_Price,
+          Ledger_Through = {ledger_top("excluded.Medication_ID", "Ledger_Through")},
+          Modified_Date  = SYSDATETIME()
+""", types=(ID, INT, MONEY))
+
+# sales ----------------------------------------------------------------------
+register("save_sale", "EXEC SP_SaveSale ?, ?, ?, ?, ?, ?", types=(ID, NAME, MONEY, JSON, INT, INT))
+
+register("save_sale.header", None, """
+    INSERT INTO Sale_Header(Patient_ID, Cashier, Total) VALUES (?, ?, ?) RETURNING SaleID
+""")
+
+register("save_sale.item", None, """
+    INSERT INTO Sale_Item(SaleID, Medication_ID, Qty, UnitPrice) VALUES (?, ?, ?, ?)
+""")
+
+register("save_sale.stock", None, """
+    UPDATE Medication_Inventory
+    SET Quantity = Quantity - (SELECT SUM(s.Qty) FROM Sale_Item s
+                               WHERE s.SaleID = ? AND s.Medication_ID = Medication_Inventory.Medication_ID),
+        Modified_Date = SYSDATETIME()
+    WHERE Medication_ID IN (SELECT Medication_ID FROM Sale_Item WHERE SaleID = ?)
+""")
+
+register("save_sale.ledger", None, """
+    INSERT INTO Stock_Ledger(Medication_ID, Qty_Change, Reason, Ref_ID)
+    SELECT Medication_ID, -SUM(Qty), 'Sale', ?1 FROM Sale_Item WHERE SaleID = ?1
+    GROUP BY Medication_ID
+""")
+
+register("save_sale.short", None, f"""
+    SELECT i.Medication_ID FROM Medication_Inventory i
+    WHERE i.Medication_ID IN (SELECT Medication_ID FROM Sale_Item WHERE SaleID = ?)
+      AND {ON_HAND} < 0
+""")
+
+# stock reservation ------------------------------------------------------------
+def stock_levels(size):
+    """On-hand stock and price for exactly `size` IDs, registered on first use."""
+    name = f"stock_levels.{size}"
+    if name not in STATEMENTS:
+        register(name, f"""
+            SELECT i.Medication_ID, {ON_HAND} AS Quantity, i.Unit_Price
+            FROM Medication_Inventory i
+            WHERE i.Medication_ID IN ({','.join('?' * size)})
+        """, types=(ID,) * size)
+    return name
+
+
+register("reserve_stock", "EXEC SP_ReserveStock ?", types=(JSON,))
+
+# the stock check is the guard, so concurrent sales of one drug all land while
+# it lasts; a price that moved since the cart was built is not taken (?3 NULL: any)
+register("reserve_stock.line", None, """
+    UPDATE Medication_Inventory
+    SET Quantity = Quantity - ?1, Modified_Date = SYSDATETIME()
+    WHERE Medication_ID = ?2 AND Quantity >= ?1 AND (?3 IS NULL OR Unit_Price = ?3)
+""")
+
+# stock ledger -----------------------------------------------------------------
+register("ledger.append", """
+    INSERT INTO Stock_Ledger(Medication_ID, Qty_Change, Reason, Ref_ID) VALUES (?, ?, ?, ?)
+""", types=(ID, INT, NAME, NAME))
+
+register("ledger.through", None, "SELECT MAX(Entry_ID) FROM Stock_Ledger")
+
+# SQLite runs one writer at a time, so the fold needs no lock of its own
+register("ledger.compact", "EXEC SP_CompactStockLedger", """
+    UPDATE Medication_Inventory
+    SET Quantity       = Quantity + d.Delta,
+        Ledger_Through = ?1,
+        Modified_Date  = SYSDATETIME()
+    FROM (SELECT l.Medication_ID, SUM(l.Qty_Change) AS Delta
+          FROM Stock_Ledger l
+          JOIN Medication_Inventory s ON s.Medication_ID = l.Medication_ID
+          WHERE l.Entry_ID > s.Ledger_Through AND l.Entry_ID <= ?1
+          GROUP BY l.Medication_ID) d
+    WHERE d.Medication_ID = Medication_Inventory.Medication_ID
+      AND Medication_Inventory.Quantity + d.Delta >= 0
+""")
+
+
+# patient search ---------------------------------------------------------------
+_PAT_HIT = ("SELECT {top}Patient_ID, First_Name, Last_Name, Created_Date, "
+            "{rank} AS Rank, {k1} AS K1, {k2} AS K2 FROM Patient WHERE Is_Active = 1 AND {where}")
+
+register("search_pats.id", _PAT_HIT.format(top="", rank=0, k1="Patient_ID", k2="Patient_ID",
+                                           where="Patient_ID = ?"), types=(ID,))
+
+_KEYSET = " AND ({k1} > ? OR ({k1} = ? AND ({k2} > ? OR ({k2} = ? AND Patient_ID > ?))))"
+
+# (rank, condition, parameter count, k1, k2) per search shape
+_SINGLE = [
+    (1, "Last_Key LIKE ?", 1, "Last_Key", "First_Key"),
+    (2, "First_Key LIKE ? AND Last_Key NOT LIKE ?", 2, "First_Key", "Last_Key"),
+]
+_ID_PREFIX = (3, "Patient_ID LIKE ? AND Last_Key NOT LIKE ? AND First_Key NOT LIKE ?", 3,
+              "Patient_ID", "Patient_ID")
+_MULTI = [
+    (1, "First_Key LIKE ? AND Last_Key LIKE ?", 2, "First_Key", "Last_Key"),
+    (2, "Last_Key LIKE ? AND First_Key LIKE ? AND NOT (First_Key LIKE ? AND Last_Key LIKE ?)", 4,
+     "Last_Key", "First_Key"),
+]
+
+
+def search_branches(multi, with_id):
+    return _MULTI if multi else _SINGLE + ([_ID_PREFIX] if with_id else [])
+
+
+def search_pats(multi, with_id, after_rank, n):
+    """
+    Name of the ranked search statement for one shape, registered on first
+    use.  Each branch is capped and walks its own index in order; the outer
+    query merges them by rank.  Branches ranked below `after_rank` are left
+    out and the one equal to it resumes after the keyset row.
+    """
+    name = f"search_pats.{'multi' if multi else 'single'}{'.id' if with_id else ''}.{after_rank}.{n}"
+    if name in STATEMENTS:
+        return name
+    sql = {"mssql": [], "sqlite": []}
+    types = []
+    for rank, where, nargs, k1, k2 in search_branches(multi, with_id):
+        if rank < after_rank:
+            continue
+        types += [LIKE] * nargs
+        if rank == after_rank:
+            where += _KEYSET.format(k1=k1, k2=k2)
+            types += [NAME, NAME, NAME, NAME, ID]
+        for dialect, top, limit in (("mssql", f"TOP ({n}) ", ""), ("sqlite", "", f" LIMIT {n}")):
+            branch = (_PAT_HIT.format(top=top, rank=rank, k1=k1, k2=k2, where=where)
+                      + f" ORDER BY {k1}, {k2}, Patient_ID{limit}")
+            sql[dialect].append(f"SELECT * FROM ({branch}) b{rank}")
+    outer = "SELECT {top}* FROM ({union}) hits ORDER BY Rank, K1, K2, Patient_ID{limit}"
+    return register(name,
+                    outer.format(top=f"TOP ({n}) ", union=" UNION ALL ".join(sql["mssql"]), limit=""),
+                    outer.format(top="", union=" UNION ALL ".join(sql["sqlite"]), limit=f" LIMIT {n}"),
+                    types)
+
+
+# bulk import / export ---------------------------------------------------------
+register("bulk.stage", """
+    INSERT INTO Medication_Import(Batch_ID, Line_No, Medication_ID, Generic_Name, Brand_Name,
+                                  Quantity, Unit_Price)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+""", types=(ID, INT, ID, NAME, NAME, INT, MONEY))
+
+# rows without an ID take the ID of the medication with the same names
+register("bulk.match_names", """
+    UPDATE s SET Medication_ID = m.Medication_ID
+    FROM Medication_Import s
+    JOIN Medication m ON m.Generic_Name = s.Generic_Name AND m.Brand_Name = s.Brand_Name
+    WHERE s.Batch_ID = ? AND s.Medication_ID IS NULL
+""", """
+    UPDATE Medication_Import SET Medication_ID = m.Medication_ID
+    FROM Medication m
+    WHERE m.Generic_Name = Medication_Import.Generic_Name
+      AND m.Brand_Name = Medication_Import.Brand_Name
+      AND Medication_Import.Batch_ID = ? AND Medication_Import.Medication_ID IS NULL
+""", types=(ID,))
+
+register("bulk.unmatched", """
+    SELECT Line_No FROM Medication_Import WHERE Batch_ID = ? AND Medication_ID IS NULL
+""", types=(ID,))
+
+register("bulk.assign_id", """
+    UPDATE Medication_Import SET Medication_ID = ? WHERE Batch_ID = ? AND Line_No = ?
+""", types=(ID, ID, INT))
+
+# names already taken by a different medication would break UQ_Med_GenericBrand
+register("bulk.check_names", """
+    UPDATE s SET Error = N'generic/brand already used by ' + m.Medication_ID
+    FROM Medication_Import s
+    JOIN Medication m ON m.Generic_Name = s.Generic_Name AND m.Brand_Name = s.Brand_Name
+                     AND m.Medication_ID <> s.Medication_ID
+    WHERE s.Batch_ID = ? AND s.Error IS NULL
+""", """
+    UPDATE Medication_Import SET Error = 'generic/brand already used by ' || m.Medication_ID
+    FROM Medication m
+    WHERE m.Generic_Name = Medication_Import.Generic_Name
+      AND m.Brand_Name = Medication_Import.Brand_Name
+      AND m.Medication_ID <> Medication_Import.Medication_ID
+      AND Medication_Import.Batch_ID = ? AND Medication_Import.Error IS NULL
+""", types=(ID,))
+
+register("bulk.existing", """
+    SELECT COUNT(*) FROM Medication_Import s
+    JOIN Medication m ON m.Medication_ID = s.Medication_ID
+    WHERE s.Batch_ID = ? AND s.Error IS NULL
+""", types=(ID,))
+
+# unchanged rows are left alone so the audit triggers only see real edits
+register("bulk.merge_med", """
+    MERGE Medication AS tgt
+    USING (SELECT Medication_ID, Generic_Name, Brand_Name FROM Medication_Import
+           WHERE Batch_ID = ? AND Error IS NULL) AS src
+      ON tgt.Medication_ID = src.Medication_ID
+    WHEN MATCHED AND (tgt.Generic_Name <> src.Generic_Name OR tgt.Brand_Name <> src.Brand_Name) THEN
+      UPDATE SET Generic_Name  = src.Generic_Name,
+                 Brand_Name    = src.Brand_Name,
+                 Modified_Date = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (Medication_ID, Generic_Name, Brand_Name, Is_Active)
+      VALUES (src.Medication_ID, src.Generic_Name, src.Brand_Name, 1);
+""", """
+    INSERT INTO Medication(Medication_ID, Generic_Name, Brand_Name, Is_Active)
+    SELECT Medication_ID, Generic_Name, Brand_Name, 1 FROM Medication_Import
+    WHERE Batch_ID = ? AND Error IS NULL
+    ON CONFLICT(Medication_ID) DO UPDATE
+      SET Generic_Name  = excluded.Generic_Name,
+          Brand_Name    = excluded.Brand_Name,
+          Modified_Date = SYSDATETIME()
+      WHERE Generic_Name <> excluded.Generic_Name OR Brand_Name <> excluded.Brand_Name
+""", types=(ID,))
+
+# a blank Quantity keeps the current stock
+register("bulk.keep_qty", f"""
+    UPDATE s SET Quantity = {ON_HAND}
+    FROM Medication_Import s
+    JOIN Medication_Inventory i ON i.Medication_ID = s.Medication_ID
+    WHERE s.Batch_ID = ? AND s.Quantity IS NULL
+""", f"""
+    UPDATE Medication_Import SET Quantity = {ON_HAND}
+    FROM Medication_Inventory i
+    WHERE i.Medication_ID = Medication_Import.Medication_ID
+      AND Medication_Import.Batch_ID = ? AND Medication_Import.Quantity IS NULL
+""", types=(ID,))
+
+register("bulk.merge_inv", f"""
+    MERGE Medication_Inventory AS tgt
+    USING (SELECT Medication_ID, ISNULL(Quantity, 0) AS Quantity, Unit_Price FROM Medication_Import
+           WHERE Batch_ID = ? AND Error IS NULL) AS src
+      ON tgt.Medication_ID = src.Medication_ID
+    WHEN MATCHED AND ({on_hand("tgt")} <> src.Quantity OR tgt.Unit_Price <> src.Unit_Price) THEN
+      UPDATE SET Quantity       = src.Quantity,
+                 Unit_Price     = src.Unit_Price,
+                 Ledger_Through = {ledger_top("src.Medication_ID", "tgt.Ledger_Through")},
+                 Modified_Date  = SYSDATETIME()
+    WHEN NOT MATCHED THEN
+      INSERT (Medication_ID, Quantity, Unit_Price)
+      VALUES (src.Medication_ID, src.Quantity, src.Unit_Price);
+""", f"""
+    INSERT INTO Medication_Inventory(Medication_ID, Quantity, Unit_Price)
+    SELECT Medication_ID, COALESCE(Quantity, 0), Unit_Price FROM Medication_Import
+    WHERE Batch_ID = ? AND Error IS NULL
+    ON CONFLICT(Medication_ID) DO UPDATE
+      SET Quantity       = excluded.Quantity,
+          Unit_Price     = excluded.Unit_Price,
+          Ledger_Through = {ledger_top("excluded.Medication_ID", "Ledger_Through")},
+          Modified_Date  = SYSDATETIME()
+      WHERE {on_hand("Medication_Inventory")} <> excluded.Quantity OR Unit_Price <> excluded.Unit_Price
+""", types=(ID,))
+
+register("bulk.rejects", """
+    SELECT Line_No, Error FROM Medication_Import
+    WHERE Batch_ID = ? AND Error IS NOT NULL ORDER BY Line_No
+""", types=(ID,))
+
+register("bulk.clear", "DELETE FROM Medication_Import WHERE Batch_ID = ?", types=(ID,))
+
+register("inv_summary.page", """
+    SELECT TOP (?) m.Medication_ID, m.Generic_Name, m.Brand_Name, s.Quantity, s.Unit_Price,
+           s.Quantity * s.Unit_Price AS TotalValue
+    FROM Medication m
+    JOIN vw_StockOnHand s ON s.Medication_ID = m.Medication_ID
+    WHERE m.Is_Active = 1 AND m.Medication_ID > ?
+    ORDER BY m.Medication_ID
+""", f"""
+    SELECT Medication_ID, Generic_Name, Brand_Name, Quantity, Unit_Price,
+           Quantity * Unit_Price AS TotalValue
+    FROM (SELECT m.Medication_ID, m.Generic_Name, m.Brand_Name, {ON_HAND} AS Quantity, i.Unit_Price
+          FROM Medication m
+          JOIN Medication_Inventory i ON i.Medication_ID = m.Medication_ID
+          WHERE m.Is_Active = 1 AND m.Medication_ID > ?
+          ORDER BY m.Medication_ID
+          LIMIT ?) q
+""", types=(INT, ID))
+
+# history export: keyset pages in key order, optionally within a date range -----
+# table → (select list, FROM clause, key column, key type, date column)
+EXPORTS = {
+    "Sale_Header":          ("t.*", "Sale_Header t", "SaleID", INT, "t.SaleDate"),
+    "Sale_Item":            ("t.*, h.SaleDate", "Sale_Item t JOIN Sale_Header h ON h.SaleID = t.SaleID",
+                             "SaleItemID", INT, "h.SaleDate"),
+    "Prescription":         ("t.*", "Prescription t", "Prescription_ID", ID, "t.Prescription_Date"),
+    "Patient_History":      ("t.*", "Patient_History t", "History_ID", INT, "t.Operation_Date"),
+    "Medication_History":   ("t.*", "Medication_History t", "History_ID", INT, "t.Operation_Date"),
+    "Prescription_History": ("t.*", "Prescription_History t", "History_ID", INT, "t.Operation_Date"),
+}
+
+
+def export_page(table, dated):
+    """Keyset page over EXPORTS[table]: key > ? [and since <= date < until]; TOP/LIMIT bound."""
+    name = f"export.{table}{'.dated' if dated else ''}"
+    if name not in STATEMENTS:
+        cols, src, key, ktype, when = EXPORTS[table]
+        where = f"t.{key} > ?" + (f" AND {when} >= ? AND {when} < ?" if dated else "")
+        register(name, *(f"SELECT {top}{cols} FROM {src} WHERE {where} ORDER BY t.{key}{limit}"
+                         for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))),
+                 types=(INT, ktype) + ((DATE, DATE) if dated else ()))
+    return name
+
+
+# sales rollups (SQLite: one statement per rollup over SaleID ?1 < id <= ?2) ------
+register("rollup.refresh", "EXEC SP_RefreshSalesRollups")
+
+register("rollup.range", None, """
+    SELECT w.Last_SaleID, (SELECT MAX(SaleID) FROM Sale_Header)
+    FROM Rollup_Watermark w WHERE w.Name = 'sales'
+""")
+
+_ROLLUP_SALES = """
+    SELECT h.SaleID, date(h.SaleDate) AS Sale_Date, COALESCE(h.Cashier, '') AS Cashier,
+           COALESCE(h.Total, 0) AS Total,
+           CASE WHEN h.Patient_ID IS NULL OR h.Patient_ID = 'Walk-in'
+                THEN 'Walk-in' ELSE 'Hospital' END AS Patient_Type
+    FROM Sale_Header h WHERE h.SaleID > ?1 AND h.SaleID <= ?2
+"""
+
+register("rollup.daily", None, f"""
+    INSERT INTO Sales_Daily(Sale_Date, Sales, Units, Revenue)
+    SELECT s.Sale_Date, COUNT(*), SUM(COALESCE(u.Units, 0)), SUM(s.Total)
+    FROM ({_ROLLUP_SALES}) s
+    LEFT JOIN (SELECT SaleID, SUM(Qty) AS Units FROM Sale_Item
+               WHERE SaleID > ?1 AND SaleID <= ?2 GROUP BY SaleID) u ON u.SaleID = s.SaleID
+    GROUP BY s.Sale_Date
+    ON CONFLICT(Sale_Date) DO UPDATE
+      SET Sales = Sales + excluded.Sales, Units = Units + excluded.Units,
+          Revenue = Revenue + excluded.Revenue
+""")
+
+register("rollup.medication", None, f"""
+    INSERT INTO Sales_By_Medication(Medication_ID, Sales, Units, Revenue, Last_Sale)
+    SELECT i.Medication_ID, COUNT(DISTINCT i.SaleID), SUM(i.Qty), SUM(i.Qty * i.UnitPrice),
+           MAX(s.Sale_Date)
+    FROM ({_ROLLUP_SALES}) s JOIN Sale_Item i ON i.SaleID = s.SaleID
+    GROUP BY i.Medication_ID
+    ON CONFLICT(Medication_ID) DO UPDATE
+      SET Sales = Sales + excluded.Sales, Units = Units + excluded.Units,
+          Revenue = Revenue + excluded.Revenue, Last_Sale = max(Last_Sale, excluded.Last_Sale)
+""")
+
+register("rollup.cashier", None, f"""
+    INSERT INTO Sales_By_Cashier(Cashier, Sales, Revenue)
+    SELECT Cashier, COUNT(*), SUM(Total) FROM ({_ROLLUP_SALES}) GROUP BY Cashier
+    ON CONFLICT(Cashier) DO UPDATE
+      SET Sales = Sales + excluded.Sales, Revenue = Revenue + excluded.Revenue
+""")
+
+register("rollup.patient_type", None, f"""
+    INSERT INTO Sales_By_Patient_Type(Patient_Type, Sales, Revenue)
+    SELECT Patient_Type, COUNT(*), SUM(Total) FROM ({_ROLLUP_SALES}) GROUP BY Patient_Type
+    ON CONFLICT(Patient_Type) DO UPDATE
+      SET Sales = Sales + excluded.Sales, Revenue = Revenue + excluded.Revenue
+""")
+
+register("rollup.count", None, "SELECT COUNT(*) FROM Sale_Header WHERE SaleID > ? AND SaleID <= ?")
+
+register("rollup.advance", None, """
+    UPDATE Rollup_Watermark SET Last_SaleID = ?, Refreshed_Date = SYSDATETIME()
+    WHERE Name = 'sales'
+""")
+
+# dashboard: reads the rollups only -------------------------------------------
+register("dash.revenue", """
+    SELECT SUM(CASE WHEN Sale_Date = ? THEN Revenue ELSE 0 END) AS Today,
+           SUM(CASE WHEN Sale_Date >= ? THEN Revenue ELSE 0 END) AS Week,
+           SUM(CASE WHEN Sale_Date >= ? THEN Revenue ELSE 0 END) AS Month,
+           SUM(Revenue) AS Total, SUM(Sales) AS Sales
+    FROM Sales_Daily
+""", types=(DATE, DATE, DATE))
+
+register("dash.daily", """
+    SELECT Sale_Date, Sales, Units, Revenue FROM Sales_Daily
+    WHERE Sale_Date >= ? ORDER BY Sale_Date DESC
+""", types=(DATE,))
+
+register("dash.top_meds", *(f"""
+    SELECT {top}r.Medication_ID, m.Generic_Name, m.Brand_Name, r.Units, r.Revenue, r.Last_Sale
+    FROM Sales_By_Medication r
+    LEFT JOIN Medication m ON m.Medication_ID = r.Medication_ID
+    ORDER BY r.Revenue DESC{limit}
+""" for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))), types=(INT,))
+
+register("dash.cashiers", "SELECT Cashier, Sales, Revenue FROM Sales_By_Cashier ORDER BY Revenue DESC")
+
+register("dash.patient_types", "SELECT Patient_Type, Sales, Revenue FROM Sales_By_Patient_Type ORDER BY Patient_Type")
+
+register("dash.stock_value", """
+    SELECT COUNT(*) AS Items, SUM(s.Quantity) AS Units, SUM(s.Quantity * s.Unit_Price) AS Value
+    FROM Medication m
+    JOIN vw_StockOnHand s ON s.Medication_ID = m.Medication_ID
+    WHERE m.Is_Active = 1
+""", f"""
+    SELECT COUNT(*) AS Items, SUM(q.Quantity) AS Units, SUM(q.Quantity * q.Unit_Price) AS Value
+    FROM (SELECT {ON_HAND} AS Quantity, i.Unit_Price
+          FROM Medication m
+          JOIN Medication_Inventory i ON i.Medication_ID = m.Medication_ID
+          WHERE m.Is_Active = 1) q
+""")
+
+# demand forecast (forecast.py) ------------------------------------------------
+# units sold per medication per day in [start, end); params (start, start, end),
+# Day 0 = start
+register("forecast.demand", """
+    SELECT Medication_ID, Day, SUM(Qty) AS Units
+    FROM (SELECT i.Medication_ID, DATEDIFF(day, ?, h.SaleDate) AS Day, i.Qty
+          FROM Sale_Header h JOIN Sale_Item i ON i.SaleID = h.SaleID
+          WHERE h.SaleDate >= ? AND h.SaleDate < ?) d
+    GROUP BY Medication_ID, Day
+""", """
+    SELECT i.Medication_ID, CAST(julianday(date(h.SaleDate)) - julianday(?1) AS INTEGER) AS Day,
+           SUM(i.Qty) AS Units
+    FROM Sale_Header h JOIN Sale_Item i ON i.SaleID = h.SaleID
+    WHERE h.SaleDate >= ?2 AND h.SaleDate < ?3
+    GROUP BY i.Medication_ID, Day
+""", types=(DATE, DATE, DATE))
+
+register("forecast.stock", f"""
+    SELECT i.Medication_ID, {ON_HAND} AS Quantity FROM Medication_Inventory i
+""")
+
+register("forecast.clear", "DELETE FROM Reorder_Suggestion")
+
+register("forecast.save", """
+    INSERT INTO Reorder_Suggestion(Medication_ID, Avg_Daily, Std_Daily, On_Hand, Days_Of_Supply,
+                                   Reorder_Point, Order_Up_To, Suggested_Qty)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+""", types=(ID, RATE, RATE, INT, RATE, INT, INT, INT))
+
+# the forecast's levels drive trg_low_stock_alert instead of the flat default
+register("forecast.apply", """
+    UPDATE i SET Low_Stock_Level = r.Reorder_Point, Restock_Level = r.Order_Up_To
+    FROM Medication_Inventory i JOIN Reorder_Suggestion r ON r.Medication_ID = i.Medication_ID
+    WHERE r.Avg_Daily > 0
+      AND (i.Low_Stock_Level <> r.Reorder_Point OR i.Restock_Level <> r.Order_Up_To)
+""", """
+    UPDATE Medication_Inventory SET Low_Stock_Level = r.Reorder_Point, Restock_Level = r.Order_Up_To
+    FROM Reorder_Suggestion r
+    WHERE r.Medication_ID = Medication_Inventory.Medication_ID AND r.Avg_Daily > 0
+      AND (Medication_Inventory.Low_Stock_Level <> r.Reorder_Point
+           OR Medication_Inventory.Restock_Level <> r.Order_Up_To)
+""")
+
+register("reorder.page", *(f"""
+    SELECT {top}r.Medication_ID, m.Generic_Name, m.Brand_Name, r.On_Hand, r.Avg_Daily,
+           r.Days_Of_Supply, r.Reorder_Point, r.Suggested_Qty, r.Computed_Date
+    FROM Reorder_Suggestion r
+    LEFT JOIN Medication m ON m.Medication_ID = r.Medication_ID
+    WHERE r.Suggested_Qty > 0
+    ORDER BY r.Days_Of_Supply, r.Medication_ID{limit}
+""" for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))), types=(INT,))
+
+# printable documents (documents.py) -------------------------------------------
+register("docs.sales", """
+    SELECT SaleID, Patient_ID, Cashier, Total, SaleDate FROM Sale_Header
+    WHERE SaleDate >= ? AND SaleDate < ?
+    ORDER BY SaleID
+""", types=(DATE, DATE))
+
+# a day's sales are one SaleID range, so their lines come back in one scan
+register("docs.sale_items", *_both("""
+    SELECT s.SaleID, s.Medication_ID, {name} AS Name, s.Qty, s.UnitPrice
+    FROM Sale_Item s
+    LEFT JOIN Medication m ON m.Medication_ID = s.Medication_ID
+    WHERE s.SaleID BETWEEN ? AND ?
+    ORDER BY s.SaleID
+""", name=_RX_NAME), types=(INT, INT))
+
+_FORMS = """
+    SELECT p.Patient_ID, pt.First_Name, pt.Last_Name, p.Prescription_ID, {name} AS Name,
+           p.Dosage, p.Quantity, p.Refills_Remaining, p.Instructions
+    FROM Prescription p
+    JOIN Patient pt ON pt.Patient_ID = p.Patient_ID
+    JOIN Medication m ON m.Medication_ID = p.Medication_ID
+    WHERE p.Status = 'Active'{only}
+    ORDER BY p.Patient_ID, p.Prescription_ID
+"""
+register("docs.rx_all", *_both(_FORMS, name=_RX_NAME, only=("", "")))
+register("docs.rx_of", *_both(_FORMS, name=_RX_NAME,
+                              only=(" AND p.Patient_ID IN (SELECT value FROM OPENJSON(?))",
+                                    " AND p.Patient_ID IN (SELECT value FROM json_each(?))")),
+         types=(JSON,))
+
+# audit archive ------------------------------------------------------------------
+# hot table → (identity, record key, date, age): rows whose `age` column is
+# older than the cutoff move to <table>_Archive (same columns, same order)
+AUDIT = {
+    "Patient_History":      ("History_ID", "Patient_ID",      "Operation_Date", "Operation_Date"),
+    "Medication_History":   ("History_ID", "Medication_ID",   "Operation_Date", "Operation_Date"),
+    "Prescription_History": ("History_ID", "Prescription_ID", "Operation_Date", "Operation_Date"),
+    "User_Actions":         ("Action_ID",  "Record_ID",       "Action_Date",    "Action_Date"),
+    # open alerts have no Resolved_Date and so never age out
+    "Stock_Alerts":         ("Alert_ID",   "Medication_ID",   "Alert_Date",     "Resolved_Date"),
+}
+
+register("archive.extend", "EXEC SP_ExtendAuditYears")
+
+def _audit(t, ident, key, when, age):
+    """archive.move / .copy / .drop and the hot + archive audit.<t> read for one table."""
+    # oldest first along the clustered key; both dialects bind (batch, cutoff)
+    batch = f"SELECT {ident} FROM {t} WHERE {age} < ?2 ORDER BY {ident} LIMIT ?1"
+    register(f"archive.move.{t}", f"""
+        WITH batch AS (SELECT TOP (?) * FROM {t} WHERE {age} < ? ORDER BY {ident})
+        DELETE FROM batch OUTPUT deleted.* INTO {t}_Archive
+    """, types=(INT, DATE))
+    register(f"archive.copy.{t}", None,
+             f"INSERT INTO {t}_Archive SELECT * FROM {t} WHERE {ident} IN ({batch})")
+    register(f"archive.drop.{t}", None, f"DELETE FROM {t} WHERE {ident} IN ({batch})")
+    register(f"audit.{t}", *(f"""
+        SELECT {top}* FROM (
+            SELECT 'hot' AS Tier, h.* FROM {t} h
+            WHERE h.{key} = ? AND h.{when} >= ? AND h.{when} < ?
+            UNION ALL
+            SELECT 'archive', a.* FROM {t}_Archive a
+            WHERE a.{key} = ? AND a.{when} >= ? AND a.{when} < ?
+        ) x
+        ORDER BY {when} DESC, {ident} DESC{limit}
+    """ for top, limit in (("TOP (?) ", ""), ("", " LIMIT ?"))),
+             types=(INT,) + (NAME, DATE, DATE) * 2)
+
+
+for _table, _spec in AUDIT.items():
+    _audit(_table, *_spec)
@@ -0,0 +1,71 @@
+###############################################################################
+#  TEST FIXTURES – a fresh SQLite stand-in per test
+###############################################################################
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db import DB, SqliteBackend
+
+
+@pytest.fixture
+def make_db(tmp_path):
+    """DB(**kw) on its own SQLite file; every DB made is closed afterwards."""
+    made = []
+
+    def make(path="hms.db", **kw):
+        db = DB(backend=SqliteBackend(str(tmp_path / path)), **kw)
+        made.append(db)
+        return db
+    yield make
+    for db in made:
+        db.close()
+
+
+@pytest.fixture
+def db(make_db):
+    return make_db()
+
+
+@pytest.fixture
+def med(db):
+    """add a priced, stocked medication → its ID"""
+    def add(qty=10, price="2.50", gen="Paracetamol", br=None):
+        mid = db.new_med_id()
+        db.add_med(mid, gen, br or f"Brand {mid}", qty, price)
+        return mid
+    return add
+
+
+@pytest.fixture
+def patient(db):
+    """add a patient → their ID"""
+    def add(first="Ada", last="Lovelace", dob="1990-01-01", gender="F", email="ada@x.org"):
+        pid = db.new_pid()
+        db.add_pat({"id": pid, "first": first, "last": last, "dob": dob,
+                    "gender": gender, "email": email})
+        return pid
+    return add
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication for the window / runner tests (offscreen; skipped without PyQt5)."""
+    pytest.importorskip("PyQt5")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def settle(qapp):
+    """Run queued Runner tasks and deliver their results."""
+    from PyQt5.QtCore import QThreadPool
+
+    def run(rounds=20):
+        for _ in range(rounds):
+            QThreadPool.globalInstance().waitForDone(50)
+            qapp.processEvents()
+    return run
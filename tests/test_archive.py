@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+
+def stamp(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).isoformat(" ", "seconds")
+
+
+def history(db, pid, ages):
+    with db.pool.cursor() as cur:
+        cur.executemany("INSERT INTO Patient_History (Patient_ID, Operation_Type, Operation_Date) "
+                        "VALUES (?, 'UPDATE', ?)", [(pid, stamp(a)) for a in ages])
+
+
+def count(db, table):
+    with db.pool.cursor() as cur:
+        return cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_old_rows_move_in_batches_and_stay_readable(db):
+    history(db, "P000001", [400, 390, 380, 370, 360, 10, 5])
+    before = db.audit_history("Patient_History", "P000001")
+    moved = db.archive_audit(days=90, batch=2, tables=["Patient_History"], pause=0)
+    assert moved == {"Patient_History": 5}
+    assert count(db, "Patient_History") == 2 and count(db, "Patient_History_Archive") == 5
+    after = db.audit_history("Patient_History", "P000001")
+    assert [r[1:] for r in after] == [r[1:] for r in before]     # same rows, newest first
+    assert [r.Tier for r in after] == ["hot"] * 2 + ["archive"] * 5
+    assert db.archive_audit(days=90, tables=["Patient_History"], pause=0) == {"Patient_History": 0}
+
+
+def test_open_alerts_never_age_out(db):
+    with db.pool.cursor() as cur:
+        cur.executemany("INSERT INTO Stock_Alerts (Medication_ID, Alert_Type, Alert_Date, Resolved_Date) "
+                        "VALUES ('M001', 'Low Stock', ?, ?)",
+                        [(stamp(500), stamp(450)), (stamp(500), None)])
+    assert db.archive_audit(days=90, tables=["Stock_Alerts"], pause=0) == {"Stock_Alerts": 1}
+    assert [r.Tier for r in db.audit_history("Stock_Alerts", "M001")] == ["hot", "archive"]
+
+
+def test_history_window_and_table_check(db):
+    history(db, "P000001", [30, 20, 10])
+    rows = db.audit_history("Patient_History", "P000001", since=stamp(25)[:10], until=stamp(15)[:10])
+    assert len(rows) == 1
+    with pytest.raises(ValueError):
+        db.audit_history("Patient", "P000001")
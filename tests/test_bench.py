@@ -0,0 +1,31 @@
+from bench.datagen import generate
+from bench.harness import WRITES, compare, run
+
+
+def snapshot(db):
+    with db.pool.cursor() as cur:
+        return [cur.execute(q).fetchall() for q in (
+            "SELECT COUNT(*) FROM Sale_Header",
+            "SELECT SUM(Quantity), SUM(Unit_Price) FROM Medication_Inventory",
+            "SELECT SUM(Refills_Remaining) FROM Prescription",
+            "SELECT Name, Next_Value FROM Id_Sequence ORDER BY Name")]
+
+
+def test_read_only_run_changes_nothing(db):
+    generate(db, 200, sales=50)
+    before = snapshot(db)
+    res = run(db, repeat=2, writes=False)
+    assert res and not WRITES & set(res)
+    assert snapshot(db) == before
+
+
+def test_write_cases_are_all_flagged(db):
+    generate(db, 200, sales=50)
+    res = run(db, repeat=1)
+    assert WRITES <= set(res)
+
+
+def test_compare_flags_only_slower_methods():
+    base = {"results": {"1000": {"methods": {"a": {"p50_ms": 1.0}, "b": {"p50_ms": 1.0}}}}}
+    cur = {"results": {"1000": {"methods": {"a": {"p50_ms": 1.1}, "b": {"p50_ms": 2.0}}}}}
+    assert [(s, n) for s, n, *_ in compare(base, cur, 0.25)] == [("1000", "b")]
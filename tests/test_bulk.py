@@ -0,0 +1,59 @@
+import csv
+from decimal import Decimal
+
+import pytest
+
+from bulk import EXPORT, export_csv, import_csv
+
+
+def write(path, *lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_import_merges_inserts_updates_and_rejects(db, med, tmp_path):
+    old = med(7, "1.00", gen="Zorbamycin", br="Zorbex")
+    src = write(tmp_path / "in.csv",
+                "Medication_ID,Generic_Name,Brand_Name,Quantity,Unit_Price",
+                f"{old},Zorbamycin,Zorbex,3,4.10",
+                ",Quinzorbate,Qz,12,3.00",
+                ",Quinzorbate,Qz,15,3.25",                # supersedes line 3
+                ",Quinzorbate,Qz Forte,oops,3.00",
+                ",Quinzorbate,,5,1.00",
+                ",Zorbamycin,Zorbex,,9.99")               # next chunk, by name, keeps stock
+    res = import_csv(db, src, chunk=3)
+    assert (res.lines, res.inserted, res.updated) == (6, 1, 2)
+    assert [no for no, _ in res.rejected] == [3, 5, 6]
+    assert "quantity" in dict(res.rejected)[5]
+    assert (db.inv(old)[3], Decimal(str(db.inv(old)[4]))) == (3, Decimal("9.99"))
+    new = db.med_search("quinzorb", priced=True)
+    assert [(r[3], Decimal(str(r[4]))) for r in new] == [(15, Decimal("3.25"))]
+
+
+def test_name_clash_with_another_id_is_rejected(db, med, tmp_path):
+    med(gen="Zorbamycin", br="Zorbex")
+    other = med(gen="Quinzorbate", br="Qz")
+    src = write(tmp_path / "in.csv",
+                "medication_id,generic_name,brand_name,unit_price",
+                f"{other},Zorbamycin,Zorbex,2.00")
+    res = import_csv(db, src)
+    assert res.inserted == res.updated == 0
+    assert "already used by" in res.rejected[0][1]
+
+
+def test_missing_required_column_fails_up_front(db, tmp_path):
+    src = write(tmp_path / "in.csv", "Generic_Name,Unit_Price", "Zorbamycin,1.00")
+    with pytest.raises(ValueError, match="Brand_Name"):
+        import_csv(db, src)
+
+
+def test_export_pages_through_the_whole_summary(db, med, tmp_path):
+    for _ in range(5):
+        med()
+    out = tmp_path / "out.csv"
+    n = export_csv(db, str(out), page=3)
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(EXPORT) and len(rows) == n + 1
+    ids = [r[0] for r in rows[1:]]
+    assert ids == sorted(set(ids)) and n == len(db.inventory_summary("", 10000))
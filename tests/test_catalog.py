@@ -0,0 +1,65 @@
+import threading, time
+from decimal import Decimal
+
+from catalog import MedCatalog, norm, similarity
+
+
+def test_norm_and_similarity():
+    assert norm("  Ibuprofén-400 ") == "ibuprofen 400"
+    assert similarity("paracetamol", "paracetamol") == 1.0
+    assert similarity("paracetmol", "paracetamol") > 0.5
+
+
+def test_prefix_substring_and_typo_matches(db, med):
+    a = med(gen="Zorbamycin", br="Zorbex")
+    b = med(gen="Quinzorbate", br="Qz")
+    cat = MedCatalog(db)
+    assert [h.Medication_ID for h in cat.search("zorb")][:2] == [a, b]     # prefix, then substring
+    assert [h.Medication_ID for h in cat.search("zorbamicyn")] == [a]       # typo
+
+
+def test_refresh_picks_up_a_write_stamped_before_the_watermark(db, med):
+    mid = db.catalog_rows()[0].Medication_ID      # seed row, stamped long ago
+    med(gen="Zorbamycin")                         # something written just now
+    cat = MedCatalog(db)
+    cat.refresh()
+    # a transaction that commits now but stamped its row before our last load
+    with db.pool.cursor() as cur:
+        cur.execute("UPDATE Medication SET Generic_Name = 'Zorbamycin B', "
+                    "Modified_Date = datetime(SYSDATETIME(), '-30 seconds') "
+                    "WHERE Medication_ID = ?", (mid,))
+    cat.refresh()
+    assert cat.get(mid).Generic_Name == "Zorbamycin B"
+
+
+def test_concurrent_stale_searches_load_once(db, med):
+    med(gen="Zorbamycin")
+    calls, real = [], db.catalog_rows
+
+    def slow_rows(since=None):
+        calls.append(since)
+        time.sleep(0.05)
+        return real(since)
+    db.catalog_rows = slow_rows
+    cat = MedCatalog(db, max_age=60)
+    found = []
+    threads = [threading.Thread(target=lambda: found.append(len(cat.search("zorba"))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [None] and found == [1] * 8
+
+
+def test_refresh_picks_up_a_ledger_sale(make_db):
+    db = make_db(stock_mode="ledger", compact_every=0)
+    mid = db.new_med_id()
+    db.add_med(mid, "Zorbamycin", "Zorbex", 10, "2.00")
+    with db.pool.cursor() as cur:                 # stocked long ago
+        for t in ("Medication", "Medication_Inventory"):
+            cur.execute(f"UPDATE {t} SET Modified_Date = datetime(SYSDATETIME(), '-1 day')")
+    cat = MedCatalog(db)
+    cat.refresh()
+    db.save_sale("pharm1", "Walk-in", Decimal("6"), [(mid, 3, "2.00")])
+    assert cat.refresh() >= 1 and cat.get(mid).Quantity == 7
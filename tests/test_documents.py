@@ -0,0 +1,46 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import documents
+from documents import Renderer
+
+
+def receipts(n):
+    return [documents.receipt(k, "pharm1", "Walk-in", datetime(2025, 6, 1, 9, 30), Decimal("5.00"),
+                              [("M001", "Zorbamycin", 2, Decimal("2.50"))]) for k in range(n)]
+
+
+@pytest.fixture
+def rnd():
+    r = Renderer(workers=2)
+    yield r
+    r.close()
+
+
+def test_single_documents_render_in_thread_once(rnd, tmp_path):
+    doc = receipts(1)[0]
+    path = str(tmp_path / "r.pdf")
+    txt = rnd.save("receipt", doc, path)
+    assert rnd._pool is None                        # no pool for one document
+    assert txt == documents.text("receipt", doc) and "Total: 5.00" in txt
+    assert (rnd.misses, rnd.hits) == (1, 0)
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data.startswith(b"%PDF-1.4") and b"(Total: 5.00)" in data
+    assert rnd.render("receipt", doc) == txt and rnd.hits == 1
+
+
+def test_batches_use_a_spawned_pool(rnd, tmp_path):
+    rnd.start()
+    assert rnd._pool._mp_context.get_start_method() == "spawn"
+    docs = receipts(documents.CHUNK + 5)
+    assert rnd.render_many("receipt", docs) == [documents.text("receipt", d) for d in docs]
+    assert rnd.write("receipt", docs, str(tmp_path / "day.pdf")) == len(docs)
+    assert rnd.misses == 2 * len(docs)              # text and PDF are cached apart
+
+
+def test_unknown_kind_is_refused(rnd):
+    with pytest.raises(ValueError):
+        rnd.render("invoice", {})
@@ -0,0 +1,41 @@
+import csv, gzip, json
+from decimal import Decimal
+
+import pytest
+
+from export import batches, export_table, guess
+
+
+@pytest.fixture
+def sales(db, med):
+    mid = med(100, "2.50")
+    return [db.save_sale("pharm1", "Walk-in", Decimal("2.50") * q, [(mid, q, "2.50")])
+            for q in range(1, 8)]
+
+
+def test_keyset_pages_cover_every_row_once(db, sales):
+    small = [r.SaleID for rows in batches(db, "Sale_Header", chunk=3, fetch=2) for r in rows]
+    whole = [r.SaleID for rows in batches(db, "Sale_Header") for r in rows]
+    assert small == whole == sorted(set(whole)) and set(sales) <= set(whole)
+    assert max(len(rows) for rows in batches(db, "Sale_Header", chunk=3, fetch=2)) == 2
+
+
+def test_csv_gzip_and_jsonl_agree(db, sales, tmp_path):
+    n = export_table(db, "Sale_Item", str(tmp_path / "items.csv.gz"), chunk=4)
+    with gzip.open(tmp_path / "items.csv.gz", "rt", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert export_table(db, "Sale_Item", str(tmp_path / "items.jsonl")) == n == len(rows)
+    with open(tmp_path / "items.jsonl", encoding="utf-8") as f:
+        docs = [json.loads(line) for line in f]
+    assert [d["SaleItemID"] for d in docs] == [int(r["SaleItemID"]) for r in rows]
+    assert {d["SaleID"] for d in docs} >= set(sales)
+
+
+def test_date_bounds_and_bad_arguments(db, sales, tmp_path):
+    out = str(tmp_path / "h.csv")
+    assert export_table(db, "Sale_Header", out, since="9000-01-01") == 0
+    with pytest.raises(ValueError):
+        export_table(db, "Patient", out)
+    with pytest.raises(ValueError):
+        export_table(db, "Sale_Header", out, compress="zstd")
+    assert guess("rx.parquet") == ("parquet", None) and guess("s.jsonl.xz") == ("jsonl", "xz")
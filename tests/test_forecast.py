@@ -0,0 +1,62 @@
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import forecast
+
+
+def sell_on(db, mid, day, qty):
+    sid = db.save_sale("pharm1", "Walk-in", Decimal(qty), [(mid, qty, "1.00")])
+    with db.pool.cursor() as cur:
+        cur.execute("UPDATE Sale_Header SET SaleDate = ? WHERE SaleID = ?",
+                    (f"{day.isoformat()} 12:00:00", sid))
+
+
+def by_hand(series, days, lead, z):
+    """Daily mean / spread over the days since the first sale (at least MIN_DAYS)."""
+    span = min(max(len(series), forecast.MIN_DAYS), days)
+    daily = series + [0] * (span - len(series))
+    avg = sum(daily) / span
+    std = math.sqrt(sum(u * u for u in daily) / span - avg * avg)
+    return avg, std, math.ceil(avg * lead + z * std * math.sqrt(lead))
+
+
+def test_rates_match_a_day_by_day_count(db, med):
+    today = date.today()
+    mid, idle = med(500), med(500)
+    sold = {0: 3, 1: 5, 9: 2, 39: 4}            # days ago → units
+    for ago, qty in sold.items():
+        sell_on(db, mid, today - timedelta(days=ago), qty)
+    f = forecast.compute(db, days=60, today=today)
+    k = f.mids.index(mid)
+    series = [sold.get(ago, 0) for ago in range(39, -1, -1)]
+    avg, std, reorder_at = by_hand(series, 60, forecast.LEAD_DAYS, forecast.SERVICE_Z)
+    assert f.avg[k] == pytest.approx(avg) and f.std[k] == pytest.approx(std)
+    assert f.reorder_at[k] == reorder_at and f.suggest[k] == 0     # plenty on hand
+    j = f.mids.index(idle)
+    assert f.avg[j] == 0 and np.isnan(f.days_left[j]) and f.suggest[j] == 0
+
+
+def test_new_drug_rate_uses_the_minimum_window(db, med):
+    mid = med(1)
+    sell_on(db, mid, date.today(), 1)
+    f = forecast.compute(db, days=365)
+    assert f.avg[f.mids.index(mid)] == pytest.approx(1 / forecast.MIN_DAYS)
+
+
+def test_run_stores_suggestions_and_applies_levels(db, med):
+    mid = med(40)
+    for ago in range(20):
+        sell_on(db, mid, date.today() - timedelta(days=ago), 2)
+    drugs, due, changed = forecast.run(db, apply=True, days=60)
+    assert due >= 1 and changed >= 1
+    assert next(r for r in db.reorder_suggestions() if r[0] == mid).Suggested_Qty > 0
+    with db.pool.cursor() as cur:
+        levels = cur.execute("SELECT i.Low_Stock_Level, i.Restock_Level, r.Reorder_Point, r.Order_Up_To "
+                             "FROM Medication_Inventory i JOIN Reorder_Suggestion r "
+                             "ON r.Medication_ID = i.Medication_ID WHERE i.Medication_ID = ?",
+                             (mid,)).fetchone()
+    assert tuple(levels[:2]) == tuple(levels[2:])
@@ -0,0 +1,31 @@
+import threading
+
+from db import IdAllocator
+
+
+def test_one_round_trip_per_block():
+    calls = []
+
+    def reserve(seq, n):
+        calls.append((seq, n))
+        return 100 * len(calls)
+    ids = IdAllocator(reserve, block=3)
+    got = [ids.next("patient") for _ in range(5)]
+    assert got == ["P000100", "P000101", "P000102", "P000200", "P000201"]
+    assert calls == [("Seq_PatientID", 3)] * 2
+
+
+def test_two_processes_never_share_an_id(make_db):
+    a, b = make_db(), make_db()         # same file, separate pools and allocators
+    a.ids.block = b.ids.block = 4
+    seen = []
+
+    def take(db):
+        for _ in range(25):
+            seen.append(db.new_pid())
+    threads = [threading.Thread(target=take, args=(d,)) for d in (a, b, a, b)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(seen) == len(set(seen)) == 100
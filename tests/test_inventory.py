@@ -0,0 +1,17 @@
+from decimal import Decimal
+
+
+def test_priced_search_carries_the_unit_price(db, med):
+    mid = med(4, "3.75", gen="Zorbamycin")
+    rows = db.med_search("zorba", priced=True)
+    assert [(r[2], r[3], Decimal(str(r[4]))) for r in rows] == [(mid, 4, Decimal("3.75"))]
+    assert db.med_search("zorba")[0][:4] == rows[0][:4]
+
+
+def test_inv_many_matches_single_lookups_across_chunks(db, med):
+    mids = [med(k) for k in range(1, 8)]
+    db.IN_CHUNK = 3                 # force several IN-list round trips
+    got = db.inv_many(mids + mids[:2] + ["M999999"])
+    assert set(got) == set(mids)
+    for m in mids:
+        assert tuple(got[m]) == tuple(db.inv(m))
@@ -0,0 +1,88 @@
+import csv
+import threading
+from decimal import Decimal
+
+import pytest
+
+from bulk import export_csv
+from db import OutOfStock
+
+
+@pytest.fixture
+def ldb(make_db):
+    return make_db(stock_mode="ledger", compact_every=0)
+
+
+def add(db, qty, name):
+    mid = db.new_med_id()
+    db.add_med(mid, name, f"Brand {mid}", qty, "2.00")
+    return mid
+
+
+def pending(db):
+    with db.pool.cursor() as cur:
+        return cur.execute("SELECT COUNT(*) FROM Stock_Ledger l JOIN Medication_Inventory i "
+                           "ON i.Medication_ID = l.Medication_ID "
+                           "WHERE l.Entry_ID > i.Ledger_Through").fetchone()[0]
+
+
+def test_appends_show_in_on_hand_and_compaction_keeps_it(ldb):
+    mid = add(ldb, 10, "Zorbamycin")
+    ldb.adjust(mid, -3, "Sale")
+    ldb.adjust(mid, 5, "Receipt")
+    assert ldb.inv(mid).Quantity == 12 and pending(ldb) == 2
+    assert ldb.compact_ledger() == 1            # one inventory row folded
+    assert ldb.inv(mid).Quantity == 12 and pending(ldb) == 0
+    assert ldb.compact_ledger() == 0
+
+
+def test_absolute_write_supersedes_pending_entries(ldb):
+    mid = add(ldb, 10, "Zorbamycin")
+    ldb.adjust(mid, -4, "Sale")
+    ldb.upsert_inv(mid, 50, "2.00")             # a stock count
+    assert ldb.inv(mid).Quantity == 50
+    ldb.adjust(mid, -1, "Sale")
+    ldb.compact_ledger()
+    assert ldb.inv(mid).Quantity == 49
+
+
+def test_concurrent_appends_all_count(ldb):
+    mid = add(ldb, 0, "Zorbamycin")
+    threads = [threading.Thread(target=lambda: [ldb.adjust(mid, 1) for _ in range(25)])
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ldb.inv(mid).Quantity == 100
+
+
+def test_ledger_sale_checks_on_hand(ldb):
+    a, b = add(ldb, 5, "Zorbamycin"), add(ldb, 1, "Quinzorbate")
+    ldb.adjust(b, -1, "Sale")
+    with pytest.raises(OutOfStock) as e:
+        ldb.save_sale("pharm1", "Walk-in", Decimal("6"), [(a, 1, "2.00"), (b, 1, "2.00")])
+    assert e.value.short == [b]
+    assert ldb.inv(a).Quantity == 5
+    res = ldb.checkout("pharm1", "Walk-in", Decimal("4"), [(a, 2, "2.00")])
+    assert res.SaleID is not None and ldb.inv(a).Quantity == 3
+
+
+def test_export_shows_uncompacted_sales(ldb, tmp_path):
+    mid = add(ldb, 10, "Zorbamycin")
+    ldb.save_sale("pharm1", "Walk-in", Decimal("6"), [(mid, 3, "2.00")])
+    row = next(r for r in ldb.inventory_summary("", 10000) if r.Medication_ID == mid)
+    assert row.Quantity == 7 and Decimal(str(row.TotalValue)) == Decimal("14.00")
+    out = tmp_path / "out.csv"
+    export_csv(ldb, str(out))
+    with open(out, newline="", encoding="utf-8") as f:
+        assert [r[3] for r in csv.reader(f) if r[0] == mid] == ["7"]
+
+
+def test_dashboard_stock_shows_uncompacted_sales(ldb):
+    mid = add(ldb, 10, "Zorbamycin")
+    before = ldb.dashboard()["stock"]
+    ldb.save_sale("pharm1", "Walk-in", Decimal("6"), [(mid, 3, "2.00")])
+    after = ldb.dashboard()["stock"]
+    assert before.Units - after.Units == 3
+    assert Decimal(str(before.Value)) - Decimal(str(after.Value)) == Decimal("6.00")
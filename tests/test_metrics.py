@@ -0,0 +1,45 @@
+import logging
+
+import pytest
+
+from metrics import Metrics
+
+
+def test_percentiles_and_prometheus_buckets():
+    m = Metrics()
+    for ms in range(1, 101):
+        m.record("q", ms / 1000, rows=2)
+    st = m.snapshot()["statements"]["q"]
+    assert (st["calls"], st["rows"], st["p50_ms"], st["max_ms"]) == (100, 200, 51, 100)
+    text = m.prometheus()
+    assert 'hms_db_call_seconds_bucket{stmt="q",le="0.01"} 10' in text
+    assert 'hms_db_call_seconds_count{stmt="q"} 100' in text
+
+
+def test_slow_calls_log_parameter_shapes_not_values(caplog):
+    m = Metrics(slow_ms=10)
+    with caplog.at_level(logging.WARNING, "hms.slow"):
+        m.record("get_pat", 0.02, 1, ("P000123",))
+        m.record("get_pat", 0.001, 1, ("P000124",))
+    assert len(m.slow) == 1 and m.slow[0]["params"] == ["str[7]"]
+    assert "P000123" not in caplog.text
+
+
+def test_db_calls_and_statements_are_timed(db, patient):
+    pid = patient()
+    db.metrics.reset()
+    db.get_pat(pid)
+    with pytest.raises(Exception):
+        db.add_pat({"id": pid, "first": "A", "last": "B", "dob": "2000-01-01",
+                    "gender": "F", "email": "dup@x.org"})
+    st = db.metrics.snapshot()["statements"]
+    assert st["get_pat"]["calls"] == 1 and st["get_pat"]["rows"] == 1
+    assert st["sql.get_pat"]["calls"] == 1
+    assert st["add_pat"]["errors"] == 1 and st["sql.add_pat"]["errors"] == 1
+
+
+def test_dump_writes_json_and_textfile(tmp_path):
+    m = Metrics()
+    m.record("q", 0.001)
+    m.dump(str(tmp_path))
+    assert {p.name for p in tmp_path.iterdir()} == {"hms_metrics.json", "hms_metrics.prom"}
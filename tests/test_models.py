@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def runner(qapp):
+    from PyQt5.QtWidgets import QWidget
+    from workers import Runner
+    w = QWidget()
+    r = Runner(w)
+    r.reported = []
+    r.report = r.reported.append       # no message box in tests
+    yield r
+    w.deleteLater()
+
+
+def numbers(total):
+    """keyset source over 0..total-1 (rows are 1-tuples)"""
+    def fetch(last, n):
+        start = 0 if last is None else last[0] + 1
+        return [(k,) for k in range(start, min(start + n, total))]
+    return fetch
+
+
+def model(runner, page=3):
+    from models import PagedModel
+    return PagedModel(["N"], runner, page=page)
+
+
+def test_pages_on_demand(runner, settle):
+    m = model(runner)
+    m.load(numbers(7))
+    settle()
+    assert [r[0] for r in m.rows] == [0, 1, 2] and m.canFetchMore()
+    m.fetchMore(); settle()
+    m.fetchMore(); settle()
+    assert [r[0] for r in m.rows] == list(range(7)) and not m.canFetchMore()
+
+
+def test_failed_page_is_reported_and_clears_busy(runner, settle):
+    m = model(runner)
+    ok = numbers(9)
+
+    def flaky(last, n):
+        if last is not None:
+            raise RuntimeError("server went away")
+        return ok(last, n)
+    m.load(flaky)
+    settle()
+    m.fetchMore(); settle()
+    assert [str(e) for e in runner.reported] == ["server went away"]
+    assert not m._busy and len(m.rows) == 3
+    m.load(ok)                          # a new search pages again
+    settle()
+    assert m.canFetchMore()
+
+
+def test_dropped_page_can_be_fetched_again(runner, settle):
+    m = model(runner)
+    gate = threading.Event()
+    slow = numbers(9)
+    m.load(lambda last, n: gate.wait(2) and slow(last, n))
+    runner.drop()                       # e.g. logout while the page is in flight
+    gate.set()
+    settle()
+    assert m.rows == [] and not m._busy and m.canFetchMore()
+    m.fetchMore(); settle()
+    assert len(m.rows) == 3
@@ -0,0 +1,35 @@
+def ids(rows):
+    return [r[0] for r in rows]
+
+
+def test_exact_id_short_circuits(db, patient):
+    pid = patient()
+    assert ids(db.search_pats(pid.lower())) == [pid]
+
+
+def test_last_name_hits_rank_before_first_name_hits(db, patient):
+    by_last = patient("Ann", "Quillon", email="a@x.org")
+    by_first = patient("Quill", "Baker", email="b@x.org")
+    patient("Other", "Person", email="c@x.org")
+    assert ids(db.search_pats("quil")) == [by_last, by_first]
+    assert ids(db.search_pats("ann quil")) == [by_last]
+
+
+def test_keyset_pages_walk_the_full_result(db, patient):
+    made = {patient(f"Zed{k}", f"Quorn{k % 3}", email=f"z{k}@x.org") for k in range(7)}
+    made |= {patient("Quorny", "Able", email="q@x.org")}
+    full = db.search_pats("quorn", n=50)
+    assert set(ids(full)) == made
+    walked, last = [], None
+    while True:
+        page = db.search_pats("quorn", after=last, n=2)
+        if not page:
+            break
+        walked += page
+        last = page[-1]
+    assert ids(walked) == ids(full)
+
+
+def test_like_wildcards_are_not_patterns(db, patient):
+    patient("Ann", "Quillon")
+    assert db.search_pats("%") == [] and db.search_pats("q_il") == []
@@ -0,0 +1,119 @@
+import sqlite3, threading, time
+
+import pytest
+
+from db import Backend, ConnectionPool, PoolTimeout, sqlite_schema, SCHEMA_FILE
+
+
+class FakeConn:
+    def __init__(self):
+        self.dead = self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBackend(Backend):
+    dialect = "fake"
+
+    def __init__(self):
+        self.opened = []
+
+    def connect(self):
+        cn = FakeConn()
+        self.opened.append(cn)
+        return cn
+
+    def ping(self, cn):
+        if cn.dead:
+            raise ConnectionError("gone")
+
+    def is_disconnect(self, exc):
+        return isinstance(exc, ConnectionError)
+
+
+def test_pool_reuses_idle_connections():
+    be = FakeBackend()
+    pool = ConnectionPool(be, size=2)
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(be.opened) == 1
+    assert pool.stats() == {"size": 2, "open": 1, "idle": 1}
+
+
+def test_pool_is_bounded_and_times_out():
+    pool = ConnectionPool(FakeBackend(), size=2, timeout=0.05)
+    a, b = pool.acquire(), pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(a)
+    assert pool.acquire() is a
+    pool.release(b)
+
+
+def test_waiter_gets_released_connection():
+    pool = ConnectionPool(FakeBackend(), size=1, timeout=5)
+    cn = pool.acquire()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire()))
+    t.start()
+    time.sleep(0.05)
+    pool.release(cn)
+    t.join(2)
+    assert got == [cn]
+
+
+def test_stale_connection_failing_ping_is_replaced():
+    be = FakeBackend()
+    pool = ConnectionPool(be, size=1, ping_after=0)
+    with pool.connection() as cn:
+        cn.dead = True
+    with pool.connection() as fresh:
+        assert fresh is not cn
+    assert cn.closed and pool.stats()["open"] == 1
+
+
+def test_disconnect_error_discards_the_connection():
+    be = FakeBackend()
+    pool = ConnectionPool(be, size=1)
+    with pytest.raises(ConnectionError):
+        with pool.connection() as cn:
+            raise ConnectionError("link dropped")
+    assert cn.closed
+    assert pool.stats() == {"size": 1, "open": 0, "idle": 0}
+    with pytest.raises(ValueError):
+        with pool.connection() as cn2:
+            raise ValueError("not a link problem")
+    assert not cn2.closed and pool.stats()["idle"] == 1
+
+
+def test_closed_pool_refuses_checkouts():
+    pool = ConnectionPool(FakeBackend(), size=1)
+    pool.warm()
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_transaction_rolls_back_on_error(db):
+    with pytest.raises(RuntimeError):
+        with db.pool.transaction() as cur:
+            db._run(cur, "add_pat", ("P999999", "Tx", "Test", "2000-01-01", "M", "tx@x.org"))
+            raise RuntimeError("abort")
+    assert db.get_pat("P999999") is None
+
+
+def test_sqlite_stand_in_login(db):
+    assert db.login("pharm1", "pharm123") == ("Pharmacist", "Pharma Demo")
+    assert db.login("pharm1", "wrong") == (None, None)
+
+
+def test_schema_script_replays_on_sqlite():
+    with open(SCHEMA_FILE, encoding="utf-8-sig") as f:
+        stmts = sqlite_schema(f.read())
+    cn = sqlite3.connect(":memory:")
+    for s in stmts:
+        cn.execute(s)
+    names = {r[0] for r in cn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"Patient", "Medication", "Medication_Inventory", "Sale_Header", "Sale_Item"} <= names
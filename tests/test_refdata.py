@@ -0,0 +1,27 @@
+import threading
+
+from refdata import RefData
+
+
+def test_snapshot_matches_the_doctor_queries(db):
+    ref = RefData(db)
+    assert sorted(ref.specs()) == sorted(db.specs())
+    for sp in ref.specs():
+        assert [d.Doctor_ID for d in ref.docs(sp)] == [r.Doctor_ID for r in db.docs_by_spec(sp)]
+    assert ref.docs("No such specialization") == ()
+
+
+def test_one_query_per_ttl_even_under_concurrency(db):
+    calls, real = [], db.doctors
+    db.doctors = lambda: calls.append(1) or real()
+    ref = RefData(db, ttl=60)
+    threads = [threading.Thread(target=ref.specs) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ref.docs("General")
+    assert len(calls) == 1
+    ref.invalidate()
+    ref.specs()
+    assert len(calls) == 2
@@ -0,0 +1,36 @@
+import threading
+
+
+def rx(db, pid, mid, refills):
+    rxid = db.new_rxid()
+    db.add_rx({"id": rxid, "pid": pid, "mid": mid, "date": "2025-01-01", "dosage": "1 tab",
+               "qty": 2, "days": 7, "ref": refills, "sig": "Dr Demo"})
+    return rxid
+
+
+def test_batch_reports_every_line_in_order(db, med, patient):
+    pid, other = patient(), patient("Bo", "Other", email="bo@x.org")
+    a, b, c = med(10, "2.00"), med(10, "3.00"), med(10, "4.00")
+    ok, empty, theirs = rx(db, pid, a, 2), rx(db, pid, b, 0), rx(db, other, c, 1)
+    lines = db.dispense_refills(pid, [theirs, ok, empty, ok])
+    assert [(l.Prescription_ID, l.Ok) for l in lines] == [(theirs, False), (ok, True), (empty, False)]
+    assert lines[0].Medication_ID is None
+    assert (lines[1].Medication_ID, lines[1].Qty, lines[1].Refills_Left) == (a, 2, 1)
+    assert db.refills_left(ok) == 1 and db.refills_left(theirs) == 1
+    assert db.dispense_refills(pid, []) == []
+
+
+def test_concurrent_dispenses_never_overdraw_refills(db, med, patient):
+    pid = patient()
+    rxid = rx(db, pid, med(), 3)
+    start, ok = threading.Barrier(8), []
+
+    def counter():
+        start.wait()
+        ok.extend(l.Ok for l in db.dispense_refills(pid, [rxid]))
+    threads = [threading.Thread(target=counter) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert ok.count(True) == 3 and db.refills_left(rxid) == 0
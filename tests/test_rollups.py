@@ -0,0 +1,59 @@
+from datetime import date
+from decimal import Decimal
+
+
+def money(v):
+    return Decimal(str(v or 0)).quantize(Decimal("0.01"))
+
+
+def from_base(db):
+    """What the rollups should hold, recomputed from Sale_Header / Sale_Item."""
+    with db.pool.cursor() as cur:
+        daily = {r[0]: (r[1], money(r[2])) for r in cur.execute(
+            "SELECT date(SaleDate), COUNT(*), SUM(Total) FROM Sale_Header GROUP BY 1")}
+        meds = {r[0]: (r[1], money(r[2])) for r in cur.execute(
+            "SELECT Medication_ID, SUM(Qty), SUM(Qty * UnitPrice) FROM Sale_Item GROUP BY 1")}
+    return daily, meds
+
+
+def rolled(db):
+    with db.pool.cursor() as cur:
+        daily = {r[0]: (r[1], money(r[2])) for r in cur.execute(
+            "SELECT Sale_Date, Sales, Revenue FROM Sales_Daily")}
+        meds = {r[0]: (r[1], money(r[2])) for r in cur.execute(
+            "SELECT Medication_ID, Units, Revenue FROM Sales_By_Medication")}
+    return daily, meds
+
+
+def sell(db, mid, qty, price, pat="Walk-in", who="pharm1"):
+    return db.save_sale(who, pat, Decimal(price) * qty, [(mid, qty, price)])
+
+
+def test_refresh_folds_only_new_sales(db, med, patient):
+    a, b = med(50, "2.00"), med(50, "5.00")
+    db.refresh_rollups()
+    sell(db, a, 2, "2.00")
+    sell(db, b, 1, "5.00", pat=patient(), who="pharm2")
+    assert db.refresh_rollups() == 2
+    assert rolled(db) == from_base(db)
+    assert db.refresh_rollups() == 0            # nothing new: nothing counted twice
+    sell(db, a, 3, "2.00")
+    assert db.refresh_rollups() == 1
+    assert rolled(db) == from_base(db)
+
+
+def test_dashboard_reads_the_rollups(db, med, patient):
+    a = med(50, "2.00")
+    db.refresh_rollups()
+    before = db.dashboard()
+    sell(db, a, 2, "2.00")
+    sell(db, a, 1, "2.00", pat=patient())
+    db.refresh_rollups()
+    dash = db.dashboard(today=date.today())
+    assert money(dash["revenue"].Today) - money(before["revenue"].Today) == Decimal("6.00")
+    top = {r[0]: r for r in dash["top"]}
+    assert top[a].Units == 3 and money(top[a].Revenue) == Decimal("6.00")
+    types = {r[0]: r.Sales for r in dash["patients"]}
+    old = {r[0]: r.Sales for r in before["patients"]}
+    assert types["Hospital"] - old.get("Hospital", 0) == 1
+    assert types["Walk-in"] - old.get("Walk-in", 0) == 1
@@ -0,0 +1,88 @@
+import threading
+from decimal import Decimal
+
+import pytest
+
+from db import OutOfStock
+
+
+def count(db, table):
+    with db.pool.cursor() as cur:
+        return cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_save_sale_writes_header_items_and_stock(db, med):
+    a, b = med(10), med(5, "1.00")
+    sid = db.save_sale("pharm1", "Walk-in", Decimal("7.00"), [(a, 2, "2.50"), (b, 2, "1.00")])
+    assert sid is not None
+    assert db.inv(a).Quantity == 8 and db.inv(b).Quantity == 3
+    assert count(db, "Sale_Header") == 1 and count(db, "Sale_Item") == 2
+
+
+def test_short_line_fails_the_whole_sale(db, med):
+    a, b = med(10), med(1)
+    with pytest.raises(OutOfStock) as e:
+        db.save_sale("pharm1", "Walk-in", Decimal("5"), [(a, 1, "2.50"), (b, 2, "2.50")])
+    assert e.value.short == [b]
+    assert db.inv(a).Quantity == 10 and db.inv(b).Quantity == 1
+    assert count(db, "Sale_Header") == 0 and count(db, "Sale_Item") == 0
+
+
+def sell_concurrently(db, mid, buyers, each=1):
+    sold, start = [], threading.Barrier(buyers)
+
+    def buy():
+        start.wait()
+        res = db.checkout("pharm1", "Walk-in", Decimal("2.50") * each, [(mid, each, "2.50")])
+        sold.append(res.SaleID is not None)
+    threads = [threading.Thread(target=buy) for _ in range(buyers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sold
+
+
+def test_concurrent_sales_of_one_drug_all_land(db, med):
+    mid = med(100)
+    assert sell_concurrently(db, mid, 12, 2) == [True] * 12
+    assert db.inv(mid).Quantity == 76 and count(db, "Sale_Header") == 12
+
+
+def test_a_sale_landing_between_read_and_write_does_not_fail_the_cart(db, med):
+    mid = med(100)
+    read, inside = db._by_id, []
+
+    def another_counter_sells(shape, ids):
+        rows = read(shape, ids)
+        if not inside:              # one competing sale per stock read
+            inside.append(True)
+            db.checkout("pharm2", "Walk-in", Decimal("2.50"), [(mid, 1, "2.50")])
+            inside.pop()
+        return rows
+    db._by_id = another_counter_sells
+    for _ in range(4):
+        assert db.checkout("pharm1", "Walk-in", Decimal("2.50"), [(mid, 1, "2.50")]).SaleID
+    assert db.inv(mid).Quantity == 92
+
+def test_concurrent_sales_never_oversell(db, med):
+    mid = med(5)
+    sold = sell_concurrently(db, mid, 12)
+    assert sold.count(True) == 5 and db.inv(mid).Quantity == 0
+
+
+def test_short_line_gives_back_the_lines_taken(db, med):
+    a, b = med(10), med(1)
+    res = db.checkout("pharm1", "Walk-in", Decimal("7.50"), [(a, 1, "2.50"), (b, 2, "2.50")])
+    assert res.SaleID is None
+    assert [(l.Medication_ID, l.Ok, l.Available) for l in res.lines] == [(a, True, 9), (b, False, 1)]
+    assert db.inv(a).Quantity == 10 and count(db, "Sale_Header") == 0
+
+
+def test_repriced_line_is_not_taken(db, med):
+    mid = med(10, "2.50")
+    db.upsert_inv(mid, 10, "3.00")
+    lines = db.reserve_stock([(mid, 1, Decimal("2.50"))])
+    assert [(l.Ok, Decimal(str(l.Unit_Price))) for l in lines] == [(False, Decimal("3.00"))]
+    assert db.inv(mid).Quantity == 10
+    assert db.reserve_stock([(mid, 1, "3.00")])[0].Ok and db.inv(mid).Quantity == 9
@@ -0,0 +1,37 @@
+import re, sqlite3
+
+import pytest
+
+from db import SCHEMA_FILE, _now, sqlite_schema
+
+
+@pytest.fixture
+def script():
+    with open(SCHEMA_FILE, encoding="utf-8-sig") as f:
+        return f.read().replace("\r\n", "\n")
+
+
+def test_duplicate_open_alerts_collapse_before_the_unique_index(script):
+    stmts = sqlite_schema(script)
+    unique = [s for s in stmts if "UX_StockAlerts_Open" in s]
+    cn = sqlite3.connect(":memory:")
+    cn.create_function("GETDATE", 0, _now)
+    for s in stmts:
+        if s not in unique:
+            cn.execute(s)
+    # what the old per-update trigger left behind
+    cn.executemany("INSERT INTO Stock_Alerts (Medication_ID, Alert_Type, Alert_Date) "
+                   "VALUES (?, 'Low Stock', '2024-01-01')", [("M001",)] * 3 + [("M002",)])
+    cn.execute("INSERT INTO Stock_Alerts (Medication_ID, Alert_Type, Alert_Date, Resolved_Date) "
+               "VALUES ('M002', 'Low Stock', '2023-01-01', '2023-02-01')")
+
+    collapse = re.search(r"UPDATE Stock_Alerts SET Resolved_Date.*?;(?=\nCREATE UNIQUE)",
+                         script, re.S).group(0)
+    cn.execute(collapse)
+    for s in unique:
+        cn.execute(s)
+    open_ = cn.execute("SELECT Medication_ID, Alert_ID FROM Stock_Alerts "
+                       "WHERE Resolved_Date IS NULL ORDER BY 1").fetchall()
+    assert open_ == [("M001", 3), ("M002", 4)]
+    with pytest.raises(sqlite3.IntegrityError):
+        cn.execute("INSERT INTO Stock_Alerts (Medication_ID) VALUES ('M001')")
@@ -0,0 +1,148 @@
+import ast, asyncio, os, threading
+from decimal import Decimal
+
+import pytest
+
+from client import RemoteDB
+from service import API, ROLES, Service, dumps
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL = {"login", "warm", "close", "metrics", "dialect", "catalog", "refdata"}  # RemoteDB's own
+
+
+def db_calls(module):
+    """{(enclosing class or None, "method" / "catalog.method")} for every db.X in a module."""
+    with open(os.path.join(ROOT, module), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    found = set()
+
+    def walk(node, cls):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                walk(child, child.name)
+                continue
+            if isinstance(child, ast.Attribute):
+                base = child.value
+                if isinstance(base, ast.Call) and isinstance(base.func, ast.Attribute) \
+                        and base.func.attr in ("catalog", "refdata") and _is_db(base.func.value):
+                    found.add((cls, f"{base.func.attr}.{child.attr}"))
+                elif _is_db(base) and child.attr not in LOCAL:
+                    found.add((cls, child.attr))
+            walk(child, cls)
+    walk(tree, None)
+    return found
+
+
+def _is_db(node):
+    return (isinstance(node, ast.Name) and node.id == "db") or \
+           (isinstance(node, ast.Attribute) and node.attr == "db")
+
+
+def windows():
+    """UI.ROLE_WINDOWS as {class name: role}, read from the source."""
+    with open(os.path.join(ROOT, "UI.py"), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and node.targets[0].id == "ROLE_WINDOWS":
+            return {v.id: k.value for k, v in zip(node.value.keys, node.value.values)}
+
+
+def test_every_ui_call_is_served():
+    calls = db_calls("UI.py") | db_calls("bulk.py") | db_calls("documents.py")
+    assert {name for _, name in calls} - API == set()
+
+
+def test_each_window_may_call_what_it_uses():
+    roles = windows()
+    for cls, name in db_calls("UI.py"):
+        if cls in roles:
+            assert name in ROLES[roles[cls]], (cls, name)
+    # the Manager imports / exports CSVs, the Pharmacy reprints documents
+    assert {n for c, n in db_calls("bulk.py") if c is None} <= ROLES["Manager"]
+    assert {n for c, n in db_calls("documents.py") if c is None} <= ROLES["Pharmacist"]
+
+
+def test_role_is_checked_before_the_call_runs(db, med):
+    mid = med(5)
+    svc = Service(db, workers=2)
+
+    async def as_intern():
+        token = (await svc.login({"user": "intern1", "password": "intern123"}))["token"]
+        auth = {"authorization": f"Bearer {token}"}
+        call = lambda m, *a: svc.route("POST", f"/call/{m}", auth, dumps({"args": list(a)}))
+        status, _, _ = await call("get_pat", "P000001")
+        with pytest.raises(Exception) as e:
+            await call("upsert_inv", mid, 0, "0.01")
+        return status, e.value
+    try:
+        status, err = asyncio.run(as_intern())
+    finally:
+        svc.close()
+    assert status == 200 and err.status == 403
+    assert db.inv(mid).Quantity == 5
+
+
+@pytest.fixture
+def served(db):
+    """The service on a free local port → its URL."""
+    svc, loop, up = Service(db, workers=2), asyncio.new_event_loop(), threading.Event()
+    port = []
+
+    def ready(server):
+        port.append(server.sockets[0].getsockname()[1])
+        up.set()
+    task = loop.create_task(svc.serve("127.0.0.1", 0, ready))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    assert up.wait(5)
+    yield f"http://127.0.0.1:{port[0]}"
+    loop.call_soon_threadsafe(task.cancel)
+    t.join(5)
+    svc.close()
+
+
+def test_manager_imports_a_csv_through_the_service(served, tmp_path):
+    import bulk
+    src = tmp_path / "in.csv"
+    src.write_text("Generic_Name,Brand_Name,Quantity,Unit_Price\nZorbamycin,Zorbex,4,2.00\n")
+    rdb = RemoteDB(served)
+    try:
+        assert rdb.login("manager1", "inv123")[0] == "Manager"
+        assert bulk.import_csv(rdb, str(src)).inserted == 1
+        rdb.login("intern1", "intern123")
+        with pytest.raises(PermissionError):
+            bulk.import_csv(rdb, str(src))
+    finally:
+        rdb.close()
+
+
+def test_a_sale_is_booked_under_the_logged_in_user(db, med):
+    mid = med(5)
+    svc = Service(db, workers=2)
+
+    async def as_pharmacist():
+        login = await svc.login({"user": "pharm1", "password": "pharm123"})
+        auth = {"authorization": f"Bearer {login['token']}"}
+        call = lambda m, *a: svc.route("POST", f"/call/{m}", auth, dumps({"args": list(a)}))
+        errors = []
+        for method in ("save_sale", "checkout"):
+            with pytest.raises(Exception) as e:
+                await call(method, "Someone Else", "Walk-in", Decimal("2.50"), [(mid, 1, "2.50")])
+            errors.append(e.value)
+        status, _, _ = await call("checkout", login["name"], "Walk-in", Decimal("2.50"),
+                                  [(mid, 1, "2.50")])
+        return errors, status
+    try:
+        errors, status = asyncio.run(as_pharmacist())
+    finally:
+        svc.close()
+    assert [e.status for e in errors] == [403, 403] and status == 200
+    assert db.inv(mid).Quantity == 4
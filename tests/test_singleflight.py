@@ -0,0 +1,73 @@
+import threading, time
+
+from singleflight import SingleFlight
+
+
+def crowd(n, fn):
+    start, out = threading.Barrier(n), []
+
+    def one():
+        start.wait()
+        try:
+            out.append(fn())
+        except Exception as e:
+            out.append(e)
+    threads = [threading.Thread(target=one) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def slow(calls, value=None, error=None):
+    def fn():
+        calls.append(1)
+        time.sleep(0.05)
+        if error:
+            raise error
+        return [value]
+    return fn
+
+
+def test_waiting_callers_share_the_leaders_result():
+    sf, calls = SingleFlight(), []
+    out = crowd(6, lambda: sf.do("g", "k", slow(calls, 7)))
+    assert calls == [1] and out == [[7]] * 6
+    assert len({id(v) for v in out}) == 6           # each caller gets its own list
+
+
+def test_an_error_reaches_every_waiter_and_is_not_cached():
+    sf, calls = SingleFlight(ttl=60), []
+    out = crowd(4, lambda: sf.do("g", "k", slow(calls, error=ValueError("down"))))
+    assert calls == [1] and all(isinstance(e, ValueError) for e in out)
+    assert sf.do("g", "k", lambda: 1) == 1
+
+
+def test_ttl_reuse_and_clear():
+    sf = SingleFlight(ttl=60)
+    assert sf.do("g", "k", lambda: 1) == 1
+    assert sf.do("g", "k", lambda: 2) == 1
+    sf.clear()
+    assert sf.do("g", "k", lambda: 3) == 3
+
+
+def test_a_write_during_a_read_keeps_its_result_out_of_the_cache():
+    sf, gate = SingleFlight(ttl=60), threading.Event()
+    t = threading.Thread(target=lambda: sf.do("g", "k", lambda: gate.wait(2) and "old"))
+    t.start()
+    time.sleep(0.02)
+    sf.clear()                                      # a write lands mid-read
+    gate.set()
+    t.join()
+    assert sf.do("g", "k", lambda: "new") == "new"
+
+
+def test_db_reads_are_cached_until_a_write(make_db):
+    db = make_db(flight_ttl=60)
+    db.specs(), db.specs()
+    assert db.metrics.snapshot()["events"]["flight"]["specs"] == {"leader": 1, "cached": 1}
+    assert db.search_pats("quorn") == []
+    db.add_pat({"id": db.new_pid(), "first": "Zed", "last": "Quorn", "dob": "2000-01-01",
+                "gender": "F", "email": "zq@x.org"})
+    assert len(db.search_pats("quorn")) == 1
@@ -0,0 +1,64 @@
+import pytest
+
+USERS = {"Intern": ("intern1", "intern123"), "Doctor": ("doctor1", "doc123"),
+         "Pharmacist": ("pharm1", "pharm123"), "Manager": ("manager1", "inv123")}
+
+
+@pytest.fixture
+def ui(qapp):
+    import UI
+    yield UI
+    import sys
+    if "documents" in sys.modules:              # the Pharmacy window starts its pool
+        sys.modules["documents"].close()
+
+
+def login_win(ui, db, settle):
+    win = ui.LoginWin(db, ui.StartupProbe(db.metrics, None))
+    win.show()
+    settle()
+    return win
+
+
+def sign_in(win, role, settle):
+    win.u.setText(USERS[role][0])
+    win.p.setText(USERS[role][1])
+    win.go()
+    settle()
+    return win.windows.get(role)
+
+
+def test_login_shows_before_the_pool_connects(ui, make_db, settle):
+    db = make_db(warm=False)
+    assert db.pool.stats()["open"] == 0
+    win = login_win(ui, db, settle)
+    assert {"first_paint", "warm", "usable"} <= win.probe.marks.keys()
+    assert db.pool.stats()["open"] >= 1
+
+
+def test_unreachable_server_reports_under_the_form(ui, make_db, settle):
+    db = make_db(warm=False)
+
+    def down(n=1):
+        raise ConnectionError("no route to host")
+    db.warm = down
+    win = login_win(ui, db, settle)
+    assert "unreachable" in win.msg.text() and win.isVisible()
+
+
+def test_role_windows_are_built_once_and_reset_on_logout(ui, db, settle):
+    win, seen = login_win(ui, db, settle), {}
+    for _ in range(2):
+        for role in USERS:
+            w = sign_in(win, role, settle)
+            assert w is not None and w.isVisible() and not win.isVisible()
+            assert seen.setdefault(role, w) is w
+            if role == "Pharmacist":
+                w.cart.append(("M001", "x", 1, 1, 1))
+                w.patient_id = "P000001"
+            w.logout()
+            settle()
+            assert win.isVisible() and not win.p.text() and not w.isVisible()
+            if role == "Pharmacist":
+                assert not w.cart and w.patient_id is None
+    assert set(win.windows) == set(USERS)
@@ -0,0 +1,37 @@
+import os, re
+
+import pytest
+
+from statements import STATEMENTS
+
+# SQL-Server only: procedures, and the OUTPUT-clause move the SQLite path
+# replaces with archive.copy + archive.drop
+MSSQL_ONLY = re.compile(r"\s*EXEC\b|archive\.move\.")
+
+
+def params(sql):
+    numbered = [int(n) for n in re.findall(r"\?(\d+)", sql)]
+    return max(numbered) if numbered else sql.count("?")
+
+
+@pytest.mark.parametrize("name", sorted(STATEMENTS))
+def test_sqlite_form_prepares(db, name):
+    st = STATEMENTS[name]
+    if st.sqlite is None and (MSSQL_ONLY.match(name) or MSSQL_ONLY.match(st.mssql)):
+        pytest.skip("SQL-Server only")
+    sql = db._text(name)
+    with db.pool.cursor() as cur:
+        cur.execute("EXPLAIN " + sql, [None] * params(sql))
+
+
+@pytest.mark.parametrize("name", sorted(n for n, st in STATEMENTS.items() if st.types))
+def test_declared_types_match_placeholders(name):
+    st = STATEMENTS[name]
+    assert params(st.mssql) == len(st.types)
+
+
+def test_ui_carries_no_inline_sql():
+    ui = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "UI.py")
+    with open(ui, encoding="utf-8") as f:
+        src = f.read()
+    assert not re.search(r"\b(SELECT|INSERT INTO|UPDATE \w+ SET|DELETE FROM)\b", src)
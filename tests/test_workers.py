@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def runner(qapp):
+    from PyQt5.QtWidgets import QWidget
+    from workers import Runner
+    w = QWidget()
+    yield Runner(w)
+    w.deleteLater()
+
+
+def test_newer_task_with_same_key_wins(runner, settle):
+    gate, got = threading.Event(), []
+    runner.run("search", lambda: gate.wait(2) and "old", done=got.append)
+    runner.run("search", lambda: "new", done=got.append)
+    gate.set()
+    settle()
+    assert got == ["new"]
+
+
+def test_keyless_tasks_all_report(runner, settle):
+    got = []
+    for k in range(3):
+        runner.run(None, lambda k=k: k, done=got.append)
+    settle()
+    assert sorted(got) == [0, 1, 2]
+
+
+def test_error_goes_to_error_callback_and_busy_widget_comes_back(runner, settle):
+    from PyQt5.QtWidgets import QPushButton
+    btn, errs = QPushButton(), []
+
+    def boom():
+        raise ValueError("no")
+    runner.run("save", boom, error=errs.append, busy=btn)
+    assert not btn.isEnabled()
+    settle()
+    assert [str(e) for e in errs] == ["no"] and btn.isEnabled()
@@ -0,0 +1,111 @@
+###############################################################################
+#  BACKGROUND DB WORK – QThreadPool runner with stale-result dropping
+###############################################################################
+from PyQt5.QtCore    import QObject, QRunnable, QThreadPool, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+
+class _Signals(QObject):
+    done   = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class Task(QRunnable):
+    """Runs fn(*args) on a pool thread; the result comes back as a signal."""
+
+    def __init__(self, key, fn, args):
+        super().__init__()
+        self.setAutoDelete(False)      # the Runner keeps the Python reference
+        self.key, self.fn, self.args = key, fn, args
+        self.signals = _Signals()
+
+    def run(self):
+        try:
+            res = self.fn(*self.args)
+        except Exception as e:
+            self.signals.failed.emit(e)
+        else:
+            self.signals.done.emit(res)
+
+
+class Runner(QObject):
+    """
+    Per-window launcher for DB calls.
+
+    Tasks sharing a `key` (e.g. "search") supersede each other: a queued
+    older task is pulled from the pool before it starts, and a running one
+    has its result dropped when it lands; either way its `cancel` callback
+    runs instead of `done` / `error`.  key=None never supersedes.  Errors
+    without an `error` callback go to report().  While anything is in
+    flight the cursor shows busy, and an optional `busy` widget is
+    disabled until its task finishes.
+    """
+    _pending = 0     # across every Runner, drives the busy cursor
+
+    def __init__(self, parent, pool=None):
+        super().__init__(parent)
+        self.pool    = pool or QThreadPool.globalInstance()
+        self._latest = {}
+        self._live   = set()
+
+    def run(self, key, fn, *args, done=None, error=None, busy=None, cancel=None):
+        old = self._latest.get(key) if key is not None else None
+        if old is not None:
+            self._take(old)
+
+        task = Task(key, fn, args)
+        if key is not None:
+            self._latest[key] = task
+        task.signals.done.connect(lambda res, t=task: self._landed(t, done, res),
+                                  Qt.QueuedConnection)
+        task.signals.failed.connect(lambda exc, t=task: self._landed(t, error or self.report, exc),
+                                    Qt.QueuedConnection)
+        task.busy, task.cancel = busy, cancel
+        if busy is not None:
+            busy.setEnabled(False)
+        self._live.add(task)
+        Runner._pending += 1
+        if Runner._pending == 1:
+            QApplication.setOverrideCursor(Qt.BusyCursor)
+        self.pool.start(task)
+        return task
+
+    def drop(self):
+        """Supersede every keyed task (e.g. on logout); key=None writes still report."""
+        latest, self._latest = list(self._latest.values()), {}
+        for task in latest:
+            self._take(task)
+
+    def stale(self, task):
+        return task.key is not None and self._latest.get(task.key) is not task
+
+    def _take(self, task):
+        """Pull a superseded task off the queue if it hasn't started yet."""
+        if self.pool.tryTake(task):
+            self._finish(task)
+            if task.cancel is not None:
+                task.cancel()
+
+    def _landed(self, task, cb, value):
+        stale = self.stale(task)
+        self._finish(task)
+        if stale:
+            if task.cancel is not None:
+                task.cancel()
+        elif cb is not None:
+            cb(value)
+
+    def _finish(self, task):
+        if task not in self._live:
+            return
+        self._live.discard(task)
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        if task.busy is not None:
+            task.busy.setEnabled(True)
+        Runner._pending -= 1
+        if Runner._pending == 0:
+            QApplication.restoreOverrideCursor()
+
+    def report(self, exc):
+        QMessageBox.critical(self.parent(), "Database error", str(exc))